@@ -0,0 +1,48 @@
+"""
+Compara o extrator de DARF atual com a implementação anterior em páginas sintéticas.
+
+    python -m benchmarks.bench_darf --paginas 5000
+"""
+import argparse
+
+import pandas as pd
+
+from benchmarks.geradores import gerar_paginas_darf
+from benchmarks.medicao import medir
+from benchmarks.referencia import extrair_dados_darf as extrair_referencia
+from inputs.darf_loader import extrair_colunas_darf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paginas", type=int, default=5000)
+    parser.add_argument("--itens", type=int, default=4)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    paginas = gerar_paginas_darf(args.paginas, args.itens)
+
+    def referencia():
+        registros = []
+        for texto in paginas:
+            registros.extend(extrair_referencia(texto))
+        return pd.DataFrame(registros)
+
+    def atual():
+        colunas = {}
+        for texto in paginas:
+            extrair_colunas_darf(texto, colunas)
+        return pd.DataFrame(colunas)
+
+    t_ref, df_ref = medir(referencia, args.repeticoes)
+    t_atual, df_atual = medir(atual, args.repeticoes)
+    pd.testing.assert_frame_equal(df_ref, df_atual)
+
+    print(f"páginas: {args.paginas}  itens: {len(df_atual)}  (saídas idênticas)")
+    print(f"referência: {t_ref:8.3f}s  {args.paginas / t_ref:10.0f} páginas/s")
+    print(f"atual:      {t_atual:8.3f}s  {args.paginas / t_atual:10.0f} páginas/s")
+    print(f"ganho:      {t_ref / t_atual:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
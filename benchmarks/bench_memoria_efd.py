@@ -0,0 +1,58 @@
+"""
+Memória do DataFrame da EFD no formato posicional antigo (tudo texto) e no esquema
+tipado/categórico, para um arquivo SPED sintético.
+
+No dump completo o tipado é mais lento: compactar fatora cada coluna de texto (ver
+inputs.efd_loader._tipar_lote). É o preço dos ~4x a menos de memória.
+
+    python -m benchmarks.bench_memoria_efd --linhas 500000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.geradores import gerar_texto_efd
+from inputs.efd_loader import REGISTROS_RESUMO, carregar_e_processar_arquivos
+
+
+def _mb(n):
+    return n / 1024 / 1024
+
+
+def _medir(caminho, **opcoes):
+    inicio = time.perf_counter()
+    _, df = carregar_e_processar_arquivos([caminho], **opcoes)
+    return time.perf_counter() - inicio, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "efd.txt")
+        with open(caminho, "w", encoding="latin1", newline="") as arquivo:
+            arquivo.write(gerar_texto_efd(args.linhas))
+        print(f"arquivo: {args.linhas} linhas, {_mb(os.path.getsize(caminho)):.1f} MB")
+
+        casos = [
+            ("resumo", dict(registros=REGISTROS_RESUMO)),
+            ("completo", dict(registros=None)),
+            ("completo + esparsas", dict(registros=None, manter_esparsas=True)),
+        ]
+        for nome, opcoes in casos:
+            t_antigo, antigo = _medir(caminho, tipado=False, **opcoes)
+            t_tipado, tipado = _medir(caminho, **opcoes)
+            m_antigo = antigo.memory_usage(deep=True).sum()
+            m_tipado = tipado.memory_usage(deep=True).sum()
+            print(
+                f"{nome:20s} posicional: {_mb(m_antigo):8.1f} MB {antigo.shape[1]:3d} col {t_antigo:6.2f}s | "
+                f"tipado: {_mb(m_tipado):8.1f} MB {tipado.shape[1]:3d} col {t_tipado:6.2f}s | "
+                f"{m_antigo / m_tipado:5.1f}x menor"
+            )
+
+
+if __name__ == "__main__":
+    main()
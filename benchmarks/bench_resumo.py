@@ -0,0 +1,64 @@
+"""
+Compara gerar_df_resumo com a implementação anterior (merges encadeados) em dados sintéticos.
+
+    python -m benchmarks.bench_resumo --linhas 1000000
+"""
+import argparse
+
+import pandas as pd
+
+from benchmarks.geradores import gerar_df_darf, gerar_df_dctf, gerar_df_efd, gerar_df_perdcomp
+from benchmarks.medicao import medir
+from benchmarks.referencia import gerar_df_resumo as resumo_referencia
+from calculos.resumo import gerar_df_resumo
+
+
+def _entradas_referencia(df_efd, df_dctf, df_darf, df_perdcomp):
+    """
+    A implementação anterior lia os dígitos da DCTF como reais e passava os valores
+    numéricos do PER/DCOMP por str(); aqui os valores vão já em '1234,56' para que as
+    duas versões recebam os mesmos montantes.
+    """
+    def reais(centavos):
+        return (centavos // 100).astype(str) + "," + (centavos % 100).astype(str).str.zfill(2)
+
+    df_dctf = df_dctf.assign(ValorDebito=reais(df_dctf["ValorDebito"].astype("int64")))
+    valores = (df_perdcomp["valor_principal_tributo"] * 100).round().astype("int64")
+    df_perdcomp = df_perdcomp.assign(valor_principal_tributo=reais(valores))
+    return df_efd, df_dctf, df_darf, df_perdcomp
+
+
+def _centavos(df):
+    valores = df.select_dtypes("number").columns
+    return df.assign(**{c: (df[c] * 100).round().astype("int64") for c in valores})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=1_000_000, help="linhas por fonte")
+    parser.add_argument("--periodos", type=int, default=60)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    fontes = (
+        gerar_df_efd(args.linhas, args.periodos, 1),
+        gerar_df_dctf(args.linhas, args.periodos, 2),
+        gerar_df_darf(args.linhas, args.periodos, 3),
+        gerar_df_perdcomp(args.linhas, args.periodos, 4),
+    )
+    fontes_referencia = _entradas_referencia(*fontes)
+    t_ref, df_ref = medir(lambda: resumo_referencia(*fontes_referencia), args.repeticoes)
+    t_atual, df_atual = medir(lambda: gerar_df_resumo(*fontes), args.repeticoes)
+    # a referência soma em float: o total dela arredondado ao centavo tem de bater exatamente
+    # com os centavos inteiros da versão atual
+    pd.testing.assert_frame_equal(_centavos(df_ref), _centavos(df_atual))
+
+    total = args.linhas * len(fontes)
+    print(f"linhas: {total}  períodos: {args.periodos}  (saídas iguais ao centavo)")
+    print(f"referência: {t_ref:8.3f}s  {total / t_ref:12.0f} linhas/s")
+    print(f"atual:      {t_atual:8.3f}s  {total / t_atual:12.0f} linhas/s")
+    print(f"ganho:      {t_ref / t_atual:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Compara a limpeza de caracteres de controle por coluna com o applymap célula a célula.
+
+    python -m benchmarks.bench_sanitizacao --linhas 1000000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.geradores import gerar_df_efd
+from benchmarks.medicao import medir
+from benchmarks.referencia import remove_illegal_chars
+from utils.texto import remover_caracteres_ilegais
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=200_000)
+    parser.add_argument("--sujas", type=float, default=0.001,
+                        help="fração das células de uma coluna com caracteres de controle")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    df = gerar_df_efd(args.linhas)
+    # suja uma coluna de texto, como acontece com descrições vindas de ERPs
+    coluna = df.columns[2]
+    sujas = np.random.default_rng(0).random(len(df)) < args.sujas
+    df.loc[sujas, coluna] = df.loc[sujas, coluna].astype(str) + "\x0b\x1f"
+
+    # DataFrame.map é o applymap com o nome novo (applymap está depreciado)
+    t_ref, df_ref = medir(lambda: df.map(remove_illegal_chars), args.repeticoes)
+    t_atual, (df_atual, colunas) = medir(lambda: remover_caracteres_ilegais(df), args.repeticoes)
+    pd.testing.assert_frame_equal(df_ref, df_atual)
+
+    celulas = df.size
+    print(f"linhas: {len(df)}  células: {celulas}  colunas limpas: {colunas}  (saídas idênticas)")
+    print(f"applymap: {t_ref:8.3f}s  {celulas / t_ref:12.0f} células/s")
+    print(f"atual:    {t_atual:8.3f}s  {celulas / t_atual:12.0f} células/s")
+    print(f"ganho:    {t_ref / t_atual:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
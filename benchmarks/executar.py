@@ -0,0 +1,227 @@
+"""
+Mede cada etapa do cruzamento em entradas sintéticas de vários tamanhos e grava
+os resultados em JSON: tempo de parede, pico de memória (RSS) e linhas/s.
+
+Cada medição roda num processo próprio, para que o pico de RSS seja só daquela
+etapa. As entradas (arquivos .txt, .dec, .pdf, .xlsx) são geradas uma vez por
+tamanho num diretório temporário.
+
+    python -m benchmarks.executar --tamanhos 1e3,1e4,1e5 --saida resultados.json
+    python -m benchmarks.executar --tamanhos 1e3,1e4,1e5 --comparar resultados.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import geradores
+
+ETAPAS = ["efd", "efd_completa", "dctf", "dctf_dataframes", "darf", "perdcomp", "resumo"]
+
+# DARF: uma página a cada N "linhas" (itens de 4 por página); PDFs e planilhas têm teto
+ITENS_POR_PAGINA = 4
+LIMITE_PAGINAS_DARF = 20_000
+LIMITE_LINHAS_XLSX = 1_048_575
+
+
+def _pico_rss_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    return pico / 1024 / 1024 if sys.platform == "darwin" else pico / 1024
+
+
+def _entrada(etapa, linhas, diretorio):
+    """Gera (se ainda não existe) o arquivo de entrada da etapa e devolve (caminho, linhas medidas)."""
+    if etapa in ("efd", "efd_completa"):
+        caminho = os.path.join(diretorio, f"efd_{linhas}.txt")
+        if not os.path.exists(caminho):
+            geradores.escrever_efd(caminho, linhas)
+        return caminho, linhas
+    if etapa in ("dctf", "dctf_dataframes"):
+        caminho = os.path.join(diretorio, f"dctf_{linhas}.dec")
+        if not os.path.exists(caminho):
+            geradores.escrever_dctf(caminho, linhas)
+        return caminho, linhas
+    if etapa == "darf":
+        paginas = max(1, linhas // ITENS_POR_PAGINA)
+        if paginas > LIMITE_PAGINAS_DARF:
+            return None, paginas
+        caminho = os.path.join(diretorio, f"darf_{paginas}.pdf")
+        if not os.path.exists(caminho):
+            with open(caminho, "wb") as arquivo:
+                arquivo.write(geradores.gerar_pdf_darf(paginas, ITENS_POR_PAGINA))
+        return caminho, paginas
+    if etapa == "perdcomp":
+        if linhas > LIMITE_LINHAS_XLSX:
+            return None, linhas
+        caminho = os.path.join(diretorio, f"perdcomp_{linhas}.xlsx")
+        if not os.path.exists(caminho):
+            with open(caminho, "wb") as arquivo:
+                arquivo.write(geradores.gerar_xlsx_perdcomp(linhas))
+        return caminho, linhas
+    # resumo: os DataFrames são gerados dentro do processo de medição
+    return "", linhas
+
+
+def _medir_etapa(etapa, caminho, linhas):
+    """Roda uma etapa (no processo de medição) e devolve o dicionário de resultado."""
+    argumento = caminho
+    if etapa == "efd":
+        from inputs.efd_loader import carregar_e_processar_arquivos
+        funcao = lambda arquivos: carregar_e_processar_arquivos(arquivos)[1]  # noqa: E731
+        argumento = [caminho]
+    elif etapa == "efd_completa":
+        from inputs.efd_loader import carregar_e_processar_arquivos
+        funcao = lambda arquivos: carregar_e_processar_arquivos(arquivos, registros=None)[1]  # noqa: E731
+        argumento = [caminho]
+    elif etapa == "dctf":
+        from inputs.dctf_loader import carregar_tabelas as funcao
+        argumento = [caminho]
+    elif etapa == "dctf_dataframes":
+        from calculos.dctf_dataframe import gerar_dataframes as funcao
+        from inputs.dctf_loader import carregar_arquivos
+        argumento = carregar_arquivos([caminho])
+    elif etapa == "darf":
+        from inputs.darf_loader import carregar_darfs
+        funcao = lambda arquivos: carregar_darfs(arquivos, workers=1)  # noqa: E731
+        argumento = [caminho]
+    elif etapa == "perdcomp":
+        from inputs.perdcomp_loader import carregar_xlsx as funcao
+    elif etapa == "resumo":
+        from calculos.resumo import gerar_df_resumo
+        entradas = (
+            geradores.gerar_df_efd(linhas), geradores.gerar_df_dctf(linhas),
+            geradores.gerar_df_darf(linhas), geradores.gerar_df_perdcomp(linhas),
+        )
+        funcao = lambda e: gerar_df_resumo(*e)  # noqa: E731
+        argumento = entradas
+    else:
+        raise ValueError(f"etapa desconhecida: {etapa}")
+
+    rss_inicial = _pico_rss_mb()
+    inicio = time.perf_counter()
+    resultado = funcao(argumento)
+    segundos = time.perf_counter() - inicio
+    if isinstance(resultado, dict):
+        saida = sum(len(df) for df in resultado.values())
+    else:
+        saida = 0 if resultado is None else len(resultado)
+    return {
+        "etapa": etapa,
+        "linhas": linhas,
+        "linhas_saida": saida,
+        "segundos": round(segundos, 4),
+        "linhas_por_segundo": round(linhas / segundos, 1) if segundos else None,
+        "rss_inicial_mb": round(rss_inicial, 1),
+        "pico_rss_mb": round(_pico_rss_mb(), 1),
+    }
+
+
+def _executar_isolado(etapa, caminho, linhas):
+    comando = [sys.executable, "-m", "benchmarks.executar", "--interno", etapa, caminho, str(linhas)]
+    processo = subprocess.run(comando, capture_output=True, text=True)
+    if processo.returncode != 0:
+        return {"etapa": etapa, "linhas": linhas, "erro": processo.stderr.strip().splitlines()[-1:]}
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def _ambiente():
+    import pandas as pd
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def comparar(atual, base, tolerancia):
+    """Imprime a variação por (etapa, linhas) e devolve as regressões acima de `tolerancia`."""
+    anteriores = {(r["etapa"], r["linhas"]): r for r in base["resultados"] if "segundos" in r}
+    regressoes = []
+    print(f"\n{'etapa':16s} {'linhas':>10s} {'tempo':>10s} {'base':>10s} {'var':>8s} {'RSS':>9s} {'base':>9s}")
+    for r in atual["resultados"]:
+        anterior = anteriores.get((r["etapa"], r["linhas"]))
+        if anterior is None or "segundos" not in r:
+            continue
+        variacao = r["segundos"] / anterior["segundos"] - 1 if anterior["segundos"] else 0.0
+        marca = ""
+        if variacao > tolerancia or r["pico_rss_mb"] > anterior["pico_rss_mb"] * (1 + tolerancia):
+            regressoes.append(r)
+            marca = "  <- regressão"
+        print(
+            f"{r['etapa']:16s} {r['linhas']:10d} {r['segundos']:9.3f}s {anterior['segundos']:9.3f}s "
+            f"{variacao:+7.1%} {r['pico_rss_mb']:7.0f}MB {anterior['pico_rss_mb']:7.0f}MB{marca}"
+        )
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", default="1e3,1e4,1e5",
+                        help="linhas de entrada por medição, separadas por vírgula (até 1e7)")
+    parser.add_argument("--etapas", default=",".join(ETAPAS), help=f"subconjunto de {','.join(ETAPAS)}")
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerancia", type=float, default=0.10,
+                        help="variação de tempo/RSS tolerada antes de acusar regressão (padrão 10%%)")
+    parser.add_argument("--diretorio", help="onde gerar as entradas (padrão: temporário, apagado no fim)")
+    parser.add_argument("--interno", nargs=3, metavar=("ETAPA", "CAMINHO", "LINHAS"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.interno:
+        etapa, caminho, linhas = args.interno
+        print(json.dumps(_medir_etapa(etapa, caminho, int(linhas))))
+        return 0
+
+    tamanhos = [int(float(t)) for t in args.tamanhos.split(",")]
+    etapas = args.etapas.split(",")
+    resultados = []
+    with tempfile.TemporaryDirectory() as temporario:
+        diretorio = args.diretorio or temporario
+        os.makedirs(diretorio, exist_ok=True)
+        for linhas in tamanhos:
+            for etapa in etapas:
+                caminho, medidas = _entrada(etapa, linhas, diretorio)
+                if caminho is None:
+                    print(f"{etapa:16s} {linhas:>10d}  ignorado (acima do limite da etapa)")
+                    continue
+                resultado = _executar_isolado(etapa, caminho, medidas)
+                resultados.append(resultado)
+                if "erro" in resultado:
+                    print(f"{etapa:16s} {medidas:>10d}  erro: {resultado['erro']}")
+                else:
+                    print(
+                        f"{etapa:16s} {medidas:>10d}  {resultado['segundos']:9.3f}s  "
+                        f"{resultado['linhas_por_segundo']:>12,.0f} linhas/s  pico {resultado['pico_rss_mb']:8.1f} MB"
+                    )
+
+    execucao = {"ambiente": _ambiente(), "resultados": resultados}
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(execucao, arquivo, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)
+        if comparar(execucao, base, args.tolerancia):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Geradores de entradas sintéticas para os benchmarks.
+"""
+import random
+
+# códigos de receita de PIS/COFINS e mais alguns que não entram no cruzamento
+CODIGOS_RECEITA = ["8109", "6912", "2172", "5856", "0561", "2089"]
+
+MESES = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho",
+         "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+
+
+def _valor_br(rng, maximo=1_000_000):
+    centavos = rng.randint(1, maximo * 100)
+    reais, resto = divmod(centavos, 100)
+    return f"{reais:,}".replace(",", ".") + f",{resto:02d}"
+
+
+def _cnpj(rng):
+    n = f"{rng.randint(0, 10**14 - 1):014d}"
+    return f"{n[:2]}.{n[2:5]}.{n[5:8]}/{n[8:12]}-{n[12:]}"
+
+
+def gerar_texto_darf(itens=4, semente=0, rng=None):
+    """Texto de uma página de comprovante de arrecadação no formato lido por extrair_dados_darf."""
+    rng = rng or random.Random(semente)
+    mes, ano = rng.randint(1, 12), rng.randint(2018, 2024)
+    linhas = [
+        "MINISTÉRIO DA FAZENDA",
+        "Comprovante de Arrecadação",
+        f"{_cnpj(rng)} EMPRESA SINTETICA {rng.randint(1, 999)} LTDA",
+        f"28/{mes:02d}/{ano} 25/{mes:02d}/{ano} {rng.randint(10**16, 10**17 - 1)}",
+        f"24/{mes:02d}/{ano} 001 - BANCO DO BRASIL S.A.",
+        f"{rng.randint(1000, 9999)} {rng.randint(1000, 9999)} 0,00",
+        "Composição do Documento de Arrecadação",
+        "Código Denominação Principal Multa Juros Total",
+    ]
+    # alguns comprovantes vêm sem o bloco do banco (colunas ausentes no cabeçalho)
+    if rng.random() < 0.1:
+        del linhas[4:6]
+    for _ in range(itens):
+        multa = rng.choice(["-", _valor_br(rng, 1000)])
+        juros = rng.choice(["-", _valor_br(rng, 1000)])
+        linhas.append(
+            f"{rng.choice(CODIGOS_RECEITA)} CONTRIBUICAO - PIS/COFINS {_valor_br(rng)} {multa} {juros} {_valor_br(rng)}"
+        )
+        linhas.append(f"{rng.randint(1, 99):02d} - APURACAO MENSAL")
+    linhas.append(f"Totais {_valor_br(rng)} {_valor_br(rng, 1000)} {_valor_br(rng, 1000)} {_valor_br(rng)}")
+    return "\n".join(linhas)
+
+
+def gerar_paginas_darf(paginas, itens_por_pagina=4, semente=0):
+    rng = random.Random(semente)
+    return [gerar_texto_darf(itens_por_pagina, rng=rng) for _ in range(paginas)]
+
+
+def _periodos(rng, quantidade, ano_inicial=2019):
+    return [(ano_inicial + m // 12, m % 12 + 1) for m in rng.sample(range(120), quantidade)]
+
+
+def gerar_df_efd(linhas, periodos=60, semente=0):
+    """DataFrame no formato de carregar_e_processar_arquivos (colunas posicionais + PERIODO)."""
+    import pandas as pd
+
+    rng = random.Random(semente)
+    meses = _periodos(rng, periodos)
+    registros = ["M200", "M600", "M210", "M610", "C100", "C170"]
+    dados = []
+    for _ in range(linhas):
+        ano, mes = rng.choice(meses)
+        reg = rng.choice(registros)
+        valor = _valor_br(rng).replace(".", "")
+        dados.append([reg] + ["0"] * 11 + [valor, f"01{mes:02d}{ano}", "efd.txt"])
+    df = pd.DataFrame(dados)
+    return df.rename(columns={13: "PERIODO", 14: "arquivo_origem"})
+
+
+def _valor_efd(rng, maximo=1_000_000):
+    # valores da EFD: vírgula decimal, sem separador de milhar
+    return _valor_br(rng, maximo).replace(".", "")
+
+
+def iterar_linhas_efd(linhas, ano=2023, mes=1, semente=0):
+    """
+    Linhas de um arquivo SPED EFD-Contribuições de um período, ~`linhas` no total:
+    0000, C100/C170 de enchimento e o bloco M (M200/M210/M600/M610), sem quebra de linha.
+    """
+    rng = random.Random(semente)
+    cnpj = f"{rng.randint(0, 10**14 - 1):014d}"
+    yield f"|0000|006|0|||01{mes:02d}{ano}|28{mes:02d}{ano}|EMPRESA SINTETICA LTDA|{cnpj}|SP|3550308||00|0|"
+    yield "|0001|0|"
+    total = 2
+    for i in range(max(0, linhas - 10) // 2):
+        yield (
+            f"|C100|1|0|{rng.randint(1, 9999)}|55|00|001|{i + 1}|{rng.randint(10**43, 10**44 - 1)}|"
+            f"05{mes:02d}{ano}|05{mes:02d}{ano}|{_valor_efd(rng)}|0|0,00|0,00|{_valor_efd(rng)}|9|0,00|0,00|0,00|"
+            f"{_valor_efd(rng, 1000)}|{_valor_efd(rng, 1000)}|0,00|0,00|0,00|0,00|0,00|0,00|0,00|"
+        )
+        yield (
+            f"|C170|1|{rng.randint(1, 999999)}|PRODUTO {rng.randint(1, 500)}|1,00000|UN|{_valor_efd(rng)}|0,00|0|000|"
+            f"{rng.choice(['5102', '5405', '6102'])}|||0,00|0,00|0,00|0,00|0,00|0,00||||0,00|0,00|0,00|"
+            f"01|{_valor_efd(rng)}|1,6500|||{_valor_efd(rng, 1000)}|01|{_valor_efd(rng)}|7,6000|||{_valor_efd(rng, 1000)}|||"
+        )
+        total += 2
+    for reg, detalhe, aliquota in (("M200", "M210", "0,6500"), ("M600", "M610", "3,0000")):
+        valores = [_valor_efd(rng) for _ in range(12)]
+        yield f"|{reg}|" + "|".join(valores) + "|"
+        for cod in ("01", "51"):
+            base = _valor_efd(rng)
+            yield (
+                f"|{detalhe}|{cod}|{base}|{base}|0,00|0,00|{base}|{aliquota}|||{_valor_efd(rng)}|"
+                f"0,00|0,00|0,00|0,00|{_valor_efd(rng)}|"
+            )
+        total += 3
+    yield f"|9999|{total + 1}|"
+
+
+def gerar_texto_efd(linhas, ano=2023, mes=1, semente=0):
+    """Arquivo SPED inteiro como texto (ver iterar_linhas_efd)."""
+    return "".join(linha + "\r\n" for linha in iterar_linhas_efd(linhas, ano, mes, semente))
+
+
+def _escrever(caminho, linhas, encoding="latin1"):
+    # grava em fluxo: arquivos de milhões de linhas não passam inteiros pela memória
+    with open(caminho, "w", encoding=encoding, newline="") as arquivo:
+        for linha in linhas:
+            arquivo.write(linha + "\r\n")
+    return caminho
+
+
+def escrever_efd(caminho, linhas, ano=2023, mes=1, semente=0):
+    return _escrever(caminho, iterar_linhas_efd(linhas, ano, mes, semente))
+
+
+def _campo_dctf(rng, campo, tamanho, valores):
+    if campo in valores:
+        return valores[campo]
+    if campo.startswith("Valor"):
+        return f"{rng.randint(0, 10**9):0{tamanho}d}"[-tamanho:]
+    if campo.startswith("Reservado"):
+        return ""
+    if campo.startswith(("CNPJ", "CPF", "Data", "Numero", "Recibo", "Ordem", "Qtd", "Codigo")):
+        return "".join(rng.choice("0123456789") for _ in range(tamanho))
+    return rng.choice("ABCDEFGHIJ0123456789") * tamanho
+
+
+def linha_dctf(tipo, rng, **valores):
+    """Uma linha de largura fixa do tipo `tipo`, campo a campo conforme LAYOUTS_COMPLETOS."""
+    from calculos.dctf_layouts import LAYOUTS_COMPLETOS
+
+    layout = LAYOUTS_COMPLETOS[tipo]
+    linha = [" "] * max(fim for _, _, fim in layout)
+    for campo, ini, fim in layout:
+        tamanho = fim - ini + 1
+        texto = str(_campo_dctf(rng, campo, tamanho, valores))[:tamanho]
+        numerico = campo.startswith("Valor") or campo in ("MOFG", "CodReceita", "QtdRegistros")
+        texto = texto.rjust(tamanho, "0") if numerico else texto.ljust(tamanho)
+        linha[ini - 1:fim] = texto
+    return "".join(linha)
+
+
+def iterar_linhas_dctf(linhas, periodos=12, semente=0):
+    """
+    Linhas de um arquivo .dec com ~`linhas` registros: R01/R02 de abertura, débitos
+    R10 de PIS/COFINS e outros códigos com vinculações R11/R12, e o T9 de fechamento.
+    """
+    rng = random.Random(semente)
+    cnpj = f"{rng.randint(0, 10**14 - 1):014d}"
+    meses = _periodos(rng, periodos)
+    yield linha_dctf("R01", rng, Tipo="R01", CNPJ=cnpj, MOFG=f"{meses[0][0]}{meses[0][1]:02d}")
+    yield linha_dctf("R02", rng, Tipo="R02", CNPJ=cnpj, NomeEmpresarial="EMPRESA SINTETICA LTDA")
+    total = 2
+    while total < linhas - 1:
+        ano, mes = rng.choice(meses)
+        codigo = rng.choice(CODIGOS_RECEITA)
+        comuns = dict(CNPJ=cnpj, MOFG=f"{ano}{mes:02d}", CodReceita=codigo + "01",
+                      AnoApuracao=ano, MesPeriodo=f"{mes:02d}", DiaPeriodo="00",
+                      PeriodoApuracao=f"28{mes:02d}{ano}", CNPJDARF=cnpj, CodReceitaDARF=codigo)
+        yield linha_dctf("R10", rng, Tipo="R10", **comuns)
+        vinculo = rng.choice(["R11", "R11", "R12"])
+        yield linha_dctf(vinculo, rng, Tipo=vinculo, **comuns)
+        total += 2
+    yield linha_dctf("T9", rng, Tipo="T9", CNPJ=cnpj, QtdRegistros=total + 1)
+
+
+def escrever_dctf(caminho, linhas, periodos=12, semente=0):
+    return _escrever(caminho, iterar_linhas_dctf(linhas, periodos, semente))
+
+
+def _pdf_texto(texto):
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+
+
+def gerar_pdf_darf(paginas, itens_por_pagina=4, semente=0):
+    """PDF mínimo (Helvetica, uma linha de texto por linha do comprovante) com `paginas` páginas de DARF."""
+    textos = gerar_paginas_darf(paginas, itens_por_pagina, semente)
+    objetos = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    # objetos: 1 fonte, 2..n+1 conteúdos, n+2..2n+1 páginas, 2n+2 Pages, 2n+3 Catalog
+    raiz_paginas = 2 * len(textos) + 2
+    for texto in textos:
+        stream = b"BT /F1 9 Tf 11 TL 30 810 Td " + b" ".join(
+            b"(" + _pdf_texto(linha) + b") Tj T*" for linha in texto.split("\n")
+        ) + b" ET"
+        objetos.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    for i in range(len(textos)):
+        objetos.append(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 1 0 R >> >> >>" % (raiz_paginas, i + 2)
+        )
+    filhos = b" ".join(b"%d 0 R" % (len(textos) + 2 + i) for i in range(len(textos)))
+    objetos.append(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (filhos, len(textos)))
+    objetos.append(b"<< /Type /Catalog /Pages %d 0 R >>" % raiz_paginas)
+
+    saida = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, objeto in enumerate(objetos, 1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+    xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    saida += b"".join(b"%010d 00000 n \n" % p for p in posicoes)
+    saida += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, len(objetos), xref)
+    return bytes(saida)
+
+
+def gerar_xlsx_perdcomp(linhas, periodos=60, semente=0):
+    """Planilha PER/DCOMP (.xlsx, bytes) com as colunas lidas por carregar_xlsx."""
+    from utils.exportacao import gerar_excel
+
+    df = gerar_df_perdcomp(linhas, periodos, semente).drop(columns=["_periodos_convertidos"])
+    return gerar_excel({"PERDCOMP": df})
+
+
+def gerar_df_dctf(linhas, periodos=60, semente=0):
+    """DataFrame no formato de gerar_dataframes concatenado (só os campos usados no resumo)."""
+    import pandas as pd
+
+    rng = random.Random(semente)
+    meses = _periodos(rng, periodos)
+    dados = {"Tipo": [], "MOFG": [], "CodReceita": [], "ValorDebito": []}
+    for _ in range(linhas):
+        ano, mes = rng.choice(meses)
+        dados["Tipo"].append(rng.choice(["R10", "R10", "R11", "R12"]))
+        dados["MOFG"].append(f"{ano}{mes:02d}")
+        dados["CodReceita"].append(rng.choice(CODIGOS_RECEITA) + "01")
+        dados["ValorDebito"].append(f"{rng.randint(0, 10**9):014d}")
+    return pd.DataFrame(dados)
+
+
+def gerar_df_darf(linhas, periodos=60, semente=0):
+    """DataFrame no formato de carregar_darfs (só os campos usados no resumo)."""
+    import pandas as pd
+
+    rng = random.Random(semente)
+    meses = _periodos(rng, periodos)
+    dados = {"PeriodoApuracao": [], "Codigo": [], "PrincipalItem": []}
+    for _ in range(linhas):
+        ano, mes = rng.choice(meses)
+        dados["PeriodoApuracao"].append(f"{rng.choice([28, 30, 31]) if mes != 2 else 28}/{mes:02d}/{ano}")
+        dados["Codigo"].append(rng.choice(CODIGOS_RECEITA) + "01")
+        dados["PrincipalItem"].append(_valor_br(rng))
+    return pd.DataFrame(dados)
+
+
+def gerar_df_perdcomp(linhas, periodos=60, semente=0):
+    """DataFrame no formato de carregar_xlsx."""
+    import pandas as pd
+
+    rng = random.Random(semente)
+    meses = _periodos(rng, periodos)
+    dados = {"periodo_apuracao": [], "codigo_receita": [], "valor_principal_tributo": [],
+             "_periodos_convertidos": []}
+    for _ in range(linhas):
+        ano, mes = rng.choice(meses)
+        dados["periodo_apuracao"].append(f"{MESES[mes - 1]} de {ano}")
+        dados["codigo_receita"].append(rng.choice(CODIGOS_RECEITA) + "01")
+        dados["valor_principal_tributo"].append(rng.randint(1, 10**7) / 100)
+        dados["_periodos_convertidos"].append(f"{mes:02d}/{ano}")
+    return pd.DataFrame(dados)
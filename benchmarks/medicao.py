@@ -0,0 +1,14 @@
+"""
+Medição de tempo compartilhada pelos benchmarks.
+"""
+import time
+
+
+def medir(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes e devolve (melhor tempo em segundos, último resultado)."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
@@ -0,0 +1,223 @@
+"""
+Implementações anteriores, mantidas só como referência de saída e de tempo
+para os benchmarks. Não usar no app.
+"""
+import re
+
+import pandas as pd
+
+from calculos.dctf_layouts import LAYOUTS_COMPLETOS
+
+
+def extrair_dados_darf(comprovante):
+    regex = {
+        'CNPJ_Razao': r'(?P<CNPJ>\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})\s+(?P<RazaoSocial>[^\n]+)',
+        'Periodo_Documento': r'(?P<PeriodoApuracao>\d{2}/\d{2}/\d{4})\s+(?P<DataVencimento>\d{2}/\d{2}/\d{4})\s+(?P<NumeroDocumento>\d{14,})',
+        'Banco_Data_Arrecadacao': r'(?P<DataArrecadacao>\d{2}/\d{2}/\d{4})\s+(?P<Banco>\d{3}\s*-\s*[^\n]+)',
+        'Agencia_Estabelecimento_Valor': r'(?P<Agencia>\d{4})\s+(?P<Estabelecimento>\d{4})\s+(?P<ValorReservado>[\d,.]+)',
+        'Totais': r'Totais\s+(?P<Principal>[\d,.]+)\s+(?P<Juros>[\d,.]+)\s+(?P<Multa>[\d,.]+)\s+(?P<Total>[\d,.]+)'
+    }
+
+    dados = {}
+    for chave, padrao in regex.items():
+        match = re.search(padrao, comprovante)
+        if match:
+            dados.update(match.groupdict())
+
+    linhas = comprovante.splitlines()
+    dados_com_itens = []
+    i = 0
+    while i < len(linhas) - 1:
+        linha = linhas[i]
+        linha_seguinte = linhas[i + 1]
+        pattern_item = re.match(
+            r'(\d{4})\s+([A-ZÀ-ÿa-z0-9\-./\s]+?)\s+(\d{1,3}(?:\.\d{3})*,\d{2})\s+(\d{1,3}(?:\.\d{3})*,\d{2}|-)\s+(\d{1,3}(?:\.\d{3})*,\d{2}|-)\s+(\d{1,3}(?:\.\d{3})*,\d{2})',
+            linha)
+        pattern_subdesc = re.match(r'(\d{2})\s*-\s*(.+)', linha_seguinte)
+
+        if pattern_item and pattern_subdesc:
+            item = pattern_item.groups()
+            subcodigo = pattern_subdesc.group(1)
+            descricao_complementar = pattern_subdesc.group(2).strip()
+            linha_dados = dados.copy()
+            linha_dados.update({
+                'Codigo': f"{item[0]}-{subcodigo}",
+                'DescricaoPrincipal': item[1].strip(),
+                'DescricaoComplementar': descricao_complementar,
+                'PrincipalItem': item[2],
+                'MultaItem': item[3],
+                'JurosItem': item[4],
+                'TotalItem': item[5]
+            })
+            dados_com_itens.append(linha_dados)
+            i += 2
+        else:
+            i += 1
+    return dados_com_itens
+
+
+def gerar_df_resumo(
+    df_efd: pd.DataFrame,
+    df_dctf: pd.DataFrame,
+    df_darf: pd.DataFrame,
+    df_perdcomp: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Gera o DataFrame de resumo contendo:
+      - PERIODO: valor da coluna 5 do registro '0000'
+      - [EFD] PIS/COFINS: somatórios da EFD por PERIODO
+      - [DCTF] PIS/COFINS: somatórios da DCTF por PERIODO
+      - [DARF] PIS/COFINS: somatórios da DARF por PERIODO
+      - [PERDCOMP] PIS/COFINS: somatórios da planilha PER/DCOMP por PERIODO
+      - [SUSPENSÃO] e [PARCELAMENTOS]: colunas zeradas
+      - [DIVERGÊNCIA EFD] e [DIVERGÊNCIA DCTF]: cálculos de diferenças
+    """
+    # Funções auxiliares
+    def fmt_periodo_txt(texto):
+        # transforma 'MM/YYYY' em '01MMYYYY'
+        return f"01{texto.replace('/', '')}" if isinstance(texto, str) else None
+
+    def parse_num(v):
+        s = str(v).replace('.', '').replace(',', '.')
+        try:
+            return float(s)
+        except:
+            return 0.0
+
+    # --- EFD ---
+    if df_efd is None or df_efd.empty:
+        resumo = pd.DataFrame(columns=["PERIODO", "[EFD] PIS", "[EFD] COFINS"])
+    else:
+        efd = df_efd.copy()
+        efd[12] = pd.to_numeric(
+            efd[12].astype(str).str.replace('.', '').str.replace(',', '.'),
+            errors='coerce'
+        ).fillna(0.0)
+        pis = (
+            efd[efd[0] == 'M200'].groupby('PERIODO')[12].sum()
+            .reset_index().rename(columns={12: '[EFD] PIS'})
+        )
+        cof = (
+            efd[efd[0] == 'M600'].groupby('PERIODO')[12].sum()
+            .reset_index().rename(columns={12: '[EFD] COFINS'})
+        )
+        resumo = pd.merge(pis, cof, on='PERIODO', how='outer').fillna(0)
+
+    # --- DCTF ---
+    def fmt_periodo(mofg):
+        try:
+            x = int(mofg)
+            ano, mes = divmod(x, 100)
+            return f"01{mes:02d}{ano}"
+        except:
+            return None
+
+    dctf_pis = pd.DataFrame(columns=['PERIODO', '[DCTF] PIS'])
+    dctf_cof = pd.DataFrame(columns=['PERIODO', '[DCTF] COFINS'])
+    if df_dctf is not None and not df_dctf.empty:
+        dctf = df_dctf.copy()
+        dctf['PERIODO'] = dctf['MOFG'].apply(fmt_periodo)
+        dctf['ValorDebito'] = dctf['ValorDebito'].apply(parse_num)
+        mask_r10_pis = (dctf['Tipo']=='R10') & dctf['CodReceita'].astype(str).str[:4].isin(['8109','6912'])
+        mask_r10_cof = (dctf['Tipo']=='R10') & dctf['CodReceita'].astype(str).str[:4].isin(['2172','5856'])
+        dctf_pis = dctf[mask_r10_pis].groupby('PERIODO')['ValorDebito'].sum().reset_index().rename(columns={'ValorDebito':'[DCTF] PIS'})
+        dctf_cof = dctf[mask_r10_cof].groupby('PERIODO')['ValorDebito'].sum().reset_index().rename(columns={'ValorDebito':'[DCTF] COFINS'})
+    resumo = resumo.merge(dctf_pis, on='PERIODO', how='left').fillna({'[DCTF] PIS':0})
+    resumo = resumo.merge(dctf_cof, on='PERIODO', how='left').fillna({'[DCTF] COFINS':0})
+
+    # --- DARF ---
+    darf_pis = pd.DataFrame(columns=['PERIODO', '[DARF] PIS'])
+    darf_cof = pd.DataFrame(columns=['PERIODO', '[DARF] COFINS'])
+    if df_darf is not None and not df_darf.empty:
+        darf = df_darf.copy()
+        if 'Período Apuração' in darf.columns:
+            darf = darf.rename(columns={'Período Apuração':'PeriodoApuracao'})
+        if 'Código' in darf.columns:
+            darf = darf.rename(columns={'Código':'Codigo'})
+        darf['Periodo_dt'] = pd.to_datetime(darf['PeriodoApuracao'], dayfirst=True, errors='coerce')
+        darf['PERIODO'] = '01' + darf['Periodo_dt'].dt.strftime('%m%Y')
+        darf['PrincipalItem'] = darf['PrincipalItem'].apply(parse_num)
+        mask_darf_pis = darf['Codigo'].astype(str).str[:4].isin(['8109','6912'])
+        mask_darf_cof = darf['Codigo'].astype(str).str[:4].isin(['2172','5856'])
+        darf_pis = darf[mask_darf_pis].groupby('PERIODO')['PrincipalItem'].sum().reset_index().rename(columns={'PrincipalItem':'[DARF] PIS'})
+        darf_cof = darf[mask_darf_cof].groupby('PERIODO')['PrincipalItem'].sum().reset_index().rename(columns={'PrincipalItem':'[DARF] COFINS'})
+    resumo = resumo.merge(darf_pis, on='PERIODO', how='left').fillna({'[DARF] PIS':0})
+    resumo = resumo.merge(darf_cof, on='PERIODO', how='left').fillna({'[DARF] COFINS':0})
+
+    # --- SUSPENSÃO e PARCELAMENTOS ---
+    for col in ['[SUSPENSÃO] PIS','[SUSPENSÃO] COFINS','[PARCELAMENTOS] PIS','[PARCELAMENTOS] COFINS']:
+        resumo[col] = 0.0
+
+    # --- PERDCOMP (planilha) ---
+    perd_pis = pd.DataFrame(columns=['PERIODO','[PERDCOMP] PIS'])
+    perd_cof = pd.DataFrame(columns=['PERIODO','[PERDCOMP] COFINS'])
+    if df_perdcomp is not None and not df_perdcomp.empty:
+        pc = df_perdcomp.copy()
+        if '_periodos_convertidos' in pc.columns:
+            pc['PERIODO'] = pc['_periodos_convertidos'].apply(fmt_periodo_txt)
+        # detectar código e valor na planilha
+        code_cols = [c for c in pc.columns if c.lower().startswith('cod')]
+        val_cols = [c for c in pc.columns if 'valor_principal' in c.lower()]
+        if val_cols:
+            pc[val_cols[0]] = pc[val_cols[0]].apply(parse_num)
+            if code_cols:
+                codigo = code_cols[0]
+                mask_pc_pis = pc[codigo].astype(str).str[:4].isin(['8109','6912'])
+                mask_pc_cof = pc[codigo].astype(str).str[:4].isin(['2172','5856'])
+                perd_pis = pc[mask_pc_pis].groupby('PERIODO')[val_cols[0]].sum().reset_index().rename(columns={val_cols[0]:'[PERDCOMP] PIS'})
+                perd_cof = pc[mask_pc_cof].groupby('PERIODO')[val_cols[0]].sum().reset_index().rename(columns={val_cols[0]:'[PERDCOMP] COFINS'})
+            else:
+                # sem coluna de código, soma geral em ambos
+                tot = pc.groupby('PERIODO')[val_cols[0]].sum().reset_index()
+                perd_pis = tot.rename(columns={val_cols[0]:'[PERDCOMP] PIS'})
+                perd_cof = tot.rename(columns={val_cols[0]:'[PERDCOMP] COFINS'})
+    resumo = resumo.merge(perd_pis, on='PERIODO', how='left').fillna({'[PERDCOMP] PIS':0})
+    resumo = resumo.merge(perd_cof, on='PERIODO', how='left').fillna({'[PERDCOMP] COFINS':0})
+
+    # --- DIVERGÊNCIAS ---
+    resumo['[DIVERGÊNCIA EFD] PIS'] = resumo['[EFD] PIS'] - (resumo['[DARF] PIS'] + resumo['[PERDCOMP] PIS'] + resumo['[PARCELAMENTOS] PIS'])
+    resumo['[DIVERGÊNCIA EFD] COFINS'] = resumo['[EFD] COFINS'] - (resumo['[DARF] COFINS'] + resumo['[PERDCOMP] COFINS'] + resumo['[PARCELAMENTOS] COFINS'])
+    resumo['[DIVERGÊNCIA DCTF] PIS'] = resumo['[DCTF] PIS'] - (resumo['[DARF] PIS'] + resumo['[PERDCOMP] PIS'] + resumo['[PARCELAMENTOS] PIS'])
+    resumo['[DIVERGÊNCIA DCTF] COFINS'] = resumo['[DCTF] COFINS'] - (resumo['[DARF] COFINS'] + resumo['[PERDCOMP] COFINS'] + resumo['[PARCELAMENTOS] COFINS'])
+
+    # ordenação e totais
+    resumo['Periodo_dt'] = pd.to_datetime(resumo['PERIODO'], format='%d%m%Y', errors='coerce')
+    resumo = resumo.sort_values('Periodo_dt').drop(columns=['Periodo_dt']).reset_index(drop=True)
+    # linha de totais
+    num_cols = [c for c in resumo.columns if c!='PERIODO']
+    tot = resumo[num_cols].sum().to_frame().T
+    tot.insert(0,'PERIODO','TOTAL')
+    resumo = pd.concat([resumo, tot], ignore_index=True)
+
+    return resumo
+
+
+def remove_illegal_chars(val):
+    if isinstance(val, str):
+        return re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f]', '', val)
+    return val
+
+
+def parse_registro(linha, layout):
+    return {campo: linha[ini - 1:fim].strip() for campo, ini, fim in layout}
+
+
+def gerar_dataframes_dctf(conteudos):
+    registros_por_tipo = {k: [] for k in LAYOUTS_COMPLETOS}
+    for nome, linhas in conteudos:
+        for linha in linhas:
+            tipo = linha[:3].strip()
+            if tipo in LAYOUTS_COMPLETOS:
+                registro = parse_registro(linha, LAYOUTS_COMPLETOS[tipo])
+                registro["ArquivoOrigem"] = nome
+                registros_por_tipo[tipo].append(registro)
+
+    tabelas = {}
+    for tipo, layout in LAYOUTS_COMPLETOS.items():
+        colunas = [campo for campo, _, _ in layout] + ["ArquivoOrigem"]
+        df = pd.DataFrame(registros_por_tipo[tipo] or [{}])
+        for col in colunas:
+            if col not in df.columns:
+                df[col] = ""
+        tabelas[tipo] = df[colunas]
+    return tabelas
@@ -0,0 +1,101 @@
+"""
+Mede o tempo de importação (python -X importtime) dos módulos usados sem a
+interface: lote.py, loaders e cálculos. Esse custo se paga a cada execução do lote
+e a cada processo do pool (spawn), que reimporta o módulo da tarefa.
+
+Falha (código de saída 1) quando um módulo passa do orçamento ou importa, já na
+carga, um parser pesado ou a interface (ver PROIBIDOS): pdfplumber, openpyxl,
+xml.etree e duckdb só devem ser importados quando a fonte for usada.
+
+    python -m benchmarks.tempo_importacao
+    python -m benchmarks.tempo_importacao --orcamento-ms 800 --modulos lote inputs.darf_loader
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+MODULOS = [
+    "lote",
+    "inputs.efd_loader",
+    "inputs.dctf_loader",
+    "inputs.darf_loader",
+    "inputs.perdcomp_loader",
+    "inputs.dctfweb_loader",
+    "calculos",
+    "calculos.incremental",
+    "calculos.conciliacao",
+    "calculos.resumo_duckdb",
+    "utils.exportacao",
+]
+
+# pacotes que não podem ser importados junto com os módulos acima
+PROIBIDOS = ("streamlit", "pdfplumber", "pdfminer", "openpyxl", "xml.etree", "duckdb")
+
+# tempo acumulado máximo por módulo, com pandas e numpy (que sozinhos levam boa parte)
+ORCAMENTO_MS = 1500
+
+
+def medir_importacao(modulo):
+    """Importa `modulo` num processo novo e devolve {nome importado: (próprio, acumulado)} em µs."""
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}" if modulo else "pass"],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"falha ao importar {modulo}:\n{processo.stderr}")
+    tempos = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        tempos[nome.strip()] = (int(proprio), int(acumulado))
+    return tempos
+
+
+def proibidos(tempos):
+    return [p for p in PROIBIDOS if any(nome == p or nome.startswith(p + ".") for nome in tempos)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modulos", nargs="+", default=MODULOS)
+    parser.add_argument("--orcamento-ms", type=float, default=ORCAMENTO_MS)
+    parser.add_argument("--repeticoes", type=int, default=3,
+                        help="vale a menor medição (a primeira ainda pode compilar os .pyc)")
+    args = parser.parse_args()
+
+    # o que o interpretador já importa ao iniciar (site, encodings...) não conta como pesado
+    inicializacao = set(medir_importacao(None))
+    falhas = []
+    print(f"{'módulo':<26}{'total (ms)':>12}{'pandas (ms)':>13}  mais pesados")
+    for modulo in args.modulos:
+        medicoes = [medir_importacao(modulo) for _ in range(args.repeticoes)]
+        tempos = min(medicoes, key=lambda t: t[modulo][1])
+        total = tempos[modulo][1] / 1000
+        pandas = tempos.get("pandas", (0, 0))[1] / 1000
+        # pacotes de primeiro nível que mais pesaram, fora o próprio módulo
+        pacotes = sorted(
+            ((acumulado, nome) for nome, (_, acumulado) in tempos.items()
+             if "." not in nome and nome != modulo.partition(".")[0] and nome not in inicializacao),
+            reverse=True,
+        )[:3]
+        pesados = ", ".join(f"{nome} {acumulado / 1000:.0f}" for acumulado, nome in pacotes)
+        print(f"{modulo:<26}{total:>12.1f}{pandas:>13.1f}  {pesados}")
+
+        if total > args.orcamento_ms:
+            falhas.append(f"{modulo}: {total:.0f} ms, acima do orçamento de {args.orcamento_ms:.0f} ms")
+        encontrados = proibidos(tempos)
+        if encontrados:
+            falhas.append(f"{modulo}: importa {', '.join(encontrados)} na carga")
+
+    if falhas:
+        print("\n" + "\n".join(falhas))
+        sys.exit(1)
+    print(f"\n{len(args.modulos)} módulos dentro do orçamento de {args.orcamento_ms:.0f} ms, sem importações proibidas")
+
+
+if __name__ == "__main__":
+    main()
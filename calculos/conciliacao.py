@@ -0,0 +1,314 @@
+"""
+Conciliação linha a linha dos débitos da DCTF com os pagamentos:
+
+  - R11 (DARF vinculado ao débito) x itens dos comprovantes de DARF
+  - R12 (compensação vinculada) x linhas da planilha PER/DCOMP
+  - R10 sem nenhuma vinculação x pagamentos que sobraram (DARF, depois PER/DCOMP)
+
+Cada par é procurado primeiro pela chave exata (CNPJ, código de receita, período
+AAAAMM, valor em centavos) num join por hash, em que repetições da mesma chave
+casam uma a uma (cumcount). O que sobra tenta o valor mais próximo, até
+`tolerancia` centavos, com o mesmo CNPJ, código e período (merge_asof). Linhas
+sem CNPJ ou código casam depois, numa passada própria (ver `_passadas`). O
+resultado é uma tabela de detalhe com a situação de cada débito e pagamento.
+"""
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from utils.instrumentacao import etapa, medir
+from utils.moeda import centavos_para_reais, digitos_para_centavos, texto_para_centavos
+from utils.periodos import chaves_periodo, para_texto
+
+from .resumo import CODIGOS_RECEITA
+
+# diferença máxima, em centavos, para casar valores que não batem exatamente
+TOLERANCIA_PADRAO = 100
+# rodadas do casamento por aproximação (cada pagamento só pode casar uma vez)
+RODADAS_TOLERANCIA = 3
+
+CONCILIADO = 'CONCILIADO'
+CONCILIADO_TOLERANCIA = 'CONCILIADO (TOLERÂNCIA)'
+PAGAMENTO_NAO_ENCONTRADO = 'PAGAMENTO NÃO ENCONTRADO'
+DEBITO_SEM_PAGAMENTO = 'DÉBITO SEM PAGAMENTO'
+PAGAMENTO_SEM_DEBITO = 'PAGAMENTO SEM DÉBITO'
+
+COLUNAS = [
+    'Situacao', 'Origem', 'CNPJ', 'Tributo', 'CodReceita', 'PERIODO', 'ValorDCTF', 'ValorPagamento',
+    'Diferenca', 'DocumentoDCTF', 'FontePagamento', 'DocumentoPagamento', 'ArquivoDCTF', 'ArquivoPagamento',
+]
+
+# campos que o R10 repete nas suas vinculações R11/R12: identificam o débito vinculado
+_CHAVE_DEBITO = ['ArquivoOrigem', 'CNPJ', 'MOFG', 'CodReceita', 'AnoApuracao', 'MesPeriodo', 'DiaPeriodo']
+# chaves do casamento que podem faltar numa linha (ver _passadas)
+_CHAVES_OPCIONAIS = ('CNPJ', 'Codigo')
+
+def _digitos(serie):
+    texto = serie.astype(str).str.replace(r'\D', '', regex=True)
+    return texto.where(texto != '')
+
+
+def _coluna(df, nome, padrao=None):
+    return df[nome] if nome in df.columns else pd.Series(padrao, index=df.index, dtype=object)
+
+
+def _normalizar(cnpj, codigo, periodo, valor, documento, arquivo, codigos):
+    df = pd.DataFrame({
+        'CNPJ': _digitos(cnpj),
+        'Codigo': _digitos(codigo).str[:4],
+        'PERIODO': periodo,
+        'Valor': valor,
+        'Documento': documento,
+        'Arquivo': arquivo,
+    })
+    # só os códigos do cruzamento (PIS/COFINS); linhas sem código entram e casam na passada sem código
+    df = df[df['Codigo'].isna() | df['Codigo'].isin(list(codigos))]
+    return df.reset_index(drop=True)
+
+
+def _periodo_apuracao(df):
+    # período do débito: ano/mês de apuração; sem eles, o MOFG (como no resumo)
+    numero = pd.to_numeric(_coluna(df, 'AnoApuracao'), errors='coerce') * 100 + pd.to_numeric(
+        _coluna(df, 'MesPeriodo'), errors='coerce')
+    return chaves_periodo(numero, 'aaaamm').fillna(chaves_periodo(_coluna(df, 'MOFG'), 'aaaamm'))
+
+
+def registros_dctf(df_dctf, codigos=CODIGOS_RECEITA):
+    """R10 sem vinculação, R11 e R12 da DCTF no formato comum de conciliação."""
+    vazio = _normalizar(*[pd.Series(dtype=object)] * 6, codigos)
+    if df_dctf is None or df_dctf.empty or 'Tipo' not in df_dctf.columns:
+        return {'R10': vazio, 'R11': vazio, 'R12': vazio}
+    tipos = {tipo: df_dctf[df_dctf['Tipo'] == tipo] for tipo in ('R10', 'R11', 'R12')}
+
+    r10 = tipos['R10']
+    chave = [c for c in _CHAVE_DEBITO if c in df_dctf.columns]
+    vinculados = pd.concat([tipos['R11'][chave], tipos['R12'][chave]])
+    if chave and not r10.empty:
+        sem_vinculo = ~pd.MultiIndex.from_frame(r10[chave].astype(str)).isin(
+            pd.MultiIndex.from_frame(vinculados.astype(str)))
+        r10 = r10[sem_vinculo]
+
+    r11 = tipos['R11']
+    # o DARF vinculado traz CNPJ, código e período próprios; vazios herdam os do débito
+    cnpj_darf = _digitos(_coluna(r11, 'CNPJDARF')).fillna(_digitos(r11['CNPJ']))
+    codigo_darf = _digitos(_coluna(r11, 'CodReceitaDARF')).fillna(_digitos(r11['CodReceita']))
+    periodo_darf = chaves_periodo(_coluna(r11, 'PeriodoApuracao'), 'ddmmaaaa').fillna(_periodo_apuracao(r11))
+
+    r12 = tipos['R12']
+    return {
+        'R10': _normalizar(r10['CNPJ'], r10['CodReceita'], _periodo_apuracao(r10),
+                           digitos_para_centavos(_coluna(r10, 'ValorDebito')), None,
+                           _coluna(r10, 'ArquivoOrigem'), codigos),
+        'R11': _normalizar(cnpj_darf, codigo_darf, periodo_darf,
+                           digitos_para_centavos(_coluna(r11, 'ValorPrincipal')), _coluna(r11, 'Referencia'),
+                           _coluna(r11, 'ArquivoOrigem'), codigos),
+        'R12': _normalizar(r12['CNPJ'], r12['CodReceita'], _periodo_apuracao(r12),
+                           digitos_para_centavos(_coluna(r12, 'ValorCompensado')), _coluna(r12, 'NumeroProcesso'),
+                           _coluna(r12, 'ArquivoOrigem'), codigos),
+    }
+
+
+def pagamentos_darf(df_darf, codigos=CODIGOS_RECEITA):
+    """Itens dos comprovantes de DARF no formato comum de conciliação."""
+    if df_darf is None or df_darf.empty:
+        return _normalizar(*[pd.Series(dtype=object)] * 6, codigos)
+    darf = df_darf.rename(columns={'Período Apuração': 'PeriodoApuracao', 'Código': 'Codigo'})
+    return _normalizar(
+        _coluna(darf, 'CNPJ'), _coluna(darf, 'Codigo'), chaves_periodo(_coluna(darf, 'PeriodoApuracao'), 'data'),
+        texto_para_centavos(_coluna(darf, 'PrincipalItem')), _coluna(darf, 'NumeroDocumento'),
+        _coluna(darf, 'ArquivoOrigem'), codigos,
+    )
+
+
+def pagamentos_perdcomp(df_perdcomp, codigos=CODIGOS_RECEITA):
+    """Linhas da planilha PER/DCOMP no formato comum (colunas detectadas como no resumo)."""
+    vazio = _normalizar(*[pd.Series(dtype=object)] * 6, codigos)
+    if df_perdcomp is None or df_perdcomp.empty:
+        return vazio
+    colunas = {c.lower(): c for c in df_perdcomp.columns if isinstance(c, str)}
+    valor = [c for n, c in colunas.items() if 'valor_principal' in n]
+    if '_periodos_convertidos' in df_perdcomp.columns:
+        periodo = chaves_periodo(df_perdcomp['_periodos_convertidos'], 'mm/aaaa')
+    elif 'PERIODO' in df_perdcomp.columns:
+        periodo = chaves_periodo(df_perdcomp['PERIODO'], 'ddmmaaaa')
+    else:
+        return vazio
+    if not valor:
+        return vazio
+
+    def primeira(condicao):
+        encontradas = [c for n, c in colunas.items() if condicao(n)]
+        return _coluna(df_perdcomp, encontradas[0]) if encontradas else _coluna(df_perdcomp, None)
+
+    return _normalizar(
+        primeira(lambda n: n.startswith('cnpj')), primeira(lambda n: n.startswith('cod')), periodo,
+        texto_para_centavos(df_perdcomp[valor[0]]),
+        primeira(lambda n: 'perdcomp' in n or n.startswith(('numero', 'num_'))),
+        _coluna(df_perdcomp, 'ArquivoOrigem'), codigos,
+    )
+
+
+def _passadas():
+    """
+    (chaves do join, colunas vazias na esquerda, colunas vazias na direita) de cada
+    passada. Primeiro a chave completa; depois, só para as linhas com CNPJ ou código
+    vazio, o vazio vale como curinga: junta pelas chaves restantes, desde que o
+    campo esteja vazio em um dos lados (dois CNPJs preenchidos nunca se misturam).
+    """
+    yield [*_CHAVES_OPCIONAIS, 'PERIODO'], [], []
+    for faltam in (('Codigo',), ('CNPJ',), _CHAVES_OPCIONAIS):
+        chaves = [c for c in _CHAVES_OPCIONAIS if c not in faltam] + ['PERIODO']
+        for lados in product(('esquerda', 'direita'), repeat=len(faltam)):
+            yield (chaves, [c for c, lado in zip(faltam, lados) if lado == 'esquerda'],
+                   [c for c, lado in zip(faltam, lados) if lado == 'direita'])
+
+
+def _sem_pares():
+    return pd.DataFrame({'esquerda': pd.Series(dtype='int64'), 'direita': pd.Series(dtype='int64'),
+                         'exato': pd.Series(dtype=bool)})
+
+
+def casar(esquerda, direita, tolerancia=TOLERANCIA_PADRAO):
+    """
+    Casa, um para um, linhas de `esquerda` e `direita` (formato comum). Devolve
+    DataFrame (esquerda, direita, exato) com as posições de cada par.
+    """
+    vazias = {
+        lado: {c: df[c].isna().to_numpy() for c in _CHAVES_OPCIONAIS}
+        for lado, df in (('esquerda', esquerda), ('direita', direita))
+    }
+    livres = {'esquerda': np.ones(len(esquerda), dtype=bool), 'direita': np.ones(len(direita), dtype=bool)}
+    pares = []
+    for chaves, vazias_esquerda, vazias_direita in _passadas():
+        filtros = {}
+        for lado, colunas in (('esquerda', vazias_esquerda), ('direita', vazias_direita)):
+            filtros[lado] = livres[lado].copy()
+            for coluna in colunas:
+                filtros[lado] &= vazias[lado][coluna]
+        if not filtros['esquerda'].any() or not filtros['direita'].any():
+            continue
+        novos = _casar_por(esquerda[filtros['esquerda']], direita[filtros['direita']], chaves, tolerancia)
+        if novos.empty:
+            continue
+        livres['esquerda'][esquerda.index.get_indexer(novos['esquerda'])] = False
+        livres['direita'][direita.index.get_indexer(novos['direita'])] = False
+        pares.append(novos)
+    return pd.concat(pares, ignore_index=True) if pares else _sem_pares()
+
+
+def _casar_por(esquerda, direita, chaves, tolerancia):
+    # uma passada de `casar`: exatos por hash, depois o valor mais próximo até `tolerancia`
+    colunas = ['esquerda', 'direita', 'exato']
+    e = esquerda[chaves + ['Valor']].dropna(subset=chaves).assign(esquerda=lambda d: d.index)
+    d = direita[chaves + ['Valor']].dropna(subset=chaves).assign(direita=lambda d: d.index)
+    for lado in (e, d):
+        lado['PERIODO'] = lado['PERIODO'].astype('int64')
+        # a n-ésima repetição da chave de um lado casa com a n-ésima do outro
+        lado['_repeticao'] = lado.groupby(chaves + ['Valor'], sort=False).cumcount()
+
+    exatos = e.merge(d, on=chaves + ['Valor', '_repeticao'])[['esquerda', 'direita']]
+    pares = [exatos.assign(exato=True)]
+    if tolerancia > 0:
+        e = e[~e['esquerda'].isin(exatos['esquerda'])]
+        d = d[~d['direita'].isin(exatos['direita'])].rename(columns={'Valor': '_valor_direita'})
+        for _ in range(RODADAS_TOLERANCIA):
+            if e.empty or d.empty:
+                break
+            proximos = pd.merge_asof(
+                e.sort_values('Valor'), d.drop(columns='_repeticao').sort_values('_valor_direita'),
+                left_on='Valor', right_on='_valor_direita', by=chaves, direction='nearest', tolerance=tolerancia,
+            ).dropna(subset=['direita'])
+            if proximos.empty:
+                break
+            # vários débitos podem ter o mesmo pagamento como o mais próximo: fica o mais perto
+            proximos['_diferenca'] = (proximos['Valor'] - proximos['_valor_direita']).abs()
+            proximos = proximos.sort_values(['_diferenca', 'esquerda'], kind='stable').drop_duplicates('direita')
+            novos = proximos[['esquerda', 'direita']].astype('int64')
+            pares.append(novos.assign(exato=False))
+            e = e[~e['esquerda'].isin(novos['esquerda'])]
+            d = d[~d['direita'].isin(novos['direita'])]
+    return pd.concat(pares, ignore_index=True)[colunas]
+
+
+def _detalhe(origem, debitos, fonte, pagamentos, pares, sem_par):
+    """Linhas da tabela de detalhe para os débitos de `origem` (casados ou não)."""
+    lado = debitos.rename(columns={'Valor': 'ValorDCTF', 'Documento': 'DocumentoDCTF', 'Arquivo': 'ArquivoDCTF'})
+    pagos = pagamentos.loc[pares['direita'].to_numpy()]
+    lado['ValorPagamento'] = pd.Series(pagos['Valor'].to_numpy(), index=pares['esquerda'].to_numpy())
+    lado['DocumentoPagamento'] = pd.Series(pagos['Documento'].to_numpy(), index=pares['esquerda'].to_numpy())
+    lado['ArquivoPagamento'] = pd.Series(pagos['Arquivo'].to_numpy(), index=pares['esquerda'].to_numpy())
+    exato = pd.Series(pares['exato'].to_numpy(), index=pares['esquerda'].to_numpy())
+    lado['Situacao'] = exato.map({True: CONCILIADO, False: CONCILIADO_TOLERANCIA}).reindex(lado.index)
+    lado['FontePagamento'] = lado['Situacao'].notna().map({True: fonte, False: None})
+    if sem_par is not None:
+        lado['Situacao'] = lado['Situacao'].fillna(sem_par)
+    lado['Origem'] = origem
+    return lado
+
+
+def _sobras(fonte, pagamentos, usados):
+    lado = pagamentos[~pagamentos.index.isin(usados)].rename(columns={
+        'Valor': 'ValorPagamento', 'Documento': 'DocumentoPagamento', 'Arquivo': 'ArquivoPagamento'})
+    lado['Situacao'] = PAGAMENTO_SEM_DEBITO
+    lado['Origem'] = fonte
+    lado['FontePagamento'] = fonte
+    return lado
+
+
+@medir('conciliacao.gerar')
+def conciliar(df_dctf, df_darf=None, df_perdcomp=None, tolerancia=TOLERANCIA_PADRAO, codigos=CODIGOS_RECEITA):
+    """
+    Tabela de detalhe da conciliação (colunas em COLUNAS, valores em reais):
+    cada R11/R12 com o DARF/PER-DCOMP correspondente, cada R10 sem vinculação com
+    o pagamento que sobrou e os pagamentos que não casaram com nenhum débito.
+    """
+    with etapa('conciliacao.preparar'):
+        dctf = registros_dctf(df_dctf, codigos)
+        pagamentos = {'DARF': pagamentos_darf(df_darf, codigos), 'PER/DCOMP': pagamentos_perdcomp(df_perdcomp, codigos)}
+    usados = {fonte: set() for fonte in pagamentos}
+    partes = []
+    for origem, fonte in (('R11', 'DARF'), ('R12', 'PER/DCOMP')):
+        with etapa(f'conciliacao.{origem}', linhas=len(dctf[origem])):
+            livres = pagamentos[fonte].drop(index=list(usados[fonte]))
+            pares = casar(dctf[origem], livres, tolerancia)
+            usados[fonte].update(pares['direita'])
+            partes.append(_detalhe(origem, dctf[origem], fonte, pagamentos[fonte], pares, PAGAMENTO_NAO_ENCONTRADO))
+
+    # débitos sem vinculação: primeiro os DARF que sobraram, depois as PER/DCOMP
+    with etapa('conciliacao.R10', linhas=len(dctf['R10'])):
+        r10 = dctf['R10']
+        casados = []
+        for fonte in pagamentos:
+            livres = pagamentos[fonte].drop(index=list(usados[fonte]))
+            pendentes = r10.drop(index=[i for parte in casados for i in parte.index])
+            pares = casar(pendentes, livres, tolerancia)
+            usados[fonte].update(pares['direita'])
+            casados.append(_detalhe('R10', pendentes.loc[pares['esquerda']], fonte, pagamentos[fonte], pares, None))
+        restantes = r10.drop(index=[i for parte in casados for i in parte.index])
+        partes.extend(casados)
+        partes.append(_detalhe('R10', restantes, None, pagamentos['DARF'], _sem_pares(), DEBITO_SEM_PAGAMENTO))
+    for fonte, tabela in pagamentos.items():
+        partes.append(_sobras(fonte, tabela, usados[fonte]))
+
+    with etapa('conciliacao.montar') as registro:
+        detalhe = _montar(partes)
+        registro.linhas = len(detalhe)
+    return detalhe
+
+
+def _montar(partes):
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS)
+    detalhe = pd.concat(partes, ignore_index=True)
+    detalhe['Tributo'] = detalhe['Codigo'].map(CODIGOS_RECEITA)
+    detalhe = detalhe.rename(columns={'Codigo': 'CodReceita'}).reindex(columns=COLUNAS)
+    detalhe = detalhe.sort_values(['CNPJ', 'PERIODO', 'Tributo', 'Origem'], kind='stable', na_position='last')
+    for coluna in ('ValorDCTF', 'ValorPagamento'):
+        detalhe[coluna] = pd.to_numeric(detalhe[coluna]).astype('Int64')
+    detalhe['Diferenca'] = detalhe['ValorDCTF'].fillna(0) - detalhe['ValorPagamento'].fillna(0)
+    for coluna in ('ValorDCTF', 'ValorPagamento', 'Diferenca'):
+        detalhe[coluna] = centavos_para_reais(detalhe[coluna].astype('Float64'))
+    detalhe['PERIODO'] = para_texto(pd.array(detalhe['PERIODO'], dtype='Int64')).to_numpy()
+    return detalhe.reset_index(drop=True)
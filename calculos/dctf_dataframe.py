@@ -1,25 +1,79 @@
+import numpy as np
 import pandas as pd
-from .dctf_layouts import LAYOUTS_COMPLETOS
+from .dctf_layouts import LAYOUTS_COMPLETOS, CAMPOS_INTEIROS
 
-def parse_registro(linha, layout):
-    return {campo: linha[ini - 1:fim].strip() for campo, ini, fim in layout}
+def _fatiar(codigos, ini, fim):
+    # codigos: matriz (linhas x caracteres) de code points; fatia a coluna inteira de uma vez.
+    # Linhas em bytes chegam como uint8: em latin-1 o byte é o próprio code point
+    campo = np.ascontiguousarray(codigos[:, ini - 1:fim], dtype=np.uint32)
+    if campo.shape[1] == 0:
+        return np.full(len(codigos), "", dtype=object)
+    return np.char.strip(campo.view(f"U{campo.shape[1]}").ravel())
 
-def gerar_dataframes(conteudos):
-    registros_por_tipo = {k: [] for k in LAYOUTS_COMPLETOS}
+def _tipar(coluna, campo):
+    if campo in CAMPOS_INTEIROS or campo.startswith("Valor"):
+        # valores da DCTF vêm em centavos, sem separador decimal
+        return pd.to_numeric(pd.Series(coluna), errors="coerce").astype("Int64")
+    return coluna
+
+def decodificar_tipo(linhas, layout, tipado=False):
+    """
+    Decodifica todas as linhas de um mesmo tipo de registro, campo a campo.
+    As linhas podem vir em texto ou em bytes latin-1 (1 byte por caractere na matriz).
+    """
+    if isinstance(linhas[0], bytes):
+        linhas = np.asarray(linhas, dtype=bytes)
+        codigos = linhas.view(np.uint8).reshape(len(linhas), linhas.dtype.itemsize)
+    else:
+        linhas = np.asarray(linhas, dtype=str)
+        codigos = linhas.view(np.uint32).reshape(len(linhas), linhas.dtype.itemsize // 4)
+    colunas = {}
+    for campo, ini, fim in layout:
+        coluna = _fatiar(codigos, ini, fim)
+        colunas[campo] = _tipar(coluna, campo) if tipado else coluna
+    return colunas
+
+def decodificar_linhas(conteudos, tipado=False):
+    """Decodifica as linhas e devolve um DataFrame por tipo de registro presente."""
+    linhas_por_tipo = {k: [] for k in LAYOUTS_COMPLETOS}
+    origens_por_tipo = {k: [] for k in LAYOUTS_COMPLETOS}
     for nome, linhas in conteudos:
         for linha in linhas:
             tipo = linha[:3].strip()
-            if tipo in LAYOUTS_COMPLETOS:
-                registro = parse_registro(linha, LAYOUTS_COMPLETOS[tipo])
-                registro["ArquivoOrigem"] = nome
-                registros_por_tipo[tipo].append(registro)
+            if tipo in linhas_por_tipo:
+                linhas_por_tipo[tipo].append(linha)
+                origens_por_tipo[tipo].append(nome)
+    return decodificar_grupos(linhas_por_tipo, origens_por_tipo, tipado)
 
+def decodificar_grupos(linhas_por_tipo, origens, tipado=False):
+    """
+    Decodifica linhas já separadas por tipo de registro. `origens` é o nome do
+    arquivo de todas as linhas ou, por tipo, a lista com o arquivo de cada linha.
+    """
+    tabelas = {}
+    for tipo, layout in LAYOUTS_COMPLETOS.items():
+        if linhas_por_tipo.get(tipo):
+            dados = decodificar_tipo(linhas_por_tipo[tipo], layout, tipado)
+            dados["ArquivoOrigem"] = origens if isinstance(origens, str) else origens[tipo]
+            tabelas[tipo] = pd.DataFrame(dados)
+    return tabelas
+
+def montar_tabelas(partes, tipado=False):
+    """Junta, por tipo de registro, as tabelas de `decodificar_linhas` (na ordem recebida)."""
     tabelas = {}
     for tipo, layout in LAYOUTS_COMPLETOS.items():
         colunas = [campo for campo, _, _ in layout] + ["ArquivoOrigem"]
-        df = pd.DataFrame(registros_por_tipo[tipo] or [{}])
-        for col in colunas:
-            if col not in df.columns:
-                df[col] = ""
+        presentes = [parte[tipo] for parte in partes if tipo in parte]
+        if presentes:
+            df = pd.concat(presentes, ignore_index=True)
+        else:
+            # mesmo formato do parser antigo: uma linha vazia para tipos ausentes
+            dados = {col: [""] for col in colunas}
+            if tipado:
+                dados = {col: _tipar(np.array(v, dtype=object), col) for col, v in dados.items()}
+            df = pd.DataFrame(dados)
         tabelas[tipo] = df[colunas]
     return tabelas
+
+def gerar_dataframes(conteudos, tipado=False):
+    return montar_tabelas([decodificar_linhas(conteudos, tipado)], tipado)
@@ -44,3 +44,7 @@ LAYOUTS_COMPLETOS = {
     "R32": [("Tipo", 1, 3), ("CNPJ", 4, 17), ("ValorCompensadoQuota", 71, 84)],
     "T9":  [("Tipo", 1, 2), ("CNPJ", 3, 16), ("QtdRegistros", 32, 36)]
 }
+
+# campos numéricos inteiros; os campos "Valor*" são tratados como centavos
+CAMPOS_INTEIROS = {"MOFG", "InicioPeriodo", "FimPeriodo", "AnoApuracao", "MesPeriodo",
+                   "DiaPeriodo", "QtdRegistros"}
@@ -0,0 +1,38 @@
+# nomes dos campos dos registros da EFD-Contribuições (Guia Prático), na ordem do arquivo;
+# registros com mais de uma versão de leiaute são escolhidos pela quantidade de campos
+_M200_M600 = ["REG", "VL_TOT_CONT_NC_PER", "VL_TOT_CRED_DESC", "VL_TOT_CRED_DESC_ANT",
+              "VL_TOT_CONT_NC_DEV", "VL_RET_NC", "VL_OUT_DED_NC", "VL_CONT_NC_REC",
+              "VL_TOT_CONT_CUM_PER", "VL_RET_CUM", "VL_OUT_DED_CUM", "VL_CONT_CUM_REC",
+              "VL_TOT_CONT_REC"]
+
+
+def _m210(tributo, ajustes_bc):
+    # a partir de 2019 o M210/M610 ganhou os ajustes da base de cálculo
+    campos = ["REG", "COD_CONT", "VL_REC_BRT", "VL_BC_CONT"]
+    if ajustes_bc:
+        campos += [f"VL_AJUS_ACRES_BC_{tributo}", f"VL_AJUS_REDUC_BC_{tributo}", "VL_BC_CONT_AJUS"]
+    return campos + [f"ALIQ_{tributo}", f"QUANT_BC_{tributo}", f"ALIQ_{tributo}_QUANT",
+                     "VL_CONT_APUR", "VL_AJUS_ACRES", "VL_AJUS_REDUC", "VL_CONT_DIFER",
+                     "VL_CONT_DIFER_ANT", "VL_CONT_PER"]
+
+
+LAYOUTS_EFD = {
+    "0000": [["REG", "COD_VER", "TIPO_ESCRIT", "IND_SIT_ESP", "NUM_REC_ANTERIOR", "DT_INI",
+              "DT_FIN", "NOME", "CNPJ", "UF", "COD_MUN", "SUFRAMA", "IND_NAT_PJ", "IND_ATIV"]],
+    "M200": [_M200_M600],
+    "M210": [_m210("PIS", False), _m210("PIS", True)],
+    "M600": [_M200_M600],
+    "M610": [_m210("COFINS", False), _m210("COFINS", True)],
+}
+
+# prefixos dos campos numéricos: VL_* em centavos (Int64); ALIQ_* e QUANT_* em float
+PREFIXOS_VALOR = ("VL_",)
+PREFIXOS_DECIMAL = ("ALIQ_", "QUANT_")
+
+
+def layout_registro(reg, quantidade):
+    """Nomes dos campos de uma linha do registro `reg` com `quantidade` campos; None se não há leiaute."""
+    for layout in LAYOUTS_EFD.get(reg, ()):
+        if len(layout) == quantidade:
+            return layout
+    return None
@@ -0,0 +1,121 @@
+"""
+Cruzamento incremental: mantém agregados parciais por arquivo e por período para
+que incluir, trocar ou remover um arquivo recalcule só os períodos afetados.
+"""
+import pandas as pd
+
+from utils.instrumentacao import etapa
+
+from .resumo import agregar_fonte, calcular_linhas, colunas_valores, finalizar_resumo
+
+_COLUNAS_EFD = ('[EFD] PIS', '[EFD] COFINS')
+
+
+def chave_arquivo(arquivo):
+    """Identifica um upload: o file_id do Streamlit muda a cada novo envio, mesmo com o mesmo nome."""
+    file_id = getattr(arquivo, 'file_id', None)
+    if file_id is not None:
+        return file_id
+    return (getattr(arquivo, 'name', None), getattr(arquivo, 'size', None))
+
+
+class ReconciliacaoIncremental:
+    """
+    Guarda, para cada (fonte, arquivo), as somas em centavos por (PERIODO, COLUNA)
+    e, para cada período, as somas acumuladas e a linha do resumo já calculada.
+
+    Incluir, trocar ou remover um arquivo custa a agregação desse arquivo e o
+    recálculo das linhas dos períodos em que ele tem valores; `resumo()` só
+    reordena as linhas prontas e refaz o TOTAL.
+    """
+
+    def __init__(self):
+        self._parciais = {}
+        # (periodo, coluna) -> [centavos, quantidade de parciais que contribuem]
+        self._somas = {}
+        self._linhas = {}
+        self._alterados = set()
+        self._resumo = None
+        self._dctfweb = False
+
+    def arquivos(self, fonte=None):
+        return [chave for f, chave in self._parciais if fonte is None or f == fonte]
+
+    def atualizar_arquivo(self, fonte, chave, df):
+        """Inclui ou substitui o arquivo `chave` da `fonte`; devolve os períodos afetados."""
+        afetados = self._retirar(fonte, chave)
+        parcial = agregar_fonte(fonte, df)
+        self._parciais[(fonte, chave)] = parcial
+        for (periodo, coluna), valor in parcial.items():
+            soma = self._somas.setdefault((periodo, coluna), [0, 0])
+            soma[0] += int(valor)
+            soma[1] += 1
+            afetados.add(periodo)
+        self._alterados |= afetados
+        return afetados
+
+    def remover_arquivo(self, fonte, chave):
+        afetados = self._retirar(fonte, chave)
+        self._alterados |= afetados
+        return afetados
+
+    def sincronizar(self, fonte, arquivos, carregar):
+        """
+        Deixa a `fonte` com exatamente os `arquivos` informados: remove os que saíram
+        e carrega (com `carregar(arquivo) -> DataFrame`) só os que entraram.
+        """
+        atuais = {chave_arquivo(arquivo): arquivo for arquivo in arquivos or []}
+        for chave in set(self.arquivos(fonte)) - set(atuais):
+            self.remover_arquivo(fonte, chave)
+        for chave, arquivo in atuais.items():
+            if (fonte, chave) not in self._parciais:
+                self.atualizar_arquivo(fonte, chave, carregar(arquivo))
+
+    def resumo(self):
+        dctfweb = bool(self.arquivos('dctfweb'))
+        if dctfweb != self._dctfweb:
+            # as colunas da DCTFWeb entraram ou saíram: todas as linhas mudam de formato
+            self._dctfweb = dctfweb
+            self._alterados |= set(self._linhas)
+            self._resumo = None
+        if self._resumo is not None and not self._alterados:
+            return self._resumo
+        with etapa('resumo.incremental', periodos_recalculados=len(self._alterados)) as registro:
+            self._recalcular(self._alterados)
+            self._alterados = set()
+            if self._linhas:
+                linhas = pd.concat(self._linhas.values(), ignore_index=True)
+            else:
+                linhas = calcular_linhas(pd.DataFrame(columns=colunas_valores(dctfweb)), dctfweb)
+            with etapa('resumo.totais', linhas=len(linhas)):
+                self._resumo = finalizar_resumo(linhas)
+            registro.linhas = len(self._resumo)
+        return self._resumo
+
+    def _retirar(self, fonte, chave):
+        parcial = self._parciais.pop((fonte, chave), None)
+        if parcial is None:
+            return set()
+        for (periodo, coluna), valor in parcial.items():
+            soma = self._somas[(periodo, coluna)]
+            soma[0] -= int(valor)
+            soma[1] -= 1
+            if soma[1] == 0:
+                del self._somas[(periodo, coluna)]
+        return {periodo for periodo, _ in parcial.index}
+
+    def _recalcular(self, periodos):
+        # só entram no resumo os períodos com EFD, como em gerar_df_resumo
+        somas = {}
+        for periodo in periodos:
+            self._linhas.pop(periodo, None)
+            if any((periodo, coluna) in self._somas for coluna in _COLUNAS_EFD):
+                somas[periodo] = {
+                    coluna: self._somas[(periodo, coluna)][0]
+                    for coluna in colunas_valores(self._dctfweb) if (periodo, coluna) in self._somas
+                }
+        if not somas:
+            return
+        linhas = calcular_linhas(pd.DataFrame.from_dict(somas, orient='index'), self._dctfweb)
+        for indice, periodo in enumerate(linhas['PERIODO']):
+            self._linhas[periodo] = linhas.iloc[[indice]]
@@ -2,137 +2,257 @@
 
 import pandas as pd
 
+from utils.instrumentacao import etapa, medir
+from utils.moeda import centavos_para_reais, digitos_para_centavos, texto_para_centavos
+from utils.periodos import chaves_periodo, para_texto
+
+# código de receita (4 primeiros dígitos) -> tributo
+CODIGOS_RECEITA = {'8109': 'PIS', '6912': 'PIS', '2172': 'COFINS', '5856': 'COFINS'}
+
+# registros da EFD com o total da contribuição a recolher (coluna 12)
+REGISTROS_EFD = {'M200': 'PIS', 'M600': 'COFINS'}
+
+FONTES = ['EFD', 'DCTF', 'DARF', 'SUSPENSÃO', 'PARCELAMENTOS', 'PERDCOMP']
+COLUNAS_VALORES = [f'[{fonte}] {tributo}' for fonte in FONTES for tributo in ('PIS', 'COFINS')]
+
+# débitos da DCTFWeb: as colunas só entram no resumo quando a fonte é informada
+COLUNAS_DCTFWEB = ['[DCTFWEB] PIS', '[DCTFWEB] COFINS']
+
+
+# colunas somadas como pagamento de cada tributo nas divergências
+FONTES_PAGAMENTO = ['DARF', 'PERDCOMP', 'PARCELAMENTOS']
+
+
+def divergencias(dctfweb=False):
+    """[(coluna da divergência, coluna declarada, tributo)]: declarado - pagamentos do tributo."""
+    declarantes = ['EFD', 'DCTF'] + (['DCTFWEB'] if dctfweb else [])
+    return [
+        (f'[DIVERGÊNCIA {fonte}] {tributo}', f'[{fonte}] {tributo}', tributo)
+        for fonte in declarantes for tributo in ('PIS', 'COFINS')
+    ]
+
+
+def colunas_valores(dctfweb=False):
+    """Colunas de valores do resumo; com a DCTFWeb, logo depois das da DCTF."""
+    if not dctfweb:
+        return COLUNAS_VALORES
+    posicao = COLUNAS_VALORES.index('[DCTF] COFINS') + 1
+    return COLUNAS_VALORES[:posicao] + COLUNAS_DCTFWEB + COLUNAS_VALORES[posicao:]
+
+
+def _mapear_unicos(serie, funcao):
+    # aplica `funcao` só uma vez por valor distinto (há poucos períodos distintos)
+    unicos = pd.unique(serie)
+    return serie.map(dict(zip(unicos, funcao(pd.Series(unicos)))))
+
+
+def _linhas(fonte, periodo, tributo, valor):
+    """
+    Monta o formato longo (PERIODO, COLUNA, VALOR) de uma fonte, já classificado.
+    `periodo` são as chaves AAAAMM (utils.periodos); sem período a linha não entra.
+    """
+    mask = tributo.notna() & periodo.notna()
+    return pd.DataFrame({
+        'PERIODO': periodo[mask].astype('int64'),
+        'COLUNA': f'[{fonte}] ' + tributo[mask],
+        'VALOR': valor[mask],
+    })
+
+
+def _classificar_codigo(codigos):
+    return _mapear_unicos(codigos, lambda u: u.astype(str).str[:4].map(CODIGOS_RECEITA))
+
+
+def _linhas_efd(df_efd):
+    if df_efd is None or df_efd.empty:
+        return None
+    if 'REG' in df_efd.columns:
+        # esquema tipado: REG/PERIODO categóricos, VL_TOT_CONT_REC já em centavos
+        tributo = df_efd['REG'].astype(object).map(REGISTROS_EFD)
+        mask = tributo.notna()
+        efd = df_efd.loc[mask]
+        # sem nenhum M200/M600 no leiaute de 13 campos a coluna não existe: os totais são 0,
+        # como no formato posicional
+        if 'VL_TOT_CONT_REC' in efd.columns:
+            valor = efd['VL_TOT_CONT_REC'].fillna(0).astype('int64')
+        else:
+            valor = pd.Series(0, index=efd.index, dtype='int64')
+        return _linhas('EFD', chaves_periodo(efd['PERIODO'], 'ddmmaaaa'), tributo[mask], valor)
+    # formato posicional (tipado=False): registro na coluna 0, total na 12
+    tributo = df_efd[0].map(REGISTROS_EFD)
+    mask = tributo.notna()
+    efd = df_efd.loc[mask, ['PERIODO', 12]]
+    periodo = chaves_periodo(efd['PERIODO'], 'ddmmaaaa')
+    return _linhas('EFD', periodo, tributo[mask], texto_para_centavos(efd[12]))
+
+
+def _linhas_dctf(df_dctf):
+    if df_dctf is None or df_dctf.empty:
+        return None
+    r10 = df_dctf[df_dctf['Tipo'] == 'R10']
+    tributo = _classificar_codigo(r10['CodReceita'])
+    periodo = chaves_periodo(r10['MOFG'], 'aaaamm')
+    return _linhas('DCTF', periodo, tributo, digitos_para_centavos(r10['ValorDebito']))
+
+
+def _linhas_dctfweb(df_dctfweb):
+    if df_dctfweb is None or df_dctfweb.empty:
+        return None
+    debitos = df_dctfweb[df_dctfweb['Tipo'] == 'DEBITO']
+    tributo = _classificar_codigo(debitos['CodReceita'])
+    valor = debitos['Valor'].fillna(0).astype('int64')
+    return _linhas('DCTFWEB', chaves_periodo(debitos['PERIODO'], 'ddmmaaaa'), tributo, valor)
+
+
+def _linhas_darf(df_darf):
+    if df_darf is None or df_darf.empty:
+        return None
+    darf = df_darf.rename(columns={'Período Apuração': 'PeriodoApuracao', 'Código': 'Codigo'})
+    tributo = _classificar_codigo(darf['Codigo'])
+    periodo = chaves_periodo(darf['PeriodoApuracao'], 'data')
+    return _linhas('DARF', periodo, tributo, texto_para_centavos(darf['PrincipalItem']))
+
+
+def _linhas_perdcomp(df_perdcomp):
+    if df_perdcomp is None or df_perdcomp.empty:
+        return None
+    if '_periodos_convertidos' in df_perdcomp.columns:
+        periodo = chaves_periodo(df_perdcomp['_periodos_convertidos'], 'mm/aaaa')
+    elif 'PERIODO' in df_perdcomp.columns:
+        periodo = chaves_periodo(df_perdcomp['PERIODO'], 'ddmmaaaa')
+    else:
+        return None
+    # detectar código e valor na planilha
+    code_cols = [c for c in df_perdcomp.columns if c.lower().startswith('cod')]
+    val_cols = [c for c in df_perdcomp.columns if 'valor_principal' in c.lower()]
+    if not val_cols:
+        return None
+    valor = texto_para_centavos(df_perdcomp[val_cols[0]])
+    if code_cols:
+        tributo = _classificar_codigo(df_perdcomp[code_cols[0]])
+        return _linhas('PERDCOMP', periodo, tributo, valor)
+    # sem coluna de código, soma geral em ambos
+    return pd.concat([
+        _linhas('PERDCOMP', periodo, pd.Series('PIS', index=periodo.index), valor),
+        _linhas('PERDCOMP', periodo, pd.Series('COFINS', index=periodo.index), valor),
+    ])
+
+
+_LINHAS_POR_FONTE = {
+    'efd': _linhas_efd, 'dctf': _linhas_dctf, 'darf': _linhas_darf, 'perdcomp': _linhas_perdcomp,
+    'dctfweb': _linhas_dctfweb,
+}
+
+
+def agregar_fonte(fonte, df):
+    """
+    Somas em centavos de uma única fonte ('efd', 'dctf', 'darf', 'perdcomp' ou 'dctfweb'),
+    indexadas por (PERIODO, COLUNA). Usada para agregados parciais por arquivo.
+    """
+    with etapa(f'resumo.classificar.{fonte}', linhas=None if df is None else len(df)):
+        linhas = _LINHAS_POR_FONTE[fonte](df)
+    if linhas is None or linhas.empty:
+        return pd.Series(dtype='int64')
+    with etapa('resumo.agregar', linhas=len(linhas)):
+        return linhas.groupby(['PERIODO', 'COLUNA'], sort=False)['VALOR'].sum()
+
+
+def agregar_fontes(df_efd, df_dctf, df_darf, df_perdcomp, df_dctfweb=None):
+    """
+    Classifica as linhas de todas as fontes e soma por (PERIODO, coluna do resumo)
+    numa única agregação. Devolve um DataFrame largo indexado pela chave AAAAMM do
+    período (utils.periodos), em centavos.
+    """
+    colunas = colunas_valores(df_dctfweb is not None)
+    fontes = (('efd', df_efd), ('dctf', df_dctf), ('darf', df_darf), ('perdcomp', df_perdcomp), ('dctfweb', df_dctfweb))
+    partes = []
+    for fonte, df in fontes:
+        with etapa(f'resumo.classificar.{fonte}', linhas=None if df is None else len(df)):
+            parte = _LINHAS_POR_FONTE[fonte](df)
+        if parte is not None:
+            partes.append(parte)
+    if not partes:
+        return pd.DataFrame(columns=colunas, dtype='int64')
+    with etapa('resumo.agregar') as registro:
+        longo = pd.concat(partes, ignore_index=True)
+        registro.linhas = len(longo)
+        longo['COLUNA'] = pd.Categorical(longo['COLUNA'], categories=colunas)
+        somas = longo.groupby(['PERIODO', 'COLUNA'], observed=True, sort=False)['VALOR'].sum()
+        return somas.unstack('COLUNA').reindex(columns=colunas)
+
+
+def calcular_linhas(somas, dctfweb=None):
+    """
+    Linhas do resumo, em centavos, para os períodos de `somas` (DataFrame largo
+    indexado pela chave AAAAMM do período): colunas ausentes viram zero e as
+    divergências são calculadas.
+    `dctfweb` inclui as colunas da DCTFWeb (None: se `somas` as tiver).
+    """
+    if dctfweb is None:
+        dctfweb = any(coluna in somas.columns for coluna in COLUNAS_DCTFWEB)
+    resumo = somas.reindex(columns=colunas_valores(dctfweb)).fillna(0).astype('int64')
+    resumo.columns = list(resumo.columns)
+    resumo.index.name = 'PERIODO'
+    resumo = resumo.reset_index()
+
+    # --- DIVERGÊNCIAS ---
+    for nome, declarado, tributo in divergencias(dctfweb):
+        pago = [f'[{fonte}] {tributo}' for fonte in FONTES_PAGAMENTO]
+        resumo[nome] = resumo[declarado] - (resumo[pago[0]] + resumo[pago[1]] + resumo[pago[2]])
+    return resumo
+
+
+def finalizar_resumo(resumo):
+    """
+    Ordena as linhas pela chave do período, exibe o período como '01MMAAAA',
+    acrescenta a linha TOTAL e converte centavos em reais.
+    """
+    resumo = resumo.sort_values('PERIODO', kind='stable').reset_index(drop=True)
+    resumo['PERIODO'] = para_texto(resumo['PERIODO'])
+    # linha de totais
+    num_cols = [c for c in resumo.columns if c!='PERIODO']
+    tot = resumo[num_cols].sum().to_frame().T
+    tot.insert(0,'PERIODO','TOTAL')
+    resumo = pd.concat([resumo, tot], ignore_index=True)
+    resumo[num_cols] = centavos_para_reais(resumo[num_cols].astype('int64'))
+
+    return resumo
+
+
+def montar_resumo(somas):
+    """
+    Monta o resumo final a partir das somas em centavos por período (saída de
+    `agregar_fontes`): os períodos são os da EFD, as demais fontes entram zeradas
+    onde faltarem. Divergências e totais são calculados em centavos e só no fim
+    convertidos para reais.
+    """
+    efd = somas[['[EFD] PIS', '[EFD] COFINS']].dropna(how='all')
+    periodos = efd.index.sort_values()
+    with etapa('resumo.divergencias', linhas=len(periodos)):
+        linhas = calcular_linhas(somas.reindex(index=periodos))
+    with etapa('resumo.totais', linhas=len(linhas)):
+        return finalizar_resumo(linhas)
+
+
+@medir('resumo.gerar')
 def gerar_df_resumo(
     df_efd: pd.DataFrame,
     df_dctf: pd.DataFrame,
     df_darf: pd.DataFrame,
-    df_perdcomp: pd.DataFrame
+    df_perdcomp: pd.DataFrame,
+    df_dctfweb: pd.DataFrame = None
 ) -> pd.DataFrame:
     """
     Gera o DataFrame de resumo contendo:
-      - PERIODO: valor da coluna 5 do registro '0000'
+      - PERIODO: mês de apuração ('01MMAAAA'; na EFD, a coluna 5 do registro '0000'),
+        com as fontes cruzadas e ordenadas pela chave AAAAMM (utils.periodos)
       - [EFD] PIS/COFINS: somatórios da EFD por PERIODO
       - [DCTF] PIS/COFINS: somatórios da DCTF por PERIODO
       - [DARF] PIS/COFINS: somatórios da DARF por PERIODO
       - [PERDCOMP] PIS/COFINS: somatórios da planilha PER/DCOMP por PERIODO
       - [SUSPENSÃO] e [PARCELAMENTOS]: colunas zeradas
       - [DIVERGÊNCIA EFD] e [DIVERGÊNCIA DCTF]: cálculos de diferenças
+      - só com `df_dctfweb`: [DCTFWEB] PIS/COFINS (débitos dos XML da DCTFWeb)
+        e [DIVERGÊNCIA DCTFWEB]
     """
-    # Funções auxiliares
-    def fmt_periodo_txt(texto):
-        # transforma 'MM/YYYY' em '01MMYYYY'
-        return f"01{texto.replace('/', '')}" if isinstance(texto, str) else None
-
-    def parse_num(v):
-        s = str(v).replace('.', '').replace(',', '.')
-        try:
-            return float(s)
-        except:
-            return 0.0
-
-    # --- EFD ---
-    if df_efd is None or df_efd.empty:
-        resumo = pd.DataFrame(columns=["PERIODO", "[EFD] PIS", "[EFD] COFINS"])
-    else:
-        efd = df_efd.copy()
-        efd[12] = pd.to_numeric(
-            efd[12].astype(str).str.replace('.', '').str.replace(',', '.'),
-            errors='coerce'
-        ).fillna(0.0)
-        pis = (
-            efd[efd[0] == 'M200'].groupby('PERIODO')[12].sum()
-            .reset_index().rename(columns={12: '[EFD] PIS'})
-        )
-        cof = (
-            efd[efd[0] == 'M600'].groupby('PERIODO')[12].sum()
-            .reset_index().rename(columns={12: '[EFD] COFINS'})
-        )
-        resumo = pd.merge(pis, cof, on='PERIODO', how='outer').fillna(0)
-
-    # --- DCTF ---
-    def fmt_periodo(mofg):
-        try:
-            x = int(mofg)
-            ano, mes = divmod(x, 100)
-            return f"01{mes:02d}{ano}"
-        except:
-            return None
-
-    dctf_pis = pd.DataFrame(columns=['PERIODO', '[DCTF] PIS'])
-    dctf_cof = pd.DataFrame(columns=['PERIODO', '[DCTF] COFINS'])
-    if df_dctf is not None and not df_dctf.empty:
-        dctf = df_dctf.copy()
-        dctf['PERIODO'] = dctf['MOFG'].apply(fmt_periodo)
-        dctf['ValorDebito'] = dctf['ValorDebito'].apply(parse_num)
-        mask_r10_pis = (dctf['Tipo']=='R10') & dctf['CodReceita'].astype(str).str[:4].isin(['8109','6912'])
-        mask_r10_cof = (dctf['Tipo']=='R10') & dctf['CodReceita'].astype(str).str[:4].isin(['2172','5856'])
-        dctf_pis = dctf[mask_r10_pis].groupby('PERIODO')['ValorDebito'].sum().reset_index().rename(columns={'ValorDebito':'[DCTF] PIS'})
-        dctf_cof = dctf[mask_r10_cof].groupby('PERIODO')['ValorDebito'].sum().reset_index().rename(columns={'ValorDebito':'[DCTF] COFINS'})
-    resumo = resumo.merge(dctf_pis, on='PERIODO', how='left').fillna({'[DCTF] PIS':0})
-    resumo = resumo.merge(dctf_cof, on='PERIODO', how='left').fillna({'[DCTF] COFINS':0})
-
-    # --- DARF ---
-    darf_pis = pd.DataFrame(columns=['PERIODO', '[DARF] PIS'])
-    darf_cof = pd.DataFrame(columns=['PERIODO', '[DARF] COFINS'])
-    if df_darf is not None and not df_darf.empty:
-        darf = df_darf.copy()
-        if 'Período Apuração' in darf.columns:
-            darf = darf.rename(columns={'Período Apuração':'PeriodoApuracao'})
-        if 'Código' in darf.columns:
-            darf = darf.rename(columns={'Código':'Codigo'})
-        darf['Periodo_dt'] = pd.to_datetime(darf['PeriodoApuracao'], dayfirst=True, errors='coerce')
-        darf['PERIODO'] = '01' + darf['Periodo_dt'].dt.strftime('%m%Y')
-        darf['PrincipalItem'] = darf['PrincipalItem'].apply(parse_num)
-        mask_darf_pis = darf['Codigo'].astype(str).str[:4].isin(['8109','6912'])
-        mask_darf_cof = darf['Codigo'].astype(str).str[:4].isin(['2172','5856'])
-        darf_pis = darf[mask_darf_pis].groupby('PERIODO')['PrincipalItem'].sum().reset_index().rename(columns={'PrincipalItem':'[DARF] PIS'})
-        darf_cof = darf[mask_darf_cof].groupby('PERIODO')['PrincipalItem'].sum().reset_index().rename(columns={'PrincipalItem':'[DARF] COFINS'})
-    resumo = resumo.merge(darf_pis, on='PERIODO', how='left').fillna({'[DARF] PIS':0})
-    resumo = resumo.merge(darf_cof, on='PERIODO', how='left').fillna({'[DARF] COFINS':0})
-
-    # --- SUSPENSÃO e PARCELAMENTOS ---
-    for col in ['[SUSPENSÃO] PIS','[SUSPENSÃO] COFINS','[PARCELAMENTOS] PIS','[PARCELAMENTOS] COFINS']:
-        resumo[col] = 0.0
-
-    # --- PERDCOMP (planilha) ---
-    perd_pis = pd.DataFrame(columns=['PERIODO','[PERDCOMP] PIS'])
-    perd_cof = pd.DataFrame(columns=['PERIODO','[PERDCOMP] COFINS'])
-    if df_perdcomp is not None and not df_perdcomp.empty:
-        pc = df_perdcomp.copy()
-        if '_periodos_convertidos' in pc.columns:
-            pc['PERIODO'] = pc['_periodos_convertidos'].apply(fmt_periodo_txt)
-        # detectar código e valor na planilha
-        code_cols = [c for c in pc.columns if c.lower().startswith('cod')]
-        val_cols = [c for c in pc.columns if 'valor_principal' in c.lower()]
-        if val_cols:
-            pc[val_cols[0]] = pc[val_cols[0]].apply(parse_num)
-            if code_cols:
-                codigo = code_cols[0]
-                mask_pc_pis = pc[codigo].astype(str).str[:4].isin(['8109','6912'])
-                mask_pc_cof = pc[codigo].astype(str).str[:4].isin(['2172','5856'])
-                perd_pis = pc[mask_pc_pis].groupby('PERIODO')[val_cols[0]].sum().reset_index().rename(columns={val_cols[0]:'[PERDCOMP] PIS'})
-                perd_cof = pc[mask_pc_cof].groupby('PERIODO')[val_cols[0]].sum().reset_index().rename(columns={val_cols[0]:'[PERDCOMP] COFINS'})
-            else:
-                # sem coluna de código, soma geral em ambos
-                tot = pc.groupby('PERIODO')[val_cols[0]].sum().reset_index()
-                perd_pis = tot.rename(columns={val_cols[0]:'[PERDCOMP] PIS'})
-                perd_cof = tot.rename(columns={val_cols[0]:'[PERDCOMP] COFINS'})
-    resumo = resumo.merge(perd_pis, on='PERIODO', how='left').fillna({'[PERDCOMP] PIS':0})
-    resumo = resumo.merge(perd_cof, on='PERIODO', how='left').fillna({'[PERDCOMP] COFINS':0})
-
-    # --- DIVERGÊNCIAS ---
-    resumo['[DIVERGÊNCIA EFD] PIS'] = resumo['[EFD] PIS'] - (resumo['[DARF] PIS'] + resumo['[PERDCOMP] PIS'] + resumo['[PARCELAMENTOS] PIS'])
-    resumo['[DIVERGÊNCIA EFD] COFINS'] = resumo['[EFD] COFINS'] - (resumo['[DARF] COFINS'] + resumo['[PERDCOMP] COFINS'] + resumo['[PARCELAMENTOS] COFINS'])
-    resumo['[DIVERGÊNCIA DCTF] PIS'] = resumo['[DCTF] PIS'] - (resumo['[DARF] PIS'] + resumo['[PERDCOMP] PIS'] + resumo['[PARCELAMENTOS] PIS'])
-    resumo['[DIVERGÊNCIA DCTF] COFINS'] = resumo['[DCTF] COFINS'] - (resumo['[DARF] COFINS'] + resumo['[PERDCOMP] COFINS'] + resumo['[PARCELAMENTOS] COFINS'])
-
-    # ordenação e totais
-    resumo['Periodo_dt'] = pd.to_datetime(resumo['PERIODO'], format='%d%m%Y', errors='coerce')
-    resumo = resumo.sort_values('Periodo_dt').drop(columns=['Periodo_dt']).reset_index(drop=True)
-    # linha de totais
-    num_cols = [c for c in resumo.columns if c!='PERIODO']
-    tot = resumo[num_cols].sum().to_frame().T
-    tot.insert(0,'PERIODO','TOTAL')
-    resumo = pd.concat([resumo, tot], ignore_index=True)
-
-    return resumo
+    return montar_resumo(agregar_fontes(df_efd, df_dctf, df_darf, df_perdcomp, df_dctfweb))
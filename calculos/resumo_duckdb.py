@@ -0,0 +1,225 @@
+"""
+Cruzamento fora da memória, para lotes em que as fontes não cabem em DataFrames.
+
+As linhas classificadas de cada arquivo (o formato longo PERIODO, COLUNA, VALOR de
+calculos.resumo) são gravadas em Parquet, particionadas por CNPJ e período; a soma
+por período, o filtro dos períodos da EFD e as divergências rodam no DuckDB, com
+limite de memória e transbordo em disco. O resultado volta em lotes, uma empresa
+por vez, e sai idêntico ao de gerar_df_resumo.
+
+    armazem = ArmazemParquet("cruzamento_parquet")
+    armazem.incluir("efd", cnpj, arquivo.name, df_efd)    # um arquivo por vez
+    for cnpj, resumo in gerar_resumos_duckdb(armazem):
+        ...
+
+O DuckDB e o pyarrow são opcionais (pip install duckdb pyarrow); ver `duckdb_disponivel`.
+"""
+import hashlib
+import re
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from utils.instrumentacao import etapa
+
+from .resumo import (
+    FONTES_PAGAMENTO, _LINHAS_POR_FONTE, calcular_linhas, colunas_valores, divergencias, finalizar_resumo,
+)
+
+LIMITE_MEMORIA_PADRAO = "2GB"
+LINHAS_POR_LOTE = 100_000
+
+_CARACTERES_CAMINHO = re.compile(r"[^\w-]")
+
+
+def duckdb_disponivel():
+    # o Parquet é gravado (ArmazemParquet.incluir) e lido em lotes (to_arrow_reader) com o pyarrow
+    try:
+        import duckdb  # noqa: F401
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ArmazemParquet:
+    """
+    Diretório com as linhas classificadas das fontes em Parquet, em
+    CNPJ=<cnpj>/PERIODO=<AAAAMM>/<fonte>-<arquivo>.parquet. Incluir de novo o mesmo
+    arquivo substitui as linhas dele; cada arquivo é classificado sozinho, então a
+    memória usada é a do maior arquivo, não a do lote.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+
+    def _nome(self, fonte, arquivo):
+        return f"{fonte}-{hashlib.sha1(str(arquivo).encode()).hexdigest()[:16]}.parquet"
+
+    def incluir(self, fonte, cnpj, arquivo, df):
+        """Classifica `df` (um arquivo da `fonte`) e grava as linhas; devolve quantas."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.remover(fonte, cnpj, arquivo)
+        with etapa(f"duckdb.gravar.{fonte}", linhas=None if df is None else len(df)) as registro:
+            linhas = _LINHAS_POR_FONTE[fonte](df)
+            if linhas is None or linhas.empty:
+                registro.linhas = 0
+                return 0
+            nome = self._nome(fonte, arquivo)
+            empresa = self.diretorio / f"CNPJ={_CARACTERES_CAMINHO.sub('_', str(cnpj))}"
+            for periodo, parte in linhas.groupby("PERIODO", sort=False):
+                particao = empresa / f"PERIODO={int(periodo)}"
+                particao.mkdir(parents=True, exist_ok=True)
+                tabela = pa.table({
+                    "COLUNA": pa.array(parte["COLUNA"].astype(str), pa.string()),
+                    "VALOR": pa.array(parte["VALOR"], pa.int64()),
+                })
+                pq.write_table(tabela, particao / nome)
+            registro.linhas = len(linhas)
+        return len(linhas)
+
+    def remover(self, fonte, cnpj, arquivo):
+        empresa = self.diretorio / f"CNPJ={_CARACTERES_CAMINHO.sub('_', str(cnpj))}"
+        for caminho in empresa.glob(f"PERIODO=*/{self._nome(fonte, arquivo)}"):
+            caminho.unlink()
+
+    def arquivos(self):
+        return sorted(self.diretorio.glob("CNPJ=*/PERIODO=*/*.parquet"))
+
+    def cnpjs(self):
+        return sorted({caminho.parts[-3].partition("=")[2] for caminho in self.arquivos()})
+
+    def limpar(self):
+        for empresa in self.diretorio.glob("CNPJ=*"):
+            shutil.rmtree(empresa, ignore_errors=True)
+
+
+def _identificador(nome):
+    return '"' + nome.replace('"', '""') + '"'
+
+
+def _texto(valor):
+    return "'" + valor.replace("'", "''") + "'"
+
+
+def sql_resumo(fonte_sql, dctfweb=False):
+    """
+    SQL das linhas do resumo em centavos (CNPJ, PERIODO, colunas de valores e
+    divergências), ordenadas por CNPJ e período: a mesma lógica de agregar_fontes,
+    montar_resumo e calcular_linhas.
+    """
+    colunas = colunas_valores(dctfweb)
+    somas = ",\n        ".join(
+        f"coalesce(sum(VALOR) FILTER (WHERE COLUNA = {_texto(c)}), 0)::BIGINT AS {_identificador(c)}"
+        for c in colunas
+    )
+    calculadas = ",\n    ".join(
+        f"{_identificador(declarado)} - ("
+        + " + ".join(_identificador(f"[{fonte}] {tributo}") for fonte in FONTES_PAGAMENTO)
+        + f") AS {_identificador(nome)}"
+        for nome, declarado, tributo in divergencias(dctfweb)
+    )
+    efd = ", ".join(_texto(f"[EFD] {tributo}") for tributo in ("PIS", "COFINS"))
+    return f"""
+WITH somas AS (
+    SELECT
+        CNPJ,
+        PERIODO,
+        {somas}
+    FROM {fonte_sql}
+    GROUP BY CNPJ, PERIODO
+    -- só os períodos com EFD entram no resumo
+    HAVING count(*) FILTER (WHERE COLUNA IN ({efd})) > 0
+)
+SELECT
+    *,
+    {calculadas}
+FROM somas
+ORDER BY CNPJ, PERIODO
+"""
+
+
+def _conectar(limite_memoria, diretorio_temporario, threads):
+    import duckdb
+
+    config = {"memory_limit": limite_memoria, "preserve_insertion_order": False}
+    if diretorio_temporario is not None:
+        config["temp_directory"] = str(diretorio_temporario)
+    if threads is not None:
+        config["threads"] = threads
+    return duckdb.connect(config=config)
+
+
+def gerar_resumos_duckdb(armazem, cnpjs=None, dctfweb=None, limite_memoria=LIMITE_MEMORIA_PADRAO,
+                         diretorio_temporario=None, threads=None, linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Gera (cnpj, resumo) para cada empresa de `cnpjs` (padrão: todas as do armazém),
+    em ordem de CNPJ, lendo o resultado do DuckDB em lotes de `linhas_por_lote`.
+    Cada resumo é igual ao de gerar_df_resumo com as fontes dessa empresa; sem
+    períodos com EFD, só a linha TOTAL. `dctfweb` inclui as colunas da DCTFWeb
+    (None: se o armazém tiver linhas dela).
+    """
+    cnpjs = sorted(armazem.cnpjs() if cnpjs is None else {str(c) for c in cnpjs})
+    if not cnpjs:
+        return
+    if not armazem.arquivos():
+        for cnpj in cnpjs:
+            yield cnpj, _finalizar([], bool(dctfweb))
+        return
+    arquivos = _texto(str(armazem.diretorio / "CNPJ=*" / "PERIODO=*" / "*.parquet"))
+    fonte_sql = (
+        f"(SELECT * FROM read_parquet({arquivos}, hive_partitioning = true, "
+        "hive_types = {'CNPJ': VARCHAR, 'PERIODO': INTEGER}) "
+        f"WHERE CNPJ IN ({', '.join(_texto(c) for c in cnpjs)}))"
+    )
+
+    conexao = _conectar(limite_memoria, diretorio_temporario or armazem.diretorio / ".duckdb_tmp", threads)
+    try:
+        if dctfweb is None:
+            dctfweb = conexao.execute(
+                f"SELECT count(*) > 0 FROM {fonte_sql} WHERE starts_with(COLUNA, '[DCTFWEB]')"
+            ).fetchone()[0]
+        with etapa("duckdb.resumo") as registro:
+            leitor = conexao.execute(sql_resumo(fonte_sql, dctfweb)).to_arrow_reader(linhas_por_lote)
+            registro.linhas = 0
+            pendentes = iter(cnpjs)
+            atual, partes = None, []
+            for lote in leitor:
+                df = lote.to_pandas()
+                registro.linhas += len(df)
+                # o resultado vem ordenado por CNPJ: cada empresa sai assim que termina
+                for cnpj, parte in df.groupby("CNPJ", sort=False):
+                    if cnpj != atual:
+                        if partes:
+                            yield atual, _finalizar(partes, dctfweb)
+                        # empresas sem períodos com EFD, que não aparecem no resultado
+                        for vazia in pendentes:
+                            if vazia == cnpj:
+                                break
+                            yield vazia, _finalizar([], dctfweb)
+                        atual, partes = cnpj, []
+                    partes.append(parte)
+            if partes:
+                yield atual, _finalizar(partes, dctfweb)
+            for vazia in pendentes:
+                yield vazia, _finalizar([], dctfweb)
+    finally:
+        conexao.close()
+
+
+def _finalizar(partes, dctfweb):
+    if not partes:
+        return finalizar_resumo(calcular_linhas(pd.DataFrame(columns=colunas_valores(dctfweb)), dctfweb))
+    linhas = pd.concat(partes, ignore_index=True).drop(columns="CNPJ")
+    linhas["PERIODO"] = linhas["PERIODO"].astype("int64")
+    return finalizar_resumo(linhas)
+
+
+def gerar_df_resumo_duckdb(armazem, cnpj, **opcoes):
+    """Resumo de uma única empresa."""
+    for _, resumo in gerar_resumos_duckdb(armazem, cnpjs=[cnpj], **opcoes):
+        return resumo
@@ -1,66 +1,350 @@
-import pandas as pd
-import pdfplumber
+import os
 import re
+import tempfile
+import time
 
-def extrair_dados_darf(comprovante):
-    regex = {
-        'CNPJ_Razao': r'(?P<CNPJ>\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})\s+(?P<RazaoSocial>[^\n]+)',
-        'Periodo_Documento': r'(?P<PeriodoApuracao>\d{2}/\d{2}/\d{4})\s+(?P<DataVencimento>\d{2}/\d{2}/\d{4})\s+(?P<NumeroDocumento>\d{14,})',
-        'Banco_Data_Arrecadacao': r'(?P<DataArrecadacao>\d{2}/\d{2}/\d{4})\s+(?P<Banco>\d{3}\s*-\s*[^\n]+)',
-        'Agencia_Estabelecimento_Valor': r'(?P<Agencia>\d{4})\s+(?P<Estabelecimento>\d{4})\s+(?P<ValorReservado>[\d,.]+)',
-        'Totais': r'Totais\s+(?P<Principal>[\d,.]+)\s+(?P<Juros>[\d,.]+)\s+(?P<Multa>[\d,.]+)\s+(?P<Total>[\d,.]+)'
-    }
+import pandas as pd
 
-    dados = {}
-    for chave, padrao in regex.items():
-        match = re.search(padrao, comprovante)
-        if match:
-            dados.update(match.groupdict())
+from inputs.fontes import arquivos_abertos, tamanho_arquivo
+from utils.instrumentacao import etapa
+from utils.paralelo import mapear, numero_workers
+
+# mudar sempre que o formato do DataFrame gerado mudar (invalida o cache)
+VERSAO_PARSER = "2"
+
+# mínimo de páginas por tarefa do pool (equilibra custo de abrir o PDF x granularidade)
+PAGINAS_POR_TAREFA = 8
+# cada tarefa reabre o PDF, e abrir custa proporcional ao total de páginas: PDFs grandes
+# são divididos em no máximo TAREFAS_POR_WORKER blocos por worker
+TAREFAS_POR_WORKER = 4
+# processos isolados caindo em seguida ao refazer páginas: a causa é comum, não da página
+FALHAS_SEGUIDAS = 3
+
+# padrões compilados uma vez por processo
+_PADROES_CABECALHO = [re.compile(p) for p in (
+    r'(?P<CNPJ>\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})\s+(?P<RazaoSocial>[^\n]+)',
+    r'(?P<PeriodoApuracao>\d{2}/\d{2}/\d{4})\s+(?P<DataVencimento>\d{2}/\d{2}/\d{4})\s+(?P<NumeroDocumento>\d{14,})',
+    r'(?P<DataArrecadacao>\d{2}/\d{2}/\d{4})\s+(?P<Banco>\d{3}\s*-\s*[^\n]+)',
+    r'(?P<Agencia>\d{4})\s+(?P<Estabelecimento>\d{4})\s+(?P<ValorReservado>[\d,.]+)',
+    r'Totais\s+(?P<Principal>[\d,.]+)\s+(?P<Juros>[\d,.]+)\s+(?P<Multa>[\d,.]+)\s+(?P<Total>[\d,.]+)',
+)]
+_PADRAO_ITEM = re.compile(
+    r'(\d{4})\s+([A-ZÀ-ÿa-z0-9\-./\s]+?)\s+(\d{1,3}(?:\.\d{3})*,\d{2})\s+(\d{1,3}(?:\.\d{3})*,\d{2}|-)\s+(\d{1,3}(?:\.\d{3})*,\d{2}|-)\s+(\d{1,3}(?:\.\d{3})*,\d{2})'
+)
+_PADRAO_SUBDESC = re.compile(r'(\d{2})\s*-\s*(.+)')
+
+# mesmo valor que o pandas usa para campos ausentes ao montar o DataFrame de dicts
+_AUSENTE = float("nan")
+
+COLUNAS_ITEM = ['Codigo', 'DescricaoPrincipal', 'DescricaoComplementar',
+                'PrincipalItem', 'MultaItem', 'JurosItem', 'TotalItem']
 
+def extrair_colunas_darf(comprovante, colunas=None):
+    """
+    Extrai os itens do texto de uma página de DARF e os acrescenta a `colunas`
+    (dict coluna -> lista), repetindo os campos do cabeçalho em cada item.
+    Colunas novas são preenchidas com NaN nas linhas anteriores; devolve `colunas`.
+    """
+    if colunas is None:
+        colunas = {}
+    itens = []
     linhas = comprovante.splitlines()
-    dados_com_itens = []
-    i = 0
-    while i < len(linhas) - 1:
-        linha = linhas[i]
-        linha_seguinte = linhas[i + 1]
-        pattern_item = re.match(
-            r'(\d{4})\s+([A-ZÀ-ÿa-z0-9\-./\s]+?)\s+(\d{1,3}(?:\.\d{3})*,\d{2})\s+(\d{1,3}(?:\.\d{3})*,\d{2}|-)\s+(\d{1,3}(?:\.\d{3})*,\d{2}|-)\s+(\d{1,3}(?:\.\d{3})*,\d{2})',
-            linha)
-        pattern_subdesc = re.match(r'(\d{2})\s*-\s*(.+)', linha_seguinte)
-
-        if pattern_item and pattern_subdesc:
-            item = pattern_item.groups()
-            subcodigo = pattern_subdesc.group(1)
-            descricao_complementar = pattern_subdesc.group(2).strip()
-            linha_dados = dados.copy()
-            linha_dados.update({
-                'Codigo': f"{item[0]}-{subcodigo}",
-                'DescricaoPrincipal': item[1].strip(),
-                'DescricaoComplementar': descricao_complementar,
-                'PrincipalItem': item[2],
-                'MultaItem': item[3],
-                'JurosItem': item[4],
-                'TotalItem': item[5]
-            })
-            dados_com_itens.append(linha_dados)
-            i += 2
+    ultimo = len(linhas) - 1
+    livre = 0
+    # só linhas que começam com 4 dígitos podem ser item; a seguinte traz a subdescrição
+    for i in [i for i, linha in enumerate(linhas) if linha[:4].isdigit()]:
+        if i < livre or i >= ultimo:
+            continue
+        item = _PADRAO_ITEM.match(linhas[i])
+        if not item:
+            continue
+        subdesc = _PADRAO_SUBDESC.match(linhas[i + 1])
+        if subdesc:
+            codigo, descricao, principal, multa, juros, total = item.groups()
+            itens.append((f"{codigo}-{subdesc.group(1)}", descricao.strip(), subdesc.group(2).strip(),
+                          principal, multa, juros, total))
+            livre = i + 2
+
+    if not itens:
+        return colunas
+    novos = len(itens)
+
+    cabecalho = {}
+    for padrao in _PADROES_CABECALHO:
+        match = padrao.search(comprovante)
+        if match:
+            cabecalho.update(match.groupdict())
+
+    pagina = {campo: [valor] * novos for campo, valor in cabecalho.items()}
+    pagina.update(zip(COLUNAS_ITEM, map(list, zip(*itens))))
+    return acrescentar_colunas(colunas, pagina)
+
+def acrescentar_colunas(destino, origem):
+    """Acrescenta as linhas de `origem` a `destino` (dicts coluna -> lista), alinhando as colunas."""
+    if not origem:
+        return destino
+    anteriores = len(next(iter(destino.values()))) if destino else 0
+    novos = len(next(iter(origem.values())))
+    for campo, valores in origem.items():
+        if campo not in destino:
+            destino[campo] = [_AUSENTE] * anteriores
+        destino[campo].extend(valores)
+    for campo, valores in destino.items():
+        if campo not in origem:
+            valores.extend([_AUSENTE] * novos)
+    return destino
+
+def extrair_dados_darf(comprovante):
+    colunas = extrair_colunas_darf(comprovante)
+    return [dict(zip(colunas, valores)) for valores in zip(*colunas.values())]
+
+def _extrair_paginas(tarefa):
+    # roda no worker: abre o PDF pelo caminho e extrai só o bloco de páginas
+    # o pdfplumber (e o pdfminer) só é importado quando há PDF para ler
+    import pdfplumber
+
+    caminho, inicio, fim = tarefa
+    resultados = []
+    with pdfplumber.open(caminho) as pdf:
+        for numero in range(inicio, fim):
+            try:
+                pagina = pdf.pages[numero]
+                texto = pagina.extract_text() or ""
+                # libera os objetos da página já lida (blocos grandes acumulariam memória)
+                pagina.close()
+                resultados.append((numero, extrair_colunas_darf(texto), None))
+            except Exception as e:
+                resultados.append((numero, {}, f"{type(e).__name__}: {e}"))
+    return resultados
+
+def _contar_paginas(caminho):
+    # (total, erro); com mais de um processo também roda num worker: abrir o PDF já usa o pdfminer
+    import pdfplumber
+
+    try:
+        with pdfplumber.open(caminho) as pdf:
+            return len(pdf.pages), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def _refazer(funcao, tarefas, workers):
+    """
+    Refaz tarefas que falharam inteiras, sem usar o processo principal (o servidor do
+    Streamlit): primeiro num pool novo; as que falham de novo rodam cada uma num
+    processo só seu. Uma tarefa falha inteira quando o worker cai (segfault ou falta
+    de memória no pdfminer) e, com ele, o pool todo (BrokenProcessPool nas demais).
+
+    Devolve (resultados, último erro): exceção no lugar das que caíram de novo e None
+    nas que nem foram tentadas, porque FALHAS_SEGUIDAS processos isolados caíram em
+    seguida (causa comum, como o worker que não sobe: tentar o resto só custaria tempo).
+    """
+    resultados = mapear(funcao, tarefas, workers, isolar_erros=True, em_processos=True)
+    seguidas = 0
+    ultimo = None
+    for posicao, (tarefa, resultado) in enumerate(zip(tarefas, resultados)):
+        if not isinstance(resultado, Exception):
+            continue
+        ultimo = resultado
+        if seguidas >= FALHAS_SEGUIDAS:
+            resultados[posicao] = None
+            continue
+        resultado = mapear(funcao, [tarefa], 1, isolar_erros=True, em_processos=True)[0]
+        if isinstance(resultado, Exception):
+            seguidas += 1
+            ultimo = resultado
+        else:
+            seguidas = 0
+        resultados[posicao] = resultado
+    return resultados, ultimo
+
+def _refazer_paginas(falhas, workers):
+    """
+    Refaz, página a página, os blocos que falharam inteiros (ver `_refazer`).
+    Devolve [(dono, resultado)] e {dono: (páginas não tentadas, erro)}.
+    """
+    paginas = [
+        (indice, (caminho, numero, numero + 1))
+        for indice, (caminho, inicio, fim) in falhas for numero in range(inicio, fim)
+    ]
+    if not paginas:
+        return [], {}
+    resultados, ultimo = _refazer(_extrair_paginas, [t for _, t in paginas], workers)
+    refeitas = []
+    desistencias = {}
+    for (indice, tarefa), resultado in zip(paginas, resultados):
+        if resultado is None:
+            desistencias.setdefault(indice, []).append(tarefa[1])
+            continue
+        if isinstance(resultado, Exception):
+            resultado = [(tarefa[1], {}, f"{type(resultado).__name__}: {resultado}")]
+        refeitas.append((indice, resultado))
+    erro = f"{type(ultimo).__name__}: {ultimo}"
+    return refeitas, {indice: (numeros, erro) for indice, numeros in desistencias.items()}
+
+def _caminho(origem, diretorio, indice):
+    if isinstance(origem, (str, os.PathLike)):
+        return os.fspath(origem)
+    # bytes vão para o disco uma vez: cada tarefa leva só o caminho, não uma cópia do PDF
+    caminho = os.path.join(diretorio, f"{indice}.pdf")
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(origem)
+    return caminho
+
+def extrair_pdfs(pdfs, workers=None, paginas_por_tarefa=PAGINAS_POR_TAREFA):
+    """
+    Extrai os itens de DARF de vários PDFs num pool de processos, em blocos de páginas.
+
+    `pdfs` é uma lista de (nome, bytes ou caminho). Devolve (tabelas, erros, desempenho):
+    um DataFrame por PDF na ordem recebida (None se o arquivo não abriu), a lista
+    de erros por arquivo/página e as métricas de vazão (só das páginas extraídas).
+    """
+    inicio_relogio = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="darf_") as diretorio:
+        caminhos = [_caminho(origem, diretorio, indice) for indice, (_, origem) in enumerate(pdfs)]
+        tabelas, erros, n_workers, extraidas = _extrair(pdfs, caminhos, workers, paginas_por_tarefa)
+
+    segundos = time.perf_counter() - inicio_relogio
+    desempenho = {
+        "arquivos": len(pdfs),
+        "paginas": extraidas,
+        "workers": n_workers,
+        "segundos": segundos,
+        "paginas_por_segundo": extraidas / segundos if segundos > 0 else 0.0,
+    }
+    return tabelas, erros, desempenho
+
+def _extrair(pdfs, caminhos, workers, paginas_por_tarefa):
+    erros = []
+    totais = {}
+    # mais de um processo permitido: nem a contagem de páginas roda no processo principal
+    em_processos = numero_workers(workers, 2) > 1
+    contagens = mapear(_contar_paginas, caminhos, numero_workers(workers, len(caminhos)),
+                       isolar_erros=True, em_processos=em_processos)
+    caidas = [posicao for posicao, contagem in enumerate(contagens) if isinstance(contagem, Exception)]
+    if caidas:
+        refeitas, ultimo = _refazer(_contar_paginas, [caminhos[i] for i in caidas], len(caidas))
+        for posicao, contagem in zip(caidas, refeitas):
+            contagens[posicao] = contagem if contagem is not None else ultimo
+    for indice, contagem in enumerate(contagens):
+        total, erro = (None, f"{type(contagem).__name__}: {contagem}") if isinstance(contagem, Exception) else contagem
+        if erro:
+            erros.append({"arquivo": pdfs[indice][0], "pagina": None, "erro": erro})
         else:
-            i += 1
-    return dados_com_itens
+            totais[indice] = total
+
+    n_workers = numero_workers(workers, -(-sum(totais.values()) // paginas_por_tarefa))
+    tarefas = []
+    donos = []
+    paginas = {}
+    for indice, total in totais.items():
+        paginas[indice] = {}
+        bloco = max(paginas_por_tarefa, -(-total // (n_workers * TAREFAS_POR_WORKER)))
+        for inicio in range(0, total, bloco):
+            tarefas.append((caminhos[indice], inicio, min(inicio + bloco, total)))
+            donos.append(indice)
+
+    resultados = mapear(_extrair_paginas, tarefas, n_workers, isolar_erros=True)
+    falhas = [(i, t) for i, t, r in zip(donos, tarefas, resultados) if isinstance(r, Exception)]
+    resultados = [(i, r) for i, r in zip(donos, resultados) if not isinstance(r, Exception)]
+    refeitas, desistencias = _refazer_paginas(falhas, n_workers)
+    resultados.extend(refeitas)
+    extraidas = 0
+    for indice, resultado in resultados:
+        for numero, colunas, erro in resultado:
+            paginas[indice][numero] = colunas
+            if erro:
+                erros.append({"arquivo": pdfs[indice][0], "pagina": numero + 1, "erro": erro})
+            else:
+                extraidas += 1
+    for indice, (numeros, erro) in desistencias.items():
+        erros.append({
+            "arquivo": pdfs[indice][0], "pagina": None,
+            "erro": f"{len(numeros)} páginas não extraídas (os workers caíram {FALHAS_SEGUIDAS} vezes seguidas): {erro}",
+        })
+
+    tabelas = []
+    for indice in range(len(pdfs)):
+        if indice not in paginas:
+            tabelas.append(None)
+            continue
+        colunas = {}
+        for numero in sorted(paginas[indice]):
+            acrescentar_colunas(colunas, paginas[indice][numero])
+        tabelas.append(pd.DataFrame(colunas))
+    return tabelas, erros, n_workers, extraidas
+
+def _origem(origem, arquivo):
+    # caminhos vão como caminho; uploads, como bytes (gravados uma vez por extrair_pdfs)
+    if isinstance(origem, (str, os.PathLike)):
+        return origem
+    arquivo.seek(0)
+    conteudo = arquivo.read()
+    arquivo.seek(0)
+    return conteudo
 
-def carregar_darfs(uploaded_pdfs):
+def carregar_darfs(uploaded_pdfs, cache=None, workers=None):
     if not uploaded_pdfs:
         return None
-    dados_expandidos = []
-    for pdf_file in uploaded_pdfs:
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                texto = page.extract_text()
-                linhas = extrair_dados_darf(texto)
-                dados_expandidos.extend(linhas)
-    df = pd.DataFrame(dados_expandidos)
+    with etapa("darf.carregar", arquivos=len(uploaded_pdfs)) as registro:
+        df = juntar(ler_por_arquivo(uploaded_pdfs, cache, workers))
+        registro.linhas = len(df)
+        registro.extras["paginas"] = df.attrs["desempenho"]["paginas"]
+    return df
+
+def ler_por_arquivo(uploaded_pdfs, cache=None, workers=None):
+    """
+    Extrai os PDFs (só os que não estão no cache) e devolve, por arquivo e na ordem
+    recebida, {"valores": DataFrame, "erros": [...], "desempenho": {...}}; o
+    desempenho é o da extração toda.
+    """
+    with arquivos_abertos(uploaded_pdfs) as arquivos:
+        partes = [None] * len(arquivos)
+        chaves = {}
+        pendentes = []
+        for indice, pdf_file in enumerate(arquivos):
+            if cache is not None:
+                chaves[indice], partes[indice] = cache.consultar(pdf_file, "darf", VERSAO_PARSER)
+            if partes[indice] is None:
+                pendentes.append(indice)
+
+        with etapa("darf.extrair_pdfs", bytes=sum(tamanho_arquivo(arquivos[i]) for i in pendentes)) as registro:
+            tabelas, erros, desempenho = extrair_pdfs(
+                [(arquivos[i].name, _origem(uploaded_pdfs[i], arquivos[i])) for i in pendentes], workers
+            )
+            registro.linhas = sum(len(t) for t in tabelas if t is not None)
+            registro.extras.update(paginas=desempenho["paginas"], workers=desempenho["workers"])
+        arquivos_com_erro = {e["arquivo"] for e in erros}
+        for indice, tabela in zip(pendentes, tabelas):
+            partes[indice] = tabela
+            # resultado parcial (arquivo ou página com erro) não vai para o cache
+            if cache is not None and tabela is not None and arquivos[indice].name not in arquivos_com_erro:
+                cache.gravar(chaves[indice], tabela)
+        nomes = [arquivo.name for arquivo in arquivos]
+
+    return [
+        {
+            "valores": _ajustar(parte),
+            "erros": [e for e in erros if e["arquivo"] == nome] if indice in pendentes else [],
+            "desempenho": desempenho,
+        }
+        for indice, (nome, parte) in enumerate(zip(nomes, partes))
+    ]
+
+def _ajustar(df):
+    if df is None:
+        return pd.DataFrame()
+    df = df.copy()
     if 'Codigo' in df.columns:
         df['Codigo'] = df['Codigo'].str.replace('-', '', regex=False)
     if 'PeriodoApuracao' in df.columns:
         df['Período Ajustado'] = df['PeriodoApuracao'].apply(lambda x: x if pd.isna(x) else x.strip())
-    return df
\ No newline at end of file
+    return df
+
+def juntar(partes):
+    """Um DataFrame com os itens de todas as partes de `ler_por_arquivo`; erros e desempenho em df.attrs."""
+    tabelas = [p["valores"] for p in partes if not p["valores"].empty]
+    df = pd.concat(tabelas, ignore_index=True) if tabelas else pd.DataFrame()
+    df.attrs["erros"] = [e for p in partes for e in p["erros"]]
+    # partes de extrações diferentes (arquivos incluídos em outro rerun da interface): vale a do último
+    df.attrs["desempenho"] = partes[-1]["desempenho"] if partes else extrair_pdfs([])[2]
+    return df
@@ -1,7 +1,70 @@
+from calculos.dctf_dataframe import decodificar_grupos, montar_tabelas
+from calculos.dctf_layouts import LAYOUTS_COMPLETOS
+from inputs.fontes import arquivos_abertos, iterar_linhas, ler_arquivos, mapear_arquivo
+from utils.instrumentacao import etapa
+
+# mudar sempre que o formato das tabelas geradas mudar (invalida o cache)
+VERSAO_PARSER = "1"
+
+# tipo de registro pelo início da linha
+_PREFIXOS = {tipo.encode("latin-1"): tipo for tipo in LAYOUTS_COMPLETOS}
+
 def carregar_arquivos(arquivos):
     conteudos = []
-    for arquivo in arquivos:
-        conteudo = arquivo.read()
-        nome = arquivo.name
-        conteudos.append((nome, conteudo.decode("latin-1").splitlines()))
+    with arquivos_abertos(arquivos) as abertos:
+        for arquivo in abertos:
+            # arquivo mapeado em memória: só a lista de linhas é montada
+            with mapear_arquivo(arquivo) as dados:
+                linhas = [linha.decode("latin-1") for linha in iterar_linhas(dados)]
+            conteudos.append((arquivo.name, linhas))
     return conteudos
+
+
+def carregar_tabelas(arquivos, cache=None, tipado=False, workers=None):
+    """
+    Lê os .dec e devolve as tabelas por tipo de registro (ver gerar_dataframes).
+    Vários arquivos grandes são decodificados em paralelo (`workers` processos,
+    None = todos os núcleos); as linhas ficam na ordem de `arquivos`.
+    """
+    with etapa("dctf.carregar", arquivos=len(arquivos)) as registro:
+        tabelas = juntar(ler_por_arquivo(arquivos, cache, tipado, workers), tipado)
+        registro.linhas = sum(len(df) for df in tabelas.values())
+    return tabelas
+
+
+def ler_por_arquivo(arquivos, cache=None, tipado=False, workers=None):
+    """Decodifica os .dec e devolve, por arquivo, as tabelas de cada tipo de registro (ver `juntar`)."""
+    return ler_arquivos(
+        arquivos, _decodificar, "dctf", VERSAO_PARSER, cache, workers,
+        parametros={"tipado": tipado}, parametros_cache={"tipado": tipado},
+    )
+
+
+def juntar(partes, tipado=False):
+    """Tabelas por tipo de registro de todos os arquivos de `ler_por_arquivo`, na ordem recebida."""
+    with etapa("dctf.montar"):
+        return montar_tabelas(partes, tipado)
+
+
+def separar_registros(dados):
+    """
+    Linhas de `dados` (ver inputs.fontes.mapear_arquivo) por tipo de registro, ainda
+    em bytes; linhas de tipos sem leiaute nem são copiadas.
+    """
+    linhas = {tipo: [] for tipo in LAYOUTS_COMPLETOS}
+    # quase todas as linhas têm leiaute: quebrar a janela inteira sai mais barato que o `re`
+    for linha in iterar_linhas(dados):
+        # mesmo critério de decodificar_linhas: 'T9' só se o 3º caractere for branco
+        tipo = _PREFIXOS.get(linha[:3].strip())
+        if tipo is not None:
+            linhas[tipo].append(linha)
+    return linhas
+
+
+def _decodificar(arquivo, tipado):
+    with etapa("dctf.ler") as registro:
+        with mapear_arquivo(arquivo) as dados:
+            linhas = separar_registros(dados)
+        registro.linhas = sum(map(len, linhas.values()))
+    with etapa("dctf.fatiar", linhas=registro.linhas):
+        return decodificar_grupos(linhas, arquivo.name, tipado)
@@ -1,55 +1,155 @@
-import xml.etree.ElementTree as ET
+"""
+Leitura dos XML da DCTFWeb numa tabela longa: uma linha por débito/crédito, com
+Arquivo, CNPJ, PERIODO ('01MMAAAA'), CodReceita, Tipo e Valor (centavos, Int64).
+
+Cada arquivo é lido uma vez, em streaming (iterparse): os elementos já
+processados saem da árvore, então a memória não cresce com o tamanho do XML.
+Quais tags viram CNPJ, período, código, valor e registro é configurável
+(`TAGS_DCTFWEB`); os nomes são comparados sem namespace e sem maiúsculas.
+"""
 import pandas as pd
-import streamlit as st
-
-def get_all_tags(xml_content):
-    root = ET.fromstring(xml_content.strip())
-    tags_unicas = set()
-    for elem in root.iter():
-        tag_name = elem.tag.split("}")[-1]
-        tags_unicas.add(tag_name)
-    return list(tags_unicas)
-
-def parse_xml_to_dataframe(xml_content, filename, all_tags):
-    try:
-        root = ET.fromstring(xml_content.strip())
-        data = {"Arquivo": filename}
-        for elem in root.iter():
-            tag_name = elem.tag.split('}')[-1]
-            if tag_name in data:
-                count = 1
-                new_tag_name = f"{tag_name}_{count}"
-                while new_tag_name in data:
-                    count += 1
-                    new_tag_name = f"{tag_name}_{count}"
-                tag_name = new_tag_name
-            data[tag_name] = elem.text.strip() if elem.text and elem.text.strip() else None
-        for tag in all_tags:
-            if tag not in data:
-                data[tag] = None
-        return data
-    except Exception as e:
-        st.error(f"Erro ao processar o arquivo {filename}: {e}")
-        return None
 
-def carregar_xmls(uploaded_files):
+from inputs.fontes import ler_arquivos, tamanho_arquivo
+from utils.instrumentacao import etapa
+from utils.moeda import valores_para_centavos
+from utils.periodos import chaves_periodo, para_texto
+
+# mudar sempre que o formato do DataFrame gerado mudar (invalida o cache)
+VERSAO_PARSER = "2"
+
+COLUNAS = ["Arquivo", "CNPJ", "PERIODO", "CodReceita", "Tipo", "Valor"]
+
+# papel -> nomes de tag; em "registros", nome da tag -> Tipo da linha gerada
+TAGS_DCTFWEB = {
+    "cnpj": ("cnpj", "nrinsc", "nrinscricao", "cnpjcontribuinte"),
+    "periodo": ("perapur", "periodoapuracao", "periodo", "pa"),
+    "codigo": ("codreceita", "codigoreceita", "codigodebito", "codigo", "cr"),
+    "valor": ("valor", "vlrdebito", "valordebito", "vlrapurado", "vlrcredito", "valorcredito", "vlrprincipal"),
+    "registros": {
+        "debito": "DEBITO",
+        "infodebito": "DEBITO",
+        "credito": "CREDITO",
+        "pagamento": "PAGAMENTO",
+        "compensacao": "COMPENSACAO",
+        "suspensao": "SUSPENSAO",
+        "parcelamento": "PARCELAMENTO",
+    },
+}
+
+
+def _papeis(tags):
+    papeis = {}
+    for papel in ("cnpj", "periodo", "codigo", "valor"):
+        for nome in tags[papel]:
+            papeis[nome.lower()] = papel
+    return papeis, {nome.lower(): tipo for nome, tipo in tags["registros"].items()}
+
+
+def ler_xml(arquivo, tags=None):
+    """Lê um XML da DCTFWeb e devolve {'valores': tabela longa, 'erros': DataFrame}."""
+    papeis, registros = _papeis(tags or TAGS_DCTFWEB)
+    # o parser de XML só é importado quando há XML para ler
+    import xml.etree.ElementTree as ET
+
+    colunas = {c: [] for c in COLUNAS}
+    erros = []
+    if tamanho_arquivo(arquivo):
+        arquivo.seek(0)
+        try:
+            _percorrer(ET.iterparse(arquivo, events=("start", "end")), arquivo.name, papeis, registros, colunas)
+        except ET.ParseError as e:
+            erros.append({"arquivo": arquivo.name, "erro": f"ParseError: {e}"})
+    return {"valores": _tabela(colunas), "erros": pd.DataFrame(erros, columns=["arquivo", "erro"], dtype=object)}
+
+
+def _percorrer(eventos, nome, papeis, registros, colunas):
+    abertos = []      # elementos ainda abertos (do documento até o atual)
+    pendentes = []    # registros abertos: [elemento, Tipo, {papel: texto}]
+    cabecalho = {}
+    for evento, elem in eventos:
+        if evento == "start":
+            tipo = registros.get(elem.tag.rpartition("}")[2].lower())
+            if tipo is not None:
+                pendentes.append([elem, tipo, {}])
+            abertos.append(elem)
+            continue
+
+        abertos.pop()
+        papel = papeis.get(elem.tag.rpartition("}")[2].lower())
+        texto = elem.text.strip() if elem.text else ""
+        if papel is not None and texto:
+            if pendentes:
+                # dentro de um registro vale a primeira ocorrência
+                pendentes[-1][2].setdefault(papel, texto)
+            else:
+                # fora, vale para os registros seguintes (CNPJ e período da declaração)
+                cabecalho[papel] = texto
+
+        if pendentes and pendentes[-1][0] is elem:
+            _, tipo, campos = pendentes.pop()
+            if "valor" in campos:
+                # registro aninhado (ex.: pagamento de um débito) herda o que não tem
+                for _, _, externo in reversed(pendentes):
+                    for chave, valor in externo.items():
+                        campos.setdefault(chave, valor)
+                colunas["Arquivo"].append(nome)
+                colunas["CNPJ"].append(campos.get("cnpj", cabecalho.get("cnpj")))
+                colunas["PERIODO"].append(campos.get("periodo", cabecalho.get("periodo")))
+                colunas["CodReceita"].append(campos.get("codigo"))
+                colunas["Tipo"].append(tipo)
+                colunas["Valor"].append(campos["valor"])
+
+        # o elemento já foi lido: sai da árvore
+        elem.clear()
+        if abertos:
+            abertos[-1].remove(elem)
+
+
+def _tabela(colunas):
+    return pd.DataFrame({
+        "Arquivo": pd.Categorical(colunas["Arquivo"]),
+        "CNPJ": pd.Series(colunas["CNPJ"], dtype=object),
+        # 2024-01, 202401, 2024-01-31, 01/2024 ou 31/01/2024 -> '01MMAAAA'
+        "PERIODO": para_texto(chaves_periodo(pd.Series(colunas["PERIODO"], dtype=object), "livre")),
+        "CodReceita": pd.Series(colunas["CodReceita"], dtype=object),
+        "Tipo": pd.Categorical(colunas["Tipo"]),
+        # '1234.56' (xs:decimal) ou '1.234,56' -> centavos; inválidos ficam <NA>
+        "Valor": valores_para_centavos(pd.Series(colunas["Valor"], dtype=object), separador_decimal=None),
+    })
+
+
+def carregar_xmls(uploaded_files, cache=None, workers=None, tags=None):
+    """
+    Lê os XML da DCTFWeb (em paralelo quando são muitos e grandes, ver
+    inputs.fontes.ler_arquivos) e devolve a tabela longa, na ordem dos arquivos.
+    Arquivos que não abrem como XML ficam em df.attrs['erros'].
+    """
     if not uploaded_files:
         return None
-    lista_dados = []
-    all_tags = set()
-    xml_contents = {}
-
-    for uploaded_file in uploaded_files:
-        xml_content = uploaded_file.read().decode("utf-8").strip()
-        if xml_content:
-            xml_contents[uploaded_file.name] = xml_content
-            tags_xml = get_all_tags(xml_content)
-            all_tags.update(tags_xml)
-
-    all_tags = list(all_tags)
-    for filename, xml_content in xml_contents.items():
-        dados = parse_xml_to_dataframe(xml_content, filename, all_tags)
-        if dados:
-            lista_dados.append(dados)
-
-    return pd.DataFrame(lista_dados)
\ No newline at end of file
+    with etapa("dctfweb.carregar", arquivos=len(uploaded_files)) as registro:
+        df = juntar(ler_por_arquivo(uploaded_files, cache, workers, tags))
+        registro.linhas = len(df)
+    return df
+
+
+def ler_por_arquivo(uploaded_files, cache=None, workers=None, tags=None):
+    """Lê os XML e devolve, por arquivo, o resultado de `ler_xml` ({"valores", "erros"})."""
+    return ler_arquivos(
+        uploaded_files, ler_xml, "dctfweb", VERSAO_PARSER, cache, workers,
+        parametros={"tags": tags}, parametros_cache={"tags": tags},
+    )
+
+
+def juntar(partes):
+    """Tabela longa de todas as partes de `ler_por_arquivo`, com os erros em df.attrs['erros']."""
+    # arquivos sem linhas (vazios ou com erro) não entram no concat
+    tabelas = [p["valores"] for p in partes if len(p["valores"])] or [partes[0]["valores"]]
+    df = pd.concat(tabelas, ignore_index=True)
+    for coluna in ("Arquivo", "Tipo"):
+        # categorias diferentes por arquivo: o concat devolveria texto
+        df[coluna] = df[coluna].astype("category")
+    df.attrs["erros"] = [
+        {"arquivo": e["arquivo"], "pagina": None, "erro": e["erro"]}
+        for p in partes for e in p["erros"].to_dict("records")
+    ]
+    return df
@@ -1,44 +1,260 @@
-import streamlit as st
+import numpy as np
 import pandas as pd
 
-def carregar_e_processar_arquivos():
-    uploaded_files = st.file_uploader(
-        "Selecione um ou mais arquivos .txt",
-        type=["txt"],
-        accept_multiple_files=True
-    )
+from calculos.efd_layouts import LAYOUTS_EFD, PREFIXOS_DECIMAL, PREFIXOS_VALOR, layout_registro
+from inputs.fontes import iterar_linhas, ler_arquivos, mapear_arquivo
+from utils.instrumentacao import etapa
+from utils.moeda import valores_para_centavos
+from utils.texto import BYTES_ILEGAIS
+
+# registros usados pelo cruzamento (0000 traz o período; M200/M600 os totais)
+REGISTROS_RESUMO = frozenset({"0000", "M200", "M210", "M600", "M610"})
+
+# mudar sempre que o formato do DataFrame gerado mudar (invalida o cache)
+VERSAO_PARSER = "4"
+
+# quantidade de linhas acumuladas antes de virar um DataFrame parcial
+TAMANHO_LOTE = 200_000
+
+COLUNAS_CATEGORICAS = ("REG", "PERIODO", "arquivo_origem")
+
+# no esquema tipado, colunas preenchidas em menos que esta fração das linhas são descartadas
+# (ex.: os campos do 0000 num dump completo); as do cruzamento ficam sempre
+LIMITE_ESPARSAS = 0.01
+COLUNAS_ESSENCIAIS = frozenset({*COLUNAS_CATEGORICAS, "VL_TOT_CONT_REC"})
+
+
+def iterar_efd(arquivo, nome, registros=REGISTROS_RESUMO, tamanho_lote=TAMANHO_LOTE, tipado=False):
+    """
+    Lê um arquivo SPED (mapeado em memória, ver inputs.fontes.mapear_arquivo) e
+    devolve DataFrames parciais de até `tamanho_lote` linhas, mantendo só os
+    registros de `registros`; só essas linhas são copiadas e decodificadas.
+    Com `registros=None` todos os registros são mantidos (dump completo).
+    Com `tipado=True` os lotes seguem o esquema de `_tipar_lote`.
+    """
+    montar = _tipar_lote if tipado else _montar_lote
+    # só as linhas dos registros pedidos (e o 0000, que traz o período) saem do buffer
+    prefixos = None if registros is None else [f"|{r}|".encode("latin1") for r in {*registros, "0000"}]
+    manter_0000 = registros is None or "0000" in registros
+    periodo = None
+    lote = []
+    periodos = []
+
+    with mapear_arquivo(arquivo) as dados:
+        for linha in iterar_linhas(dados, prefixos):
+            if not linha.startswith(b"|"):
+                continue
+            # o código do registro fica entre o primeiro e o segundo '|'
+            reg = linha[1:linha.find(b"|", 1)]
+            # caracteres de controle saem ainda em bytes (em latin1 o byte é o próprio código)
+            campos = linha.translate(None, BYTES_ILEGAIS).decode("latin1").strip().split("|")[1:]
+            if reg == b"0000":
+                periodo = campos[5] if len(campos) > 5 else None
+                if not manter_0000:
+                    continue
+            lote.append(campos)
+            periodos.append(periodo)
+
+            if len(lote) >= tamanho_lote:
+                yield montar(lote, periodos, nome)
+                lote, periodos = [], []
+
+    if lote:
+        yield montar(lote, periodos, nome)
+
+
+def _montar_lote(lote, periodos, nome):
+    df = pd.DataFrame(lote)
+    df["PERIODO"] = periodos
+    df["arquivo_origem"] = nome
+    return df
+
+
+def _tipar_campo(valores, campo):
+    if campo.startswith(PREFIXOS_VALOR):
+        # '1.234,56' -> 123456 centavos, pelas mesmas regras do formato posicional; vazio -> <NA>
+        return valores_para_centavos(valores).array
+    if campo.startswith(PREFIXOS_DECIMAL):
+        return pd.to_numeric(valores.str.replace(",", ".", regex=False), errors="coerce").to_numpy(dtype=float)
+    return valores.to_numpy(dtype=object)
+
+
+def _vazia(valores, n):
+    # coluna de `n` linhas ausentes do mesmo tipo de `valores`
+    if isinstance(valores, pd.arrays.IntegerArray):
+        return pd.arrays.IntegerArray(np.zeros(n, dtype="int64"), np.ones(n, dtype=bool))
+    return np.full(n, None if valores.dtype == object else np.nan, dtype=valores.dtype)
+
+
+def _compactar(coluna, proporcao=0.5):
+    # texto repetido (CST, CFOP, unidade, '0,00'...) vira categórico; texto quase único fica object.
+    # Coluna toda vazia devolve None.
+    codigos, valores = pd.factorize(coluna)
+    if not len(valores):
+        return None
+    if len(valores) > proporcao * len(coluna):
+        return coluna
+    return pd.Categorical.from_codes(codigos, dtype=pd.CategoricalDtype(valores))
+
+
+def _tipar_lote(lote, periodos, nome):
+    """
+    Esquema compacto: REG, PERIODO e arquivo_origem categóricos; os registros com
+    leiaute em calculos.efd_layouts têm os campos nomeados, VL_* em centavos (Int64)
+    e ALIQ_*/QUANT_* em float; os demais registros ficam nas colunas CAMPO_nn pela
+    posição. Texto repetitivo vira categórico. Campos que o registro da linha não
+    tem ficam vazios.
 
+    Compactar custa tempo: cada coluna de texto é fatorada (hash de todos os valores)
+    para decidir se vira categórica. No dump completo a leitura fica ~2-3x mais lenta
+    que no formato posicional, em troca de ~4x menos memória (ver
+    benchmarks/bench_memoria_efd.py); com os registros do resumo a diferença some.
+    """
+    bruto = pd.DataFrame(lote)
+    n = len(bruto)
+    reg = bruto[0]
+
+    # linhas dos registros com leiaute, agrupadas por (registro, quantidade de campos sem o '' final)
+    grupos = {}
+    for i in np.flatnonzero(reg.isin(LAYOUTS_EFD).to_numpy()):
+        campos = lote[i]
+        layout = layout_registro(campos[0], len(campos) - (campos[-1] == ""))
+        if layout is not None:
+            grupos.setdefault(tuple(layout), []).append(i)
+
+    nomeados = {}
+    com_leiaute = np.zeros(n, dtype=bool)
+    for layout, indices in grupos.items():
+        com_leiaute[indices] = True
+        linhas = bruto.iloc[indices]
+        for posicao, campo in enumerate(layout[1:], start=1):
+            valores = _tipar_campo(linhas[posicao], campo)
+            if campo not in nomeados:
+                nomeados[campo] = _vazia(valores, n)
+            nomeados[campo][indices] = valores
+
+    colunas = {"REG": pd.Categorical(reg)}
+    if not com_leiaute.all():
+        for posicao in bruto.columns[1:]:
+            coluna = bruto[posicao].mask(com_leiaute, None) if com_leiaute.any() else bruto[posicao]
+            coluna = _compactar(coluna)
+            if coluna is not None:
+                colunas[f"CAMPO_{posicao + 1:02d}"] = coluna
+    for campo, valores in nomeados.items():
+        if valores.dtype == object:
+            coluna = _compactar(pd.Series(valores))
+            colunas[campo] = valores if coluna is None else coluna
+        else:
+            colunas[campo] = valores
+    colunas["PERIODO"] = pd.Categorical(periodos)
+    colunas["arquivo_origem"] = pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), [nome])
+    return pd.DataFrame(colunas)
+
+
+def concatenar(partes):
+    """pd.concat que mantém as colunas categóricas (as categorias das partes são unificadas)."""
+    if len(partes) == 1:
+        return partes[0]
+    categoricas = {
+        coluna for parte in partes for coluna in parte.columns
+        if isinstance(parte[coluna].dtype, pd.CategoricalDtype)
+    }
+    alinhadas = set()
+    for coluna in categoricas:
+        if all(coluna in p and isinstance(p[coluna].dtype, pd.CategoricalDtype) for p in partes):
+            categorias = pd.Index(pd.unique(np.concatenate([p[coluna].cat.categories.to_numpy(dtype=object) for p in partes])))
+            for parte in partes:
+                parte[coluna] = parte[coluna].cat.set_categories(categorias)
+            alinhadas.add(coluna)
+    df = pd.concat(partes, ignore_index=True)
+    # coluna categórica numa parte e ausente ou texto em outra: volta a ser categórica no fim
+    for coluna in categoricas - alinhadas:
+        df[coluna] = _compactar(df[coluna])
+    return df
+
+
+def _fracao_preenchida(serie):
+    # vazio = ausente ou texto ''
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy()
+        vazias = np.flatnonzero(serie.cat.categories == "")
+        return ((codigos >= 0) & ~np.isin(codigos, vazias)).mean()
+    if serie.dtype == object:
+        return (serie.notna() & (serie != "")).mean()
+    return serie.notna().mean()
+
+
+def remover_esparsas(df, limite=LIMITE_ESPARSAS):
+    """Descarta as colunas preenchidas em menos que `limite` das linhas (exceto COLUNAS_ESSENCIAIS)."""
+    esparsas = [
+        coluna for coluna in df.columns
+        if coluna not in COLUNAS_ESSENCIAIS and _fracao_preenchida(df[coluna]) < limite
+    ]
+    return df.drop(columns=esparsas)
+
+
+def ler_efd(arquivo, nome, registros=REGISTROS_RESUMO, tamanho_lote=TAMANHO_LOTE, tipado=False):
+    """
+    O arquivo inteiro num DataFrame. Os lotes de `iterar_efd` limitam a memória da
+    decodificação, não a do resultado: as partes ficam na memória até o concat. Com
+    os registros do resumo isso é pouco; no dump completo (`registros=None`, usado
+    na auditoria e na exportação, que precisam da tabela inteira) a memória cresce
+    com o arquivo. Para agregar com memória limitada, consuma `iterar_efd` lote a lote.
+    """
+    partes = list(iterar_efd(arquivo, nome, registros, tamanho_lote, tipado))
+    if not partes:
+        return None
+    df = concatenar(partes) if tipado else pd.concat(partes, ignore_index=True)
+    # o PERIODO vem do 0000; linhas anteriores a ele recebem o mesmo período do arquivo
+    df["PERIODO"] = df["PERIODO"].bfill()
+    return df
+
+
+def carregar_e_processar_arquivos(uploaded_files, registros=REGISTROS_RESUMO, cache=None,
+                                  tipado=True, manter_esparsas=False, workers=None):
+    """
+    Lê os arquivos EFD e devolve (uploaded_files, DataFrame único). Por padrão no
+    esquema tipado e compacto (ver `_tipar_lote`), sem as colunas esparsas;
+    `tipado=False` devolve o formato posicional antigo (colunas 0..N em texto).
+    Vários arquivos grandes são lidos em paralelo (`workers` processos, None = todos
+    os núcleos); as linhas ficam na ordem de `uploaded_files`.
+    """
     if not uploaded_files:
         return None, None
 
-    dataframes = []
+    with etapa("efd.carregar", arquivos=len(uploaded_files)) as registro:
+        lidos = ler_por_arquivo(uploaded_files, registros, cache, tipado, workers)
+        df_final = juntar(lidos, tipado, manter_esparsas)
+        registro.linhas = 0 if df_final is None else len(df_final)
+    return uploaded_files, df_final
+
 
-    for arquivo in uploaded_files:
-        arquivo.seek(0)
-        # lê todas as linhas do TXT
-        linhas = arquivo.read().decode("latin1").splitlines()
-        # divide por '|' e elimina o primeiro elemento vazio
-        dados = [linha.strip().split("|")[1:] for linha in linhas if linha.startswith("|")]
+def _ler_arquivo(arquivo, registros, tipado):
+    # leitura em streaming: só os registros pedidos viram linhas do DataFrame
+    return ler_efd(arquivo, arquivo.name, registros, tipado=tipado)
 
-        df = pd.DataFrame(dados)
 
-        # ------ Nova lógica: extrai o período do registro 0000 ------
-        # máscara para linha onde coluna 0 == "0000"
-        mask = df[0] == "0000"
-        if mask.any():
-            # pega o valor da coluna 5 nessa linha
-            periodo = df.loc[mask, 5].iloc[0]
-        else:
-            # se não encontrar, deixa como None ou você pode lançar erro
-            periodo = None
+def ler_por_arquivo(uploaded_files, registros=REGISTROS_RESUMO, cache=None, tipado=True, workers=None):
+    """Lê os arquivos EFD e devolve um DataFrame por arquivo (None se não teve linhas), na ordem recebida."""
+    return ler_arquivos(
+        uploaded_files, _ler_arquivo, "efd", VERSAO_PARSER, cache, workers,
+        parametros={"registros": registros, "tipado": tipado},
+        parametros_cache={"registros": None if registros is None else sorted(registros), "tipado": tipado},
+    )
 
-        # adiciona colunas de controle
-        df["PERIODO"] = periodo
-        df["arquivo_origem"] = arquivo.name
-        # ------------------------------------------------------------
 
-        dataframes.append(df)
+def juntar(lidos, tipado=True, manter_esparsas=False):
+    """Junta os DataFrames de `ler_por_arquivo` num só (None se nenhum teve linhas)."""
+    dataframes = [df for df in lidos if df is not None]
+
+    if not dataframes:
+        return None
 
     # concatena tudo num único DataFrame
-    df_final = pd.concat(dataframes, ignore_index=True)
-    return uploaded_files, df_final
+    with etapa("efd.concatenar"):
+        if not tipado:
+            return pd.concat(dataframes, ignore_index=True)
+        df_final = concatenar(dataframes)
+        if not manter_esparsas:
+            df_final = remover_esparsas(df_final)
+    return df_final
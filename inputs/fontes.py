@@ -0,0 +1,208 @@
+import io
+import mmap
+import os
+import re
+from contextlib import contextmanager
+
+from utils.instrumentacao import etapa
+from utils.paralelo import desempacotar, empacotar, mapear, numero_workers
+
+
+def abrir_arquivo(origem, nome=None):
+    """
+    Normaliza a entrada dos loaders: caminho, bytes ou objeto de arquivo já aberto
+    (ex.: UploadedFile do Streamlit). Devolve um objeto binário com .name, .read e .seek;
+    .name é só o nome do arquivo, sem diretório.
+    """
+    if isinstance(origem, (str, os.PathLike)):
+        bruto = io.FileIO(origem)
+        bruto.name = nome or os.path.basename(origem)
+        return io.BufferedReader(bruto)
+    if isinstance(origem, (bytes, bytearray, memoryview)):
+        arquivo = io.BytesIO(origem)
+        arquivo.name = nome or "arquivo"
+        return arquivo
+    return origem
+
+
+def tamanho_arquivo(arquivo):
+    """Tamanho em bytes de um arquivo aberto (sem mudar a posição de leitura)."""
+    tamanho = getattr(arquivo, "size", None)
+    if tamanho is not None:
+        return tamanho
+    posicao = arquivo.tell()
+    tamanho = arquivo.seek(0, io.SEEK_END)
+    arquivo.seek(posicao)
+    return tamanho
+
+
+@contextmanager
+def mapear_arquivo(arquivo):
+    """
+    Conteúdo de `arquivo` como buffer de bytes, sem cópia: mmap (só leitura) quando é
+    um arquivo em disco, os bytes do próprio BytesIO quando é um upload (ex.:
+    UploadedFile). Outros objetos são lidos inteiros. O `re` busca direto no buffer.
+    """
+    try:
+        descritor = arquivo.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        descritor = None
+    if descritor is not None:
+        if os.fstat(descritor).st_size == 0:
+            # mmap não aceita arquivo vazio
+            yield b""
+            return
+        with mmap.mmap(descritor, 0, access=mmap.ACCESS_READ) as mapa:
+            if hasattr(mapa, "madvise"):
+                # leitura de ponta a ponta: o kernel lê adiante e libera as páginas já lidas
+                mapa.madvise(mmap.MADV_SEQUENTIAL)
+            yield mapa
+        return
+    if hasattr(arquivo, "getvalue"):
+        # BytesIO criado a partir de bytes: getvalue devolve os próprios bytes (getbuffer copiaria)
+        yield arquivo.getvalue()
+        return
+    arquivo.seek(0)
+    yield arquivo.read()
+
+
+# trecho do buffer processado de cada vez (as páginas de um mmap já processadas são
+# devolvidas ao sistema)
+JANELA_MMAP = 64 * 1024 * 1024
+_QUEBRA = re.compile(b"\n")
+
+
+def iterar_linhas(dados, prefixos=None):
+    """
+    Devolve as linhas de `dados` (ver `mapear_arquivo`) em bytes, sem o fim de linha,
+    como `bytes.splitlines`, uma janela do buffer por vez. Com `prefixos` (bytes), só
+    as linhas que começam por um deles, achadas pelo `re` direto no buffer: as demais
+    nem são copiadas.
+    """
+    total = len(dados)
+    if prefixos is not None:
+        padrao, primeira = _padroes_linhas(frozenset(prefixos))
+        encontrada = primeira.match(dados)
+        if encontrada:
+            yield encontrada.group(1)
+    inicio = 0
+    while inicio < total:
+        quebra = _QUEBRA.search(dados, inicio + JANELA_MMAP) if inicio + JANELA_MMAP < total else None
+        if prefixos is None:
+            # a janela inclui o '\n' final, para o splitlines não gerar linha vazia a mais
+            fim = total if quebra is None else quebra.end()
+            yield from bytes(dados[inicio:fim]).splitlines()
+        else:
+            # o padrão começa no '\n' que antecede a linha: a janela para antes dele
+            fim = total if quebra is None else quebra.start()
+            for encontrada in padrao.finditer(dados, inicio, fim):
+                yield encontrada.group(1)
+        _liberar_paginas(dados, inicio, fim)
+        inicio = fim
+
+
+def _liberar_paginas(dados, inicio, fim):
+    # páginas de um mmap já lidas contam no RSS até o fim; MADV_DONTNEED as devolve
+    if isinstance(dados, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED"):
+        inicio -= inicio % mmap.PAGESIZE
+        fim -= fim % mmap.PAGESIZE
+        if fim > inicio:
+            dados.madvise(mmap.MADV_DONTNEED, inicio, fim - inicio)
+
+
+_PADROES_LINHAS = {}
+
+
+def _padroes_linhas(prefixos):
+    # (linhas depois de um '\n', primeira linha do buffer); o '\n' literal no início
+    # do padrão deixa o `re` saltar direto de uma quebra de linha para a outra
+    padroes = _PADROES_LINHAS.get(prefixos)
+    if padroes is None:
+        # prefixos maiores primeiro, para um não esconder outro que comece igual
+        opcoes = b"|".join(re.escape(p) for p in sorted(prefixos, key=len, reverse=True))
+        linha = rb"((?:" + opcoes + rb")[^\r\n]*)"
+        padroes = re.compile(b"\n" + linha), re.compile(linha)
+        _PADROES_LINHAS[prefixos] = padroes
+    return padroes
+
+
+@contextmanager
+def arquivos_abertos(origens):
+    """Abre cada origem com `abrir_arquivo` e fecha, na saída, só os que foram abertos aqui."""
+    arquivos = [abrir_arquivo(origem) for origem in origens]
+    try:
+        yield arquivos
+    finally:
+        for origem, arquivo in zip(origens, arquivos):
+            if arquivo is not origem:
+                arquivo.close()
+
+
+# abaixo disto subir o pool (spawn + import do pandas em cada processo) custa mais que ler
+BYTES_MINIMOS_PARALELO = 32 * 1024 * 1024
+
+
+def ler_arquivos(origens, ler, parser, versao, cache=None, workers=None,
+                 parametros=None, parametros_cache=None, bytes_minimos=BYTES_MINIMOS_PARALELO):
+    """
+    Aplica `ler(arquivo, **parametros)` a cada arquivo e devolve os resultados na
+    ordem de `origens`. Com `cache`, só os arquivos sem entrada são lidos (e gravados);
+    quando há mais de um e eles somam ao menos `bytes_minimos`, cada um é lido num
+    processo do pool, que devolve as tabelas em Arrow IPC (ver utils.paralelo.empacotar).
+    `ler` precisa ser uma função de módulo (é enviada aos workers).
+    """
+    parametros = parametros or {}
+    parametros_cache = parametros_cache or {}
+    resultados = []
+    pendentes = []
+    with arquivos_abertos(origens) as arquivos:
+        for indice, (origem, arquivo) in enumerate(zip(origens, arquivos)):
+            chave = None
+            resultado = None
+            if cache is not None:
+                chave, resultado = cache.consultar(
+                    arquivo, parser, versao, nome=arquivo.name, **parametros_cache
+                )
+            resultados.append(resultado)
+            if resultado is None:
+                pendentes.append((indice, origem, arquivo, chave))
+
+        total = sum(tamanho_arquivo(arquivo) for _, _, arquivo, _ in pendentes)
+        n = numero_workers(workers, len(pendentes))
+        if n > 1 and total >= bytes_minimos:
+            # caminhos vão como caminho (o worker abre); uploads vão como bytes
+            tarefas = [
+                (ler, origem if isinstance(origem, (str, os.PathLike)) else _conteudo(arquivo),
+                 arquivo.name, parametros)
+                for _, origem, arquivo, _ in pendentes
+            ]
+            with etapa(f"{parser}.pool", bytes=total, arquivos=len(tarefas), workers=n):
+                lidos = [desempacotar(p) for p in mapear(_ler_tarefa, tarefas, n)]
+        else:
+            lidos = []
+            for _, _, arquivo, _ in pendentes:
+                with etapa(f"{parser}.arquivo", bytes=tamanho_arquivo(arquivo), arquivo=arquivo.name):
+                    lidos.append(ler(arquivo, **parametros))
+
+    for (indice, _, _, chave), resultado in zip(pendentes, lidos):
+        resultados[indice] = resultado
+        if chave is not None and resultado is not None:
+            cache.gravar(chave, resultado)
+    return resultados
+
+
+def _conteudo(arquivo):
+    arquivo.seek(0)
+    conteudo = arquivo.read()
+    arquivo.seek(0)
+    return conteudo
+
+
+def _ler_tarefa(tarefa):
+    # roda no worker: reabre o arquivo e devolve o resultado empacotado em Arrow
+    ler, origem, nome, parametros = tarefa
+    arquivo = abrir_arquivo(origem, nome)
+    try:
+        return empacotar(ler(arquivo, **parametros))
+    finally:
+        arquivo.close()
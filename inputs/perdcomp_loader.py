@@ -1,15 +1,30 @@
 import pandas as pd
-from utils.formatadores import mes_extenso_para_mes_ano
+from inputs.fontes import arquivos_abertos
+from utils.instrumentacao import etapa
+from utils.periodos import chaves_periodo, para_mes_ano
 
-def carregar_xlsx(uploaded_xlsx):
+# mudar sempre que o formato do DataFrame gerado mudar (invalida o cache)
+VERSAO_PARSER = "1"
+
+def carregar_xlsx(uploaded_xlsx, cache=None):
     if not uploaded_xlsx:
         return None
+    if cache is not None:
+        with arquivos_abertos([uploaded_xlsx]) as (arquivo,):
+            return cache.obter(arquivo, "perdcomp", VERSAO_PARSER, lambda: carregar_xlsx(arquivo))
+    with etapa("perdcomp.ler", arquivo=getattr(uploaded_xlsx, "name", None)) as registro:
+        df = _ler_planilha(uploaded_xlsx)
+        registro.linhas = None if df is None else len(df)
+    return df
+
+def _ler_planilha(uploaded_xlsx):
     try:
         df = pd.read_excel(uploaded_xlsx)
         col_periodos = [col for col in df.columns if col.lower().startswith("periodo_apuracao")]
         col_valores = [col for col in df.columns if col.lower().startswith("valor_principal_tributo")]
         if col_periodos and col_valores:
-            df["_periodos_convertidos"] = df[col_periodos[0]].apply(mes_extenso_para_mes_ano)
+            # 'Janeiro de 2024' -> '01/2024', convertendo cada mês distinto uma vez
+            df["_periodos_convertidos"] = para_mes_ano(chaves_periodo(df[col_periodos[0]], "extenso"))
             df[col_valores] = df[col_valores].replace(',', '.', regex=True)
             df[col_valores] = df[col_valores].apply(pd.to_numeric, errors='coerce')
         return df
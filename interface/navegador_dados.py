@@ -0,0 +1,124 @@
+"""
+Navegador das tabelas de dados brutos no Streamlit.
+
+Em vez de mandar o DataFrame inteiro para o navegador (st.dataframe serializa
+tudo em Arrow a cada rerun), a tabela fica fechada até ser pedida e, aberta,
+só a página atual é enviada. Os filtros (registro, período, CNPJ...) e a prévia
+agregada são calculados aqui, no servidor.
+"""
+import pandas as pd
+import streamlit as st
+
+from utils.instrumentacao import etapa
+
+LINHAS_POR_PAGINA = (50, 100, 500, 1000)
+# máximo de valores distintos para uma coluna virar filtro de seleção
+MAXIMO_OPCOES = 5000
+# máximo de colunas numéricas somadas na prévia agregada
+MAXIMO_SOMAS = 6
+
+# rótulo do filtro -> colunas candidatas, na ordem de preferência
+FILTROS_PADRAO = {
+    "Registro": ("REG", 0, "Tipo"),
+    "Período": ("PERIODO", "MOFG", "PeriodoApuracao", "_periodos_convertidos"),
+    "CNPJ": ("CNPJ",),
+    "Situação": ("Situacao",),
+    "Arquivo": ("arquivo_origem", "ArquivoOrigem", "Arquivo"),
+}
+
+
+def colunas_filtro(df, filtros=None):
+    """{rótulo: coluna} dos filtros que existem em `df`."""
+    encontrados = {}
+    for rotulo, candidatas in (filtros or FILTROS_PADRAO).items():
+        for coluna in candidatas:
+            if coluna in df.columns:
+                encontrados[rotulo] = coluna
+                break
+    return encontrados
+
+
+def _opcoes(serie):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        valores = serie.cat.remove_unused_categories().cat.categories
+    else:
+        valores = pd.unique(serie.dropna())
+    if len(valores) > MAXIMO_OPCOES:
+        return None
+    return sorted(valores, key=str)
+
+
+def filtrar(df, selecoes):
+    """Linhas de `df` cujas colunas têm um dos valores selecionados ({coluna: valores})."""
+    mascara = None
+    for coluna, valores in selecoes.items():
+        if not valores:
+            continue
+        atual = df[coluna].isin(valores)
+        mascara = atual if mascara is None else mascara & atual
+    return df if mascara is None else df[mascara]
+
+
+def previa_agregada(df, coluna):
+    """Quantidade de linhas e soma das colunas numéricas por valor de `coluna`."""
+    numericas = [c for c in df.select_dtypes("number").columns if c != coluna][:MAXIMO_SOMAS]
+    grupos = df.groupby(coluna, observed=True, dropna=False, sort=True)
+    previa = grupos.size().to_frame("Linhas")
+    if numericas:
+        somas = grupos[numericas].sum()
+        somas.columns = [f"Soma {c}" for c in numericas]
+        previa = previa.join(somas)
+    return previa.reset_index()
+
+
+def navegar(df, titulo, chave, filtros=None):
+    """
+    Mostra `df` sob demanda: fechado por padrão; aberto, com filtros por
+    registro/período/CNPJ, paginação e prévia agregada. `chave` identifica os
+    widgets desta tabela na sessão.
+    """
+    if df is None:
+        return
+    st.subheader(titulo)
+    st.caption(f"{len(df):,} linhas x {len(df.columns)} colunas".replace(",", "."))
+    if not st.toggle("Mostrar dados", key=f"{chave}_mostrar"):
+        return
+
+    with etapa(f"navegador.{chave}", linhas=len(df)) as registro:
+        colunas = colunas_filtro(df, filtros)
+        selecoes = {}
+        if colunas:
+            campos = st.columns(len(colunas))
+            for campo, (rotulo, coluna) in zip(campos, colunas.items()):
+                opcoes = _opcoes(df[coluna])
+                if opcoes is None:
+                    continue
+                with campo:
+                    selecoes[coluna] = st.multiselect(rotulo, opcoes, key=f"{chave}_filtro_{rotulo}")
+        filtrado = filtrar(df, selecoes)
+        registro.extras["linhas_filtradas"] = len(filtrado)
+
+        esquerda, direita = st.columns(2)
+        with esquerda:
+            por_pagina = st.selectbox("Linhas por página", LINHAS_POR_PAGINA, key=f"{chave}_por_pagina")
+        paginas = max(1, -(-len(filtrado) // por_pagina))
+        # filtros novos podem deixar a página guardada além da última
+        if st.session_state.get(f"{chave}_pagina", 1) > paginas:
+            st.session_state[f"{chave}_pagina"] = paginas
+        with direita:
+            pagina = st.number_input(
+                "Página", min_value=1, max_value=paginas, key=f"{chave}_pagina"
+            )
+        inicio = (pagina - 1) * por_pagina
+        st.dataframe(filtrado.iloc[inicio:inicio + por_pagina])
+        st.caption(
+            f"Página {pagina} de {paginas}: linhas {min(inicio + 1, len(filtrado))}-"
+            f"{min(inicio + por_pagina, len(filtrado))} de {len(filtrado)} filtradas"
+        )
+
+        if colunas:
+            agrupar = st.selectbox(
+                "Prévia agregada por", ["(nenhuma)", *colunas], key=f"{chave}_agrupar"
+            )
+            if agrupar != "(nenhuma)":
+                st.dataframe(previa_agregada(filtrado, colunas[agrupar]), hide_index=True)
@@ -0,0 +1,251 @@
+"""
+Cruzamento em lote, sem Streamlit.
+
+Percorre um diretório com arquivos EFD (.txt), DCTF (.dec), DARF (.pdf) e
+PER/DCOMP (.xlsx), agrupa por CNPJ, gera o resumo de cada empresa em processos
+paralelos e grava um único arquivo consolidado (.xlsx, .csv ou .parquet).
+
+    python lote.py entradas/ -o consolidado.xlsx --workers 8
+
+Com --duckdb, cada arquivo é lido sozinho e só as suas linhas classificadas vão
+para Parquet; o cruzamento roda no DuckDB (calculos.resumo_duckdb), para lotes
+em que as fontes de uma empresa não cabem na memória.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from calculos.resumo import gerar_df_resumo
+from calculos.resumo_duckdb import ArmazemParquet, duckdb_disponivel, gerar_resumos_duckdb
+from inputs.darf_loader import carregar_darfs
+from inputs.dctf_loader import carregar_tabelas
+from inputs.efd_loader import carregar_e_processar_arquivos
+from inputs.perdcomp_loader import carregar_xlsx
+from utils.cache import obter_cache_padrao
+from utils.exportacao import gerar_excel
+from utils.paralelo import mapear
+
+# extensão -> fonte
+EXTENSOES = {".txt": "efd", ".dec": "dctf", ".pdf": "darf", ".xlsx": "perdcomp"}
+FONTES = ["efd", "dctf", "darf", "perdcomp"]
+SEM_CNPJ = "SEM_CNPJ"
+
+_CNPJ_NO_CAMINHO = re.compile(r"(?<!\d)(\d{14})(?!\d)")
+
+
+def _cnpj_efd(caminho):
+    # o CNPJ é o 9º campo do registro 0000, a primeira linha do arquivo
+    with open(caminho, "rb") as arquivo:
+        for linha in arquivo:
+            if linha.startswith(b"|0000|"):
+                campos = linha.decode("latin1").split("|")[1:]
+                return campos[8] if len(campos) > 8 and campos[8] else None
+    return None
+
+
+def _cnpj_dctf(caminho):
+    # toda linha de registro traz o CNPJ nas posições 4-17
+    with open(caminho, "rb") as arquivo:
+        for linha in arquivo:
+            if linha[:1] == b"R":
+                cnpj = linha[3:17].decode("latin1").strip()
+                return cnpj if cnpj.isdigit() else None
+    return None
+
+
+def _cnpj_caminho(caminho, raiz):
+    # DARF e PER/DCOMP: CNPJ no nome do arquivo ou de um diretório (pontuação ignorada)
+    partes = [re.sub(r"[.\-/ ]", "", parte) for parte in caminho.relative_to(raiz).parts]
+    for parte in reversed(partes):
+        encontrado = _CNPJ_NO_CAMINHO.search(parte)
+        if encontrado:
+            return encontrado.group(1)
+    return None
+
+
+def agrupar_por_cnpj(raiz):
+    """
+    Devolve {cnpj: {fonte: [caminhos]}}. EFD e DCTF são identificadas pelo conteúdo;
+    DARF e PER/DCOMP pelo caminho ou, sem CNPJ no caminho, pelo único CNPJ de EFD/DCTF
+    do diretório mais próximo.
+    """
+    raiz = Path(raiz)
+    grupos = {}
+    sem_cnpj = []
+    cnpjs_por_diretorio = {}
+    for caminho in sorted(p for p in raiz.rglob("*") if p.is_file()):
+        fonte = EXTENSOES.get(caminho.suffix.lower())
+        if fonte is None:
+            continue
+        if fonte == "efd":
+            cnpj = _cnpj_efd(caminho)
+        elif fonte == "dctf":
+            cnpj = _cnpj_dctf(caminho)
+        else:
+            cnpj = _cnpj_caminho(caminho, raiz)
+        if cnpj is None:
+            sem_cnpj.append((fonte, caminho))
+            continue
+        if fonte in ("efd", "dctf"):
+            cnpjs_por_diretorio.setdefault(caminho.parent, set()).add(cnpj)
+        grupos.setdefault(cnpj, {f: [] for f in FONTES})[fonte].append(caminho)
+
+    for fonte, caminho in sem_cnpj:
+        cnpj = SEM_CNPJ
+        # sobe os diretórios até a raiz procurando um único CNPJ de EFD/DCTF
+        for diretorio in caminho.parents:
+            candidatos = cnpjs_por_diretorio.get(diretorio, set())
+            if len(candidatos) == 1:
+                cnpj = next(iter(candidatos))
+            if candidatos or diretorio == raiz:
+                break
+        grupos.setdefault(cnpj, {f: [] for f in FONTES})[fonte].append(caminho)
+    return grupos
+
+
+def reconciliar_empresa(tarefa):
+    """Carrega as fontes de um CNPJ e gera o resumo. Roda dentro de um worker."""
+    cnpj, arquivos, usar_cache = tarefa
+    cache = obter_cache_padrao() if usar_cache else None
+
+    # já estamos num worker: os arquivos da empresa são lidos em sequência
+    _, df_efd = carregar_e_processar_arquivos(arquivos["efd"], cache=cache, workers=1)
+    df_dctf = None
+    if arquivos["dctf"]:
+        df_dctf = pd.concat(carregar_tabelas(arquivos["dctf"], cache=cache, workers=1).values(), ignore_index=True)
+    df_darf = carregar_darfs(arquivos["darf"], cache=cache, workers=1)
+    planilhas = [carregar_xlsx(caminho, cache=cache) for caminho in arquivos["perdcomp"]]
+    planilhas = [p for p in planilhas if p is not None]
+    df_perdcomp = pd.concat(planilhas, ignore_index=True) if planilhas else None
+
+    resumo = gerar_df_resumo(df_efd, df_dctf, df_darf, df_perdcomp)
+    resumo.insert(0, "CNPJ", cnpj)
+    erros = list(df_darf.attrs.get("erros", [])) if df_darf is not None else []
+    return resumo, erros
+
+
+def _carregar_arquivo(fonte, caminho, cache):
+    if fonte == "efd":
+        return carregar_e_processar_arquivos([caminho], cache=cache, workers=1)[1]
+    if fonte == "dctf":
+        return pd.concat(carregar_tabelas([caminho], cache=cache, workers=1).values(), ignore_index=True)
+    if fonte == "darf":
+        return carregar_darfs([caminho], cache=cache, workers=1)
+    return carregar_xlsx(caminho, cache=cache)
+
+
+def armazenar_empresa(tarefa):
+    """
+    Grava as linhas classificadas de cada arquivo de um CNPJ no armazém Parquet
+    (modo --duckdb), um arquivo por vez. Roda dentro de um worker.
+    """
+    cnpj, arquivos, usar_cache, diretorio = tarefa
+    cache = obter_cache_padrao() if usar_cache else None
+    armazem = ArmazemParquet(diretorio)
+    erros = []
+    for fonte in FONTES:
+        for caminho in arquivos[fonte]:
+            df = _carregar_arquivo(fonte, caminho, cache)
+            if fonte == "darf" and df is not None:
+                erros.extend(df.attrs.get("erros", []))
+            armazem.incluir(fonte, cnpj, caminho, df)
+    return erros
+
+
+def _reportar_erros(cnpj, erros):
+    for erro in erros:
+        pagina = f", página {erro['pagina']}" if erro["pagina"] else ""
+        print(f"[{cnpj}] DARF {erro['arquivo']}{pagina}: {erro['erro']}", file=sys.stderr)
+
+
+def _resumos_duckdb(tarefas, args):
+    armazem = ArmazemParquet(args.duckdb)
+    # o armazém guarda só a execução atual; a releitura rápida fica com o cache de leitura
+    armazem.limpar()
+    tarefas = [(cnpj, arquivos, usar_cache, args.duckdb) for cnpj, arquivos, usar_cache in tarefas]
+    resultados = mapear(armazenar_empresa, tarefas, args.workers, isolar_erros=True)
+    falhas = set()
+    for (cnpj, *_), resultado in zip(tarefas, resultados):
+        if isinstance(resultado, Exception):
+            falhas.add(cnpj)
+            print(f"[{cnpj}] falhou: {type(resultado).__name__}: {resultado}", file=sys.stderr)
+        else:
+            _reportar_erros(cnpj, resultado)
+    validos = [cnpj for cnpj, *_ in tarefas if cnpj not in falhas]
+    resumos = []
+    for cnpj, resumo in gerar_resumos_duckdb(armazem, cnpjs=validos, limite_memoria=args.memoria_duckdb):
+        resumo.insert(0, "CNPJ", cnpj)
+        resumos.append(resumo)
+    return resumos, len(falhas)
+
+
+def gravar_consolidado(df, destino):
+    destino = Path(destino)
+    sufixo = destino.suffix.lower()
+    if sufixo == ".csv":
+        df.to_csv(destino, index=False, sep=";", decimal=",", encoding="utf-8-sig")
+    elif sufixo == ".parquet":
+        df.to_parquet(destino, index=False)
+    else:
+        destino.write_bytes(gerar_excel({"Resumo Consolidado": df}))
+
+
+def _resumos_pandas(tarefas, args):
+    resultados = mapear(reconciliar_empresa, tarefas, args.workers, isolar_erros=True)
+    resumos = []
+    falhas = 0
+    for (cnpj, _, _), resultado in zip(tarefas, resultados):
+        if isinstance(resultado, Exception):
+            falhas += 1
+            print(f"[{cnpj}] falhou: {type(resultado).__name__}: {resultado}", file=sys.stderr)
+            continue
+        resumo, erros = resultado
+        _reportar_erros(cnpj, erros)
+        resumos.append(resumo)
+    return resumos, falhas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entrada", help="diretório com os arquivos (subpastas incluídas)")
+    parser.add_argument("-o", "--saida", default="resumo_consolidado.xlsx",
+                        help="arquivo consolidado (.xlsx, .csv ou .parquet)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos em paralelo (padrão: todos os núcleos)")
+    parser.add_argument("--sem-cache", action="store_true", help="não usar o cache de leitura em disco")
+    parser.add_argument("--duckdb", metavar="DIRETORIO", default=None,
+                        help="cruzar fora da memória: Parquet neste diretório + DuckDB (exige duckdb e pyarrow)")
+    parser.add_argument("--memoria-duckdb", default="2GB", help="limite de memória do DuckDB (padrão: 2GB)")
+    args = parser.parse_args(argv)
+    if args.duckdb and not duckdb_disponivel():
+        print("--duckdb exige os pacotes duckdb e pyarrow (pip install duckdb pyarrow)", file=sys.stderr)
+        return 2
+
+    inicio = time.perf_counter()
+    grupos = agrupar_por_cnpj(args.entrada)
+    if not grupos:
+        print(f"Nenhum arquivo EFD/DCTF/DARF/PER-DCOMP em {args.entrada}", file=sys.stderr)
+        return 1
+
+    tarefas = [(cnpj, arquivos, not args.sem_cache) for cnpj, arquivos in sorted(grupos.items())]
+    if args.duckdb:
+        resumos, falhas = _resumos_duckdb(tarefas, args)
+    else:
+        resumos, falhas = _resumos_pandas(tarefas, args)
+
+    if resumos:
+        gravar_consolidado(pd.concat(resumos, ignore_index=True), args.saida)
+    print(
+        f"{len(resumos)} empresa(s) processada(s), {falhas} com falha, "
+        f"em {time.perf_counter() - inicio:.1f}s -> {os.path.abspath(args.saida)}"
+    )
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
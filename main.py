@@ -1,28 +1,103 @@
+import os
 import streamlit as st
 import pandas as pd
-import re
-from inputs.efd_loader import carregar_e_processar_arquivos
-from inputs.dctf_loader import carregar_arquivos as carregar_dctf
-from inputs.darf_loader import carregar_darfs
+from inputs import darf_loader, dctf_loader, dctfweb_loader, efd_loader
+from inputs.efd_loader import REGISTROS_RESUMO
 from inputs.perdcomp_loader import carregar_xlsx
-from calculos.resumo import gerar_df_resumo
-from calculos.dctf_dataframe import gerar_dataframes as gerar_dctf_dfs
+from calculos.conciliacao import TOLERANCIA_PADRAO, conciliar
+from calculos.incremental import ReconciliacaoIncremental, chave_arquivo
+from interface.navegador_dados import navegar
+from utils.cache import obter_cache_padrao
+from utils.texto import remover_caracteres_ilegais
+from utils.exportacao import MIME_XLSX, MIME_ZIP, gerar_excel, gerar_pacote, parquet_disponivel
+from utils.instrumentacao import etapa, iniciar
 
 st.title("Cruzamento de Débitos de PIS e COFINS")
 
-# Função para remover caracteres ilegais
+# rastreamento de desempenho desta execução (cada rerun do Streamlit gera um novo)
+perfis = {"Só tempos": None, "cProfile": "cprofile", "tracemalloc (memória)": "tracemalloc"}
+perfil = st.sidebar.selectbox("Perfil de desempenho", list(perfis))
+rastro = iniciar(perfis[perfil])
 
-def remove_illegal_chars(val):
-    if isinstance(val, str):
-        return re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f]', '', val)
-    return val
+# cache em disco dos arquivos já lidos (reaproveitado entre reruns e sessões)
+@st.cache_resource
+def obter_cache():
+    return obter_cache_padrao()
+
+cache = obter_cache()
+
+# agregados parciais por arquivo: incluir/trocar/remover um arquivo recalcula só os seus períodos
+if "reconciliacao" not in st.session_state:
+    st.session_state["reconciliacao"] = ReconciliacaoIncremental()
+reconciliacao = st.session_state["reconciliacao"]
+
+# caracteres de controle quebram a exportação para Excel; só as colunas afetadas são limpas
+def sanitizar(df, fonte):
+    with etapa(f"sanitizacao.{fonte}", linhas=len(df)) as registro:
+        df, colunas = remover_caracteres_ilegais(df)
+        registro.extras["colunas_limpas"] = [str(c) for c in colunas]
+    return df, colunas
+
+# o que já foi lido de cada upload fica na sessão: um rerun só lê os arquivos novos (todos
+# numa leitura só) e só junta e limpa de novo quando a lista de arquivos da fonte muda
+def carregar_fonte(fonte, arquivos, ler, juntar, para_resumo=lambda parte: parte,
+                   parametros=None, sanitizar_como=None):
+    """
+    `ler(novos)` devolve uma parte por arquivo novo e `juntar(partes)` monta o DataFrame
+    exibido. A reconciliação recebe `para_resumo(parte)` de cada arquivo, sem ler de novo.
+    """
+    arquivos = list(arquivos or [])
+    fontes = st.session_state.setdefault("fontes", {})
+    anterior = fontes.get(fonte)
+    if anterior is None or anterior["parametros"] != parametros:
+        anterior = {"parametros": parametros, "partes": {}, "chaves": None, "df": None, "limpas": []}
+    chaves = [chave_arquivo(arquivo) for arquivo in arquivos]
+    partes = {chave: anterior["partes"][chave] for chave in chaves if chave in anterior["partes"]}
+    novos = [(chave, arquivo) for chave, arquivo in zip(chaves, arquivos) if chave not in partes]
+    if novos:
+        partes.update(zip([chave for chave, _ in novos], ler([arquivo for _, arquivo in novos])))
+    atual = dict(anterior, partes=partes)
+    if chaves != anterior["chaves"]:
+        df, limpas = (juntar([partes[chave] for chave in chaves]) if chaves else None), []
+        if df is not None and sanitizar_como:
+            df, limpas = sanitizar(df, sanitizar_como)
+        atual.update(chaves=chaves, df=df, limpas=limpas)
+    fontes[fonte] = atual
+    if atual["limpas"]:
+        st.caption(f"{sanitizar_como}: caracteres de controle removidos de {', '.join(map(str, atual['limpas']))}")
+    reconciliacao.sincronizar(fonte, arquivos, lambda arquivo: para_resumo(partes[chave_arquivo(arquivo)]))
+    return atual["df"]
+
+# processos para ler vários arquivos (EFD/DCTF) e as páginas dos PDFs em paralelo
+workers = st.sidebar.number_input(
+    "Processos para leitura dos arquivos", min_value=1, max_value=os.cpu_count() or 1,
+    value=os.cpu_count() or 1
+)
 
 # 1) EFD (SPED txt)
-uploaded_efd_files, df_efd = carregar_e_processar_arquivos()
+# por padrão só os registros usados no resumo são carregados;
+# o dump completo é para a aba de auditoria do Excel
+efd_completa = st.checkbox(
+    "Carregar todos os registros da EFD (auditoria)", value=False,
+    help="A EFD inteira fica na memória, e a leitura é mais lenta que a do resumo.",
+)
+# no dump completo, campos quase sempre vazios (ex.: os do 0000) são descartados
+efd_esparsas = efd_completa and st.checkbox("Manter colunas esparsas da EFD", value=False)
+uploaded_efd = st.file_uploader(
+    "Selecione um ou mais arquivos .txt",
+    type=["txt"],
+    accept_multiple_files=True
+)
+registros_efd = None if efd_completa else REGISTROS_RESUMO
+df_efd = carregar_fonte(
+    "efd", uploaded_efd,
+    lambda novos: efd_loader.ler_por_arquivo(novos, registros=registros_efd, cache=cache, workers=workers),
+    lambda partes: efd_loader.juntar(partes, manter_esparsas=efd_esparsas),
+    parametros=(efd_completa, efd_esparsas),
+)
 if df_efd is not None:
-    df_efd = df_efd.applymap(remove_illegal_chars)
-    st.subheader("Dados EFD")
-    st.dataframe(df_efd)
+    # a EFD já chega limpa do loader (limpeza em bytes, linha a linha)
+    navegar(df_efd, "Dados EFD", "efd")
 
 # 2) DCTF (.dec)
 uploaded_dctf = st.file_uploader(
@@ -30,14 +105,17 @@ uploaded_dctf = st.file_uploader(
     type="dec",
     accept_multiple_files=True
 )
-df_dctf = pd.DataFrame()
-if uploaded_dctf:
-    raw_dctf = carregar_dctf(uploaded_dctf)
-    dfs = gerar_dctf_dfs(raw_dctf)
-    df_dctf = pd.concat(dfs.values(), ignore_index=True)
-    df_dctf = df_dctf.applymap(remove_illegal_chars)
-    st.subheader("Dados DCTF")
-    st.dataframe(df_dctf)
+df_dctf = carregar_fonte(
+    "dctf", uploaded_dctf,
+    lambda novos: dctf_loader.ler_por_arquivo(novos, cache=cache, workers=workers),
+    lambda partes: pd.concat(dctf_loader.juntar(partes).values(), ignore_index=True),
+    para_resumo=lambda parte: pd.concat(dctf_loader.juntar([parte]).values(), ignore_index=True),
+    sanitizar_como="DCTF",
+)
+if df_dctf is None:
+    df_dctf = pd.DataFrame()
+else:
+    navegar(df_dctf, "Dados DCTF", "dctf")
 
 # 3) DARF (PDF)
 uploaded_pdfs = st.file_uploader(
@@ -45,11 +123,25 @@ uploaded_pdfs = st.file_uploader(
     type="pdf",
     accept_multiple_files=True
 )
-df_darf = carregar_darfs(uploaded_pdfs) if uploaded_pdfs else None
+# PDFs com páginas em erro não vão para o cache em disco, mas ficam na sessão (não são extraídos de novo)
+df_darf = carregar_fonte(
+    "darf", uploaded_pdfs,
+    lambda novos: darf_loader.ler_por_arquivo(novos, cache=cache, workers=workers),
+    darf_loader.juntar,
+    para_resumo=lambda parte: parte["valores"],
+    sanitizar_como="DARF",
+)
 if df_darf is not None:
-    df_darf = df_darf.applymap(remove_illegal_chars)
-    st.subheader("Dados DARF")
-    st.dataframe(df_darf)
+    for erro in df_darf.attrs.get("erros", []):
+        pagina = f", página {erro['pagina']}" if erro["pagina"] else ""
+        st.warning(f"DARF {erro['arquivo']}{pagina}: {erro['erro']}")
+    desempenho = df_darf.attrs.get("desempenho")
+    if desempenho and desempenho["paginas"]:
+        st.caption(
+            f"{desempenho['paginas']} páginas em {desempenho['segundos']:.1f}s "
+            f"({desempenho['paginas_por_segundo']:.1f} páginas/s, {desempenho['workers']} processos)"
+        )
+    navegar(df_darf, "Dados DARF", "darf")
 
 # 4) PER/DCOMP (XLSX)
 uploaded_xlsx = st.file_uploader(
@@ -57,18 +149,47 @@ uploaded_xlsx = st.file_uploader(
     type="xlsx",
     accept_multiple_files=False
 )
-df_perdcomp = carregar_xlsx(uploaded_xlsx) if uploaded_xlsx else None
+df_perdcomp = carregar_fonte(
+    "perdcomp", [uploaded_xlsx] if uploaded_xlsx else [],
+    lambda novos: [carregar_xlsx(arquivo, cache=cache) for arquivo in novos],
+    lambda partes: partes[0],
+    sanitizar_como="PER/DCOMP",
+)
 if df_perdcomp is not None:
-    df_perdcomp = df_perdcomp.applymap(remove_illegal_chars)
-    st.subheader("Dados PER/DCOMP")
-    st.dataframe(df_perdcomp)
+    navegar(df_perdcomp, "Dados PER/DCOMP", "perdcomp")
 
-# 5) Gerar e exibir resumo consolidado
-# Resumo roda com EFD, DCTF e DARF; PER/DCOMP continua opcional
+# 5) DCTFWeb (XML), opcional: quando carregada, entra no resumo como mais uma fonte
+uploaded_xmls = st.file_uploader(
+    "Escolha arquivos XML da DCTFWeb (opcional)",
+    type="xml",
+    accept_multiple_files=True
+)
+df_dctfweb = carregar_fonte(
+    "dctfweb", uploaded_xmls,
+    lambda novos: dctfweb_loader.ler_por_arquivo(novos, cache=cache, workers=workers),
+    dctfweb_loader.juntar,
+    para_resumo=lambda parte: parte["valores"],
+    sanitizar_como="DCTFWeb",
+)
+if df_dctfweb is not None:
+    for erro in df_dctfweb.attrs.get("erros", []):
+        st.warning(f"DCTFWeb {erro['arquivo']}: {erro['erro']}")
+    navegar(df_dctfweb, "Dados DCTFWeb", "dctfweb")
+
+if cache is not None:
+    estatisticas = cache.estatisticas()
+    st.caption(
+        f"Cache de leitura: {estatisticas['acertos']} acertos, {estatisticas['faltas']} faltas, "
+        f"{estatisticas['bytes'] / 1024 / 1024:.1f} MB em disco"
+    )
+
+# 6) Gerar e exibir resumo consolidado
+# Resumo roda com EFD, DCTF e DARF; PER/DCOMP e DCTFWeb continuam opcionais
 if df_efd is None or df_dctf is None or df_darf is None:
     st.info("Carregue EFD, DCTF e DARF para gerar o resumo.")
 else:
-    df_resumo = gerar_df_resumo(df_efd, df_dctf, df_darf, df_perdcomp)
+    # a reconciliação já recebeu cada arquivo novo em carregar_fonte: só os períodos afetados são refeitos
+    df_resumo = reconciliacao.resumo()
     if df_resumo is None or df_resumo.empty:
         st.warning("Resumo consolidado vazio.")
     else:
@@ -81,20 +202,72 @@ else:
         total_divergencia = total_pis + total_cof
         st.metric("Divergência EFD Total (PIS + COFINS)", f"R$ {total_divergencia:,.2f}")
 
-        # Botão para download do Excel com abas completas
-        excel_filename = "resumo_cruzamento.xlsx"
-        with pd.ExcelWriter(excel_filename) as writer:
-            df_efd.to_excel(writer, sheet_name='Dados EFD', index=False)
-            df_dctf.to_excel(writer, sheet_name='Dados DCTF', index=False)
-            df_darf.to_excel(writer, sheet_name='Dados DARF', index=False)
-            if df_perdcomp is not None:
-                df_perdcomp.to_excel(writer, sheet_name='Dados PERDCOMP', index=False)
-            df_resumo.to_excel(writer, sheet_name='Resumo Consolidado', index=False)
-
-        with open(excel_filename, "rb") as file:
+        # Conciliação linha a linha: cada débito da DCTF com o DARF ou a PER/DCOMP que o paga
+        tolerancia = st.number_input(
+            "Tolerância para casar valores (R$)", min_value=0.0, value=TOLERANCIA_PADRAO / 100, step=0.01
+        )
+        assinatura_conciliacao = (
+            round(tolerancia * 100), *(tuple(reconciliacao.arquivos(f)) for f in ("dctf", "darf", "perdcomp"))
+        )
+        conciliacao = st.session_state.get("conciliacao")
+        if conciliacao is None or conciliacao[0] != assinatura_conciliacao:
+            conciliacao = (assinatura_conciliacao, conciliar(df_dctf, df_darf, df_perdcomp, round(tolerancia * 100)))
+            st.session_state["conciliacao"] = conciliacao
+        df_conciliacao = conciliacao[1]
+        situacoes = df_conciliacao["Situacao"].value_counts()
+        navegar(df_conciliacao, "Conciliação por Débito", "conciliacao")
+        st.caption(", ".join(f"{situacao}: {quantidade}" for situacao, quantidade in situacoes.items()))
+
+        # Exportação: o arquivo só é gerado quando pedido, em memória (sem arquivo fixo em disco)
+        abas = {
+            'Dados EFD': df_efd,
+            'Dados DCTF': df_dctf,
+            'Dados DARF': df_darf,
+            'Dados PERDCOMP': df_perdcomp,
+            'Dados DCTFWeb': df_dctfweb,
+            'Resumo Consolidado': df_resumo,
+            'Conciliação': df_conciliacao,
+        }
+        formatos = {
+            "Excel (.xlsx)": ("resumo_cruzamento.xlsx", MIME_XLSX, gerar_excel),
+            "Pacote CSV (.zip)": ("resumo_cruzamento_csv.zip", MIME_ZIP, lambda a: gerar_pacote(a, "csv")),
+            "Pacote Parquet (.zip)": ("resumo_cruzamento_parquet.zip", MIME_ZIP, lambda a: gerar_pacote(a, "parquet")),
+        }
+        if not parquet_disponivel():
+            del formatos["Pacote Parquet (.zip)"]
+        formato = st.radio("Formato de exportação", list(formatos), horizontal=True)
+        nome_arquivo, mime, gerar = formatos[formato]
+        # o arquivo preparado só vale para os mesmos arquivos de entrada e formato
+        assinatura = (
+            formato, efd_completa, assinatura_conciliacao,
+            *(tuple(reconciliacao.arquivos(f)) for f in ("efd", "dctf", "darf", "perdcomp", "dctfweb")),
+        )
+        if st.button("Preparar arquivo para download"):
+            with st.spinner("Gerando arquivo..."):
+                st.session_state["exportacao"] = (assinatura, gerar(abas))
+        exportacao = st.session_state.get("exportacao")
+        if exportacao is not None and exportacao[0] == assinatura:
             st.download_button(
-                label="Baixar Excel",
-                data=file,
-                file_name=excel_filename,
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                label=f"Baixar {nome_arquivo}",
+                data=exportacao[1],
+                file_name=nome_arquivo,
+                mime=mime
             )
+
+# 7) Desempenho desta execução
+rastro.encerrar()
+with st.expander("Desempenho (tempo por etapa)"):
+    tabela = rastro.tabela()
+    if tabela.empty:
+        st.caption("Nenhuma etapa medida nesta execução.")
+    else:
+        st.caption(f"Execução completa em {rastro.segundos:.2f}s")
+        st.dataframe(tabela, hide_index=True)
+    if rastro.relatorio_cprofile:
+        st.text(rastro.relatorio_cprofile)
+    st.download_button(
+        label="Baixar rastreamento (JSON)",
+        data=rastro.para_json(),
+        file_name=f"rastreamento_{rastro.criado_em:%Y%m%d_%H%M%S}.json",
+        mime="application/json",
+    )
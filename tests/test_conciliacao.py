@@ -0,0 +1,58 @@
+import pandas as pd
+
+from calculos.conciliacao import CONCILIADO, PAGAMENTO_SEM_DEBITO, casar, conciliar
+
+
+def _linhas(*linhas):
+    return pd.DataFrame(linhas, columns=["CNPJ", "Codigo", "PERIODO", "Valor"])
+
+
+def _pares(esquerda, direita, tolerancia=0):
+    pares = casar(esquerda, direita, tolerancia)
+    return sorted(zip(pares["esquerda"], pares["direita"]))
+
+
+def test_cnpj_vazio_numa_linha_nao_mistura_empresas():
+    debitos = _linhas(("11", "6912", 202401, 1000), ("22", "6912", 202401, 1000))
+    # o pagamento da empresa 22 vem primeiro; o sem CNPJ só pode ir para quem sobrar
+    pagamentos = _linhas(("22", "6912", 202401, 1000), (None, "6912", 202401, 1000))
+    assert _pares(debitos, pagamentos) == [(0, 1), (1, 0)]
+
+
+def test_empresa_diferente_nao_casa():
+    debitos = _linhas(("11", "6912", 202401, 1000))
+    pagamentos = _linhas(("22", "6912", 202401, 1000), (None, "6912", 202402, 1000))
+    assert _pares(debitos, pagamentos, tolerancia=100) == []
+
+
+def test_codigo_e_cnpj_vazios_casam_pelo_periodo():
+    debitos = _linhas(("11", "6912", 202401, 1000), ("11", "5856", 202401, 500))
+    pagamentos = _linhas((None, None, 202401, 510), ("11", None, 202401, 1000))
+    assert _pares(debitos, pagamentos, tolerancia=100) == [(0, 1), (1, 0)]
+
+
+def test_pagamento_sem_codigo_casa_na_passada_sem_codigo():
+    # dois DARF vinculados na DCTF; no comprovante, um item veio sem código de receita
+    df_dctf = pd.DataFrame({
+        "Tipo": ["R11", "R11"],
+        "CNPJ": ["11222333000144"] * 2,
+        "CodReceita": ["691201", "585601"],
+        "AnoApuracao": ["2024"] * 2,
+        "MesPeriodo": ["01"] * 2,
+        "ValorPrincipal": ["000000000100000", "000000000050000"],
+        "Referencia": ["A", "B"],
+        "ArquivoOrigem": ["a.dec"] * 2,
+    })
+    df_darf = pd.DataFrame({
+        "CNPJ": ["11.222.333/0001-44"] * 2,
+        "Codigo": ["6912", None],
+        "PeriodoApuracao": ["31/01/2024"] * 2,
+        "PrincipalItem": ["1.000,00", "500,00"],
+        "NumeroDocumento": ["D1", "D2"],
+        "ArquivoOrigem": ["d.pdf"] * 2,
+    })
+    detalhe = conciliar(df_dctf, df_darf, tolerancia=0).set_index("DocumentoDCTF")
+    assert detalhe.loc["A", "Situacao"] == CONCILIADO
+    assert detalhe.loc["B", "Situacao"] == CONCILIADO
+    assert detalhe.loc["B", "DocumentoPagamento"] == "D2"
+    assert (detalhe["Situacao"] != PAGAMENTO_SEM_DEBITO).all()
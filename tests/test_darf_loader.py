@@ -0,0 +1,82 @@
+import io
+import os
+
+from inputs import darf_loader
+
+PAGINA_QUE_CAI = 2
+
+
+def _paginas(caminho):
+    # PDF de mentira: uma página por byte
+    return os.path.getsize(caminho), None
+
+
+def _extrair_ou_cair(tarefa):
+    # roda no worker: derruba o processo (como um segfault no pdfminer) na página PAGINA_QUE_CAI
+    _, inicio, fim = tarefa
+    if inicio <= PAGINA_QUE_CAI < fim:
+        os._exit(1)
+    return [(numero, {"Codigo": [str(numero)]}, None) for numero in range(inicio, fim)]
+
+
+def _sempre_cair(tarefa):
+    os._exit(1)
+
+
+def test_worker_que_cai_vira_erro_da_pagina_sem_derrubar_o_processo(monkeypatch):
+    monkeypatch.setattr(darf_loader, "_extrair_paginas", _extrair_ou_cair)
+    monkeypatch.setattr(darf_loader, "_contar_paginas", _paginas)
+
+    tabelas, erros, desempenho = darf_loader.extrair_pdfs([("a.pdf", b"x" * 6)], workers=2, paginas_por_tarefa=2)
+
+    assert tabelas[0]["Codigo"].tolist() == ["0", "1", "3", "4", "5"]
+    assert [(e["arquivo"], e["pagina"]) for e in erros] == [("a.pdf", PAGINA_QUE_CAI + 1)]
+    assert "BrokenProcessPool" in erros[0]["erro"]
+    assert desempenho["paginas"] == 5
+
+
+def test_workers_que_sempre_caem_desistem_depois_de_falhas_seguidas(monkeypatch):
+    monkeypatch.setattr(darf_loader, "_extrair_paginas", _sempre_cair)
+    monkeypatch.setattr(darf_loader, "_contar_paginas", _paginas)
+
+    _, erros, desempenho = darf_loader.extrair_pdfs([("a.pdf", b"x" * 20)], workers=2, paginas_por_tarefa=4)
+
+    # só FALHAS_SEGUIDAS páginas ganham um processo só delas; o resto vira um erro do arquivo
+    por_pagina = [e for e in erros if e["pagina"] is not None]
+    assert len(por_pagina) == darf_loader.FALHAS_SEGUIDAS
+    resto = [e for e in erros if e["pagina"] is None]
+    assert len(resto) == 1 and resto[0]["erro"].startswith(f"{20 - darf_loader.FALHAS_SEGUIDAS} páginas não extraídas")
+    assert desempenho["paginas"] == 0
+
+
+def _pagina_por_byte(tarefa):
+    caminho, inicio, fim = tarefa
+    with open(caminho, "rb") as arquivo:
+        conteudo = arquivo.read()
+    return [(numero, {"Codigo": [f"{conteudo[numero]:04d}-1"]}, None) for numero in range(inicio, fim)]
+
+
+def _contar_ou_falhar(caminho):
+    if not os.path.getsize(caminho):
+        return None, "ValueError: PDF vazio"
+    return _paginas(caminho)
+
+
+def _upload(conteudo, nome):
+    arquivo = io.BytesIO(conteudo)
+    arquivo.name = nome
+    return arquivo
+
+
+def test_partes_por_arquivo_guardam_os_proprios_erros(monkeypatch):
+    monkeypatch.setattr(darf_loader, "_extrair_paginas", _pagina_por_byte)
+    monkeypatch.setattr(darf_loader, "_contar_paginas", _contar_ou_falhar)
+    uploads = [_upload(b"\x01\x02", "a.pdf"), _upload(b"", "ruim.pdf"), _upload(b"\x03", "b.pdf")]
+
+    partes = darf_loader.ler_por_arquivo(uploads, workers=1)
+
+    assert [list(p["valores"].get("Codigo", [])) for p in partes] == [["00011", "00021"], [], ["00031"]]
+    assert [[e["arquivo"] for e in p["erros"]] for p in partes] == [[], ["ruim.pdf"], []]
+    df = darf_loader.juntar(partes)
+    assert df["Codigo"].tolist() == ["00011", "00021", "00031"]
+    assert [e["arquivo"] for e in df.attrs["erros"]] == ["ruim.pdf"]
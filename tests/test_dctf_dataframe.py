@@ -0,0 +1,44 @@
+import random
+
+import pandas as pd
+import pytest
+
+from benchmarks.geradores import linha_dctf
+from benchmarks.referencia import gerar_dataframes_dctf, parse_registro
+from calculos.dctf_dataframe import decodificar_tipo, gerar_dataframes
+from calculos.dctf_layouts import LAYOUTS_COMPLETOS
+
+
+def _linhas(tipo):
+    rng = random.Random(tipo)
+    completas = [linha_dctf(tipo, rng, Tipo=tipo) for _ in range(3)]
+    return completas + [
+        completas[0][:40],                          # curta: termina no meio dos campos
+        tipo,                                       # só o tipo
+        tipo + " " * 200,                           # campos todos em branco
+        completas[1][:20] + "\t ação  " + completas[1][28:],  # tab e acentos dentro de um campo
+    ]
+
+
+@pytest.mark.parametrize("tipo", sorted(LAYOUTS_COMPLETOS))
+@pytest.mark.parametrize("em_bytes", [False, True], ids=["texto", "bytes"])
+def test_decodificar_tipo_igual_ao_parser_por_linha(tipo, em_bytes):
+    layout = LAYOUTS_COMPLETOS[tipo]
+    linhas = _linhas(tipo)
+    entrada = [linha.encode("latin-1") for linha in linhas] if em_bytes else linhas
+
+    esperado = pd.DataFrame([parse_registro(linha, layout) for linha in linhas])
+    pd.testing.assert_frame_equal(pd.DataFrame(decodificar_tipo(entrada, layout)), esperado)
+
+
+def test_gerar_dataframes_igual_a_referencia():
+    # dois arquivos, tipos ausentes (linha vazia na tabela) e linhas que não são registro
+    conteudos = [
+        ("a.dec", _linhas("R10") + _linhas("R11") + ["", "XYZ qualquer coisa"]),
+        ("b.dec", _linhas("R10")[:2] + _linhas("R01")),
+    ]
+    atual = gerar_dataframes(conteudos)
+    referencia = gerar_dataframes_dctf(conteudos)
+    assert list(atual) == list(referencia)
+    for tipo in referencia:
+        pd.testing.assert_frame_equal(atual[tipo], referencia[tipo], obj=tipo)
@@ -0,0 +1,27 @@
+import io
+
+import pandas as pd
+
+from inputs.dctfweb_loader import carregar_xmls
+
+XML = b"""<?xml version="1.0"?>
+<ns:DCTFWeb xmlns:ns="http://x/dctf"><ns:cabecalho><ns:CNPJ>12345678000199</ns:CNPJ><ns:perApur>2024-01</ns:perApur></ns:cabecalho>
+<ns:Debito><ns:codReceita>6912</ns:codReceita><ns:valor>1.234,56</ns:valor>
+  <ns:Pagamento><ns:valor>100.10</ns:valor></ns:Pagamento></ns:Debito>
+<ns:Debito><ns:codReceita>5856</ns:codReceita><ns:valor>x</ns:valor></ns:Debito>
+</ns:DCTFWeb>"""
+
+
+def _arquivo(dados, nome):
+    arquivo = io.BytesIO(dados)
+    arquivo.name = nome
+    return arquivo
+
+
+def test_valores_nos_dois_formatos_em_centavos():
+    df = carregar_xmls([_arquivo(XML, "a.xml"), _arquivo(b"", "vazio.xml")], workers=1)
+    assert str(df["Valor"].dtype) == "Int64"
+    valores = dict(zip(df["Tipo"].astype(str) + df["CodReceita"], df["Valor"]))
+    assert valores["DEBITO6912"] == 123456
+    assert valores["PAGAMENTO6912"] == 10010
+    assert valores["DEBITO5856"] is pd.NA
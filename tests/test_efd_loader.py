@@ -0,0 +1,44 @@
+import io
+
+import pandas as pd
+import pytest
+
+from calculos.resumo import gerar_df_resumo
+from inputs.efd_loader import carregar_e_processar_arquivos
+
+ABERTURA = "|0000|006|0|||01012024|31012024|EMPRESA|12345678000199|SP|3550308||00|0|\n|0001|0|\n"
+
+
+def _m200(reg, total, campos=13):
+    valores = ["0,00"] * (campos - 2) + [total]
+    return f"|{reg}|{'|'.join(valores[-(campos - 1):])}|\n"
+
+
+def _arquivo(texto, nome="efd.txt"):
+    arquivo = io.BytesIO(texto.encode("latin1"))
+    arquivo.name = nome
+    return arquivo
+
+
+def _resumo(texto, tipado):
+    _, df_efd = carregar_e_processar_arquivos([_arquivo(texto)], tipado=tipado, workers=1)
+    return gerar_df_resumo(df_efd, None, None, None)
+
+
+@pytest.mark.parametrize("texto", [
+    ABERTURA,                                          # sem M200/M600
+    ABERTURA + _m200("M200", "1.234,56", campos=12),   # M200 fora do leiaute de 13 campos
+], ids=["so_abertura", "m200_12_campos"])
+def test_efd_sem_leiaute_de_totais_da_zeros(texto):
+    tipado = _resumo(texto, tipado=True)
+    pd.testing.assert_frame_equal(tipado, _resumo(texto, tipado=False))
+    assert (tipado.drop(columns="PERIODO") == 0).all().all()
+
+
+def test_valor_com_separador_de_milhar_igual_nos_dois_formatos():
+    texto = ABERTURA + _m200("M200", "1.234,56") + _m200("M600", "10,00")
+    tipado = _resumo(texto, tipado=True)
+    pd.testing.assert_frame_equal(tipado, _resumo(texto, tipado=False))
+    total = tipado[tipado["PERIODO"] == "TOTAL"].iloc[0]
+    assert total["[EFD] PIS"] == 1234.56
+    assert total["[EFD] COFINS"] == 10.0
@@ -0,0 +1,26 @@
+import tracemalloc
+
+from utils.instrumentacao import Rastreamento, etapa
+
+
+def test_tracemalloc_ligado_por_outro_continua_ligado():
+    tracemalloc.start()
+    try:
+        with Rastreamento("tracemalloc") as rastro:
+            with etapa("bloco"):
+                dados = list(range(100_000))
+        assert tracemalloc.is_tracing()
+        assert rastro.registros[0].pico_mb > 0
+        del dados
+    finally:
+        tracemalloc.stop()
+
+
+def test_tracemalloc_desligado_por_quem_ligou():
+    assert not tracemalloc.is_tracing()
+    externo = Rastreamento("tracemalloc").iniciar()
+    interno = Rastreamento("tracemalloc").iniciar()
+    interno.encerrar()
+    assert tracemalloc.is_tracing()
+    externo.encerrar()
+    assert not tracemalloc.is_tracing()
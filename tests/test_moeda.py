@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from utils.moeda import texto_para_centavos, valores_para_centavos
+
+
+def test_texto_brasileiro_em_centavos_exatos():
+    serie = pd.Series(["1.234,56", "1234,56", "1234", " -0,01 ", "", None, "abc", "99.999.999.999.999,99"])
+    assert texto_para_centavos(serie).tolist() == [123456, 123456, 123400, -1, 0, 0, 0, 9999999999999999]
+
+
+def test_alem_dos_centavos_arredonda_para_o_par():
+    serie = pd.Series(["0,125", "0,135", "0,1251", "-0,125"])
+    assert texto_para_centavos(serie).tolist() == [12, 14, 13, -12]
+
+
+def test_floats_pelo_valor_decimal():
+    # 2.675 * 100 em float dá 267.49999999999997
+    serie = pd.Series([1234.56, 0.1 + 0.2, 2.675, np.nan, 1e12 + 0.015])
+    assert texto_para_centavos(serie).tolist() == [123456, 30, 268, 0, 100000000000002]
+
+
+def test_separador_decimal_por_valor():
+    serie = pd.Series(["1234.56", "1.234,56", "12", "x"])
+    centavos = valores_para_centavos(serie, separador_decimal=None)
+    assert centavos.dtype == "Int64"
+    assert centavos.tolist() == [123456, 123456, 1200, pd.NA]
+
+
+def test_coluna_mista_e_categorica():
+    mista = pd.Series(["1,5", 2.25, None, 3], dtype=object)
+    assert texto_para_centavos(mista).tolist() == [150, 225, 0, 300]
+    categorica = pd.Series(pd.Categorical(["1,00", "2,50", None, "1,00"]))
+    assert texto_para_centavos(categorica).tolist() == [100, 250, 0, 100]
@@ -0,0 +1,94 @@
+import io
+
+import pandas as pd
+import pytest
+
+from benchmarks.bench_resumo import _centavos, _entradas_referencia
+from benchmarks.geradores import (
+    gerar_df_darf, gerar_df_dctf, gerar_df_efd, gerar_df_perdcomp, gerar_texto_efd, iterar_linhas_dctf,
+)
+from benchmarks.referencia import gerar_df_resumo as resumo_referencia
+from calculos.incremental import ReconciliacaoIncremental
+from calculos.resumo import gerar_df_resumo
+from inputs import dctf_loader, efd_loader
+from utils.moeda import digitos_para_centavos
+
+
+def _arquivo(texto, nome):
+    arquivo = io.BytesIO(texto.encode("latin1"))
+    arquivo.name = nome
+    return arquivo
+
+
+@pytest.fixture(scope="module")
+def dec():
+    return "".join(linha + "\r\n" for linha in iterar_linhas_dctf(400, periodos=4, semente=1))
+
+
+@pytest.fixture(scope="module")
+def textos_efd(dec):
+    # um arquivo EFD por mês com débito na DCTF, para que as fontes se cruzem nos mesmos períodos
+    posicional = _dctf(dec, tipado=False)
+    r10 = posicional[posicional["Tipo"] == "R10"]
+    meses = sorted({(int(ano), int(mes)) for ano, mes in zip(r10["AnoApuracao"], r10["MesPeriodo"])})
+    return [gerar_texto_efd(50, ano, mes, semente=i) for i, (ano, mes) in enumerate(meses)]
+
+
+@pytest.fixture(scope="module")
+def darf_perdcomp():
+    return gerar_df_darf(200, 60, 3), gerar_df_perdcomp(200, 60, 4)
+
+
+def _dctf(dec, tipado):
+    tabelas = dctf_loader.carregar_tabelas([_arquivo(dec, "a.dec")], tipado=tipado, workers=1)
+    return pd.concat(tabelas.values(), ignore_index=True)
+
+
+def _efd_por_arquivo(textos, tipado=True):
+    arquivos = [_arquivo(texto, f"efd{i}.txt") for i, texto in enumerate(textos)]
+    return efd_loader.ler_por_arquivo(arquivos, tipado=tipado, workers=1)
+
+
+def test_resumo_igual_a_referencia():
+    fontes = (gerar_df_efd(3000, 12, 1), gerar_df_dctf(3000, 12, 2), gerar_df_darf(3000, 12, 3),
+              gerar_df_perdcomp(3000, 12, 4))
+    referencia = resumo_referencia(*_entradas_referencia(*fontes))
+    pd.testing.assert_frame_equal(_centavos(referencia), _centavos(gerar_df_resumo(*fontes)))
+
+
+def test_decodificadores_tipados_iguais_a_referencia(dec, textos_efd, darf_perdcomp):
+    # a referência lê o formato posicional (texto); o resumo atual, o tipado (centavos em int64)
+    posicional = _dctf(dec, tipado=False)
+    posicional = posicional.assign(ValorDebito=digitos_para_centavos(posicional["ValorDebito"]))
+    efd_posicional = efd_loader.juntar(_efd_por_arquivo(textos_efd, tipado=False), tipado=False)
+    referencia = resumo_referencia(*_entradas_referencia(efd_posicional, posicional, *darf_perdcomp))
+
+    efd_tipada = efd_loader.juntar(_efd_por_arquivo(textos_efd))
+    atual = gerar_df_resumo(efd_tipada, _dctf(dec, tipado=True), *darf_perdcomp)
+    fontes = [c for c in atual.columns if c.startswith(("[EFD]", "[DCTF]", "[DARF]", "[PERDCOMP]"))]
+    assert (atual[fontes] != 0).any().all()
+    pd.testing.assert_frame_equal(_centavos(referencia), _centavos(atual))
+
+
+def test_incremental_igual_ao_resumo_completo(dec, textos_efd, darf_perdcomp):
+    df_darf, df_perdcomp = darf_perdcomp
+    df_dctf = _dctf(dec, tipado=True)
+    efds = _efd_por_arquivo(textos_efd)
+    reconciliacao = ReconciliacaoIncremental()
+    for i, df in enumerate(efds):
+        reconciliacao.atualizar_arquivo("efd", i, df)
+    reconciliacao.atualizar_arquivo("dctf", "a.dec", df_dctf)
+    # o DARF em dois arquivos com os mesmos períodos, para que a remoção desconte de uma soma compartilhada
+    reconciliacao.atualizar_arquivo("darf", "pares.pdf", df_darf.iloc[::2])
+    reconciliacao.atualizar_arquivo("darf", "impares.pdf", df_darf.iloc[1::2])
+    reconciliacao.atualizar_arquivo("perdcomp", "p.xlsx", df_perdcomp)
+    pd.testing.assert_frame_equal(
+        reconciliacao.resumo(), gerar_df_resumo(efd_loader.juntar(efds), df_dctf, df_darf, df_perdcomp)
+    )
+
+    # tira um EFD e um DARF e troca a PER/DCOMP: só os períodos afetados são refeitos
+    reconciliacao.remover_arquivo("efd", 0)
+    reconciliacao.remover_arquivo("darf", "impares.pdf")
+    reconciliacao.atualizar_arquivo("perdcomp", "p.xlsx", df_perdcomp.iloc[:100])
+    esperado = gerar_df_resumo(efd_loader.juntar(efds[1:]), df_dctf, df_darf.iloc[::2], df_perdcomp.iloc[:100])
+    pd.testing.assert_frame_equal(reconciliacao.resumo(), esperado)
@@ -0,0 +1,31 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from benchmarks.geradores import gerar_df_darf, gerar_df_dctf, gerar_df_efd, gerar_df_perdcomp
+from calculos.resumo import gerar_df_resumo
+from calculos.resumo_duckdb import ArmazemParquet, duckdb_disponivel, gerar_df_resumo_duckdb
+
+
+def test_duckdb_exige_pyarrow(monkeypatch):
+    # None em sys.modules faz o import falhar com ImportError
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    assert not duckdb_disponivel()
+
+
+@pytest.mark.skipif(not duckdb_disponivel(), reason="exige duckdb e pyarrow")
+def test_resumo_duckdb_igual_ao_em_memoria(tmp_path):
+    df_efd, df_dctf = gerar_df_efd(3000, 12, 1), gerar_df_dctf(3000, 12, 2)
+    df_darf, df_perdcomp = gerar_df_darf(3000, 12, 3), gerar_df_perdcomp(3000, 12, 4)
+    armazem = ArmazemParquet(tmp_path)
+    # a EFD em dois arquivos: as somas do mesmo período se juntam no DuckDB
+    armazem.incluir("efd", "1", "efd1.txt", df_efd.iloc[:1500])
+    armazem.incluir("efd", "1", "efd2.txt", df_efd.iloc[1500:])
+    armazem.incluir("dctf", "1", "a.dec", df_dctf)
+    armazem.incluir("darf", "1", "d.pdf", df_darf)
+    armazem.incluir("perdcomp", "1", "p.xlsx", df_perdcomp)
+
+    pd.testing.assert_frame_equal(
+        gerar_df_resumo_duckdb(armazem, "1"), gerar_df_resumo(df_efd, df_dctf, df_darf, df_perdcomp)
+    )
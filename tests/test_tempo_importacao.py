@@ -0,0 +1,17 @@
+import pytest
+
+from benchmarks.tempo_importacao import MODULOS, ORCAMENTO_MS, medir_importacao, proibidos
+
+
+@pytest.mark.parametrize("modulo", MODULOS)
+def test_importacao_dentro_do_orcamento_e_sem_parsers_pesados(modulo):
+    # como no benchmark, vale a menor de até 3 medições (a primeira ainda pode compilar os .pyc)
+    medicoes = []
+    for _ in range(3):
+        medicoes.append(medir_importacao(modulo))
+        if medicoes[-1][modulo][1] / 1000 <= ORCAMENTO_MS:
+            break
+    tempos = min(medicoes, key=lambda t: t[modulo][1])
+
+    assert proibidos(tempos) == []
+    assert tempos[modulo][1] / 1000 <= ORCAMENTO_MS
@@ -0,0 +1,41 @@
+import pandas as pd
+
+from benchmarks.referencia import remove_illegal_chars
+from utils.texto import remover_caracteres_ilegais
+
+
+def test_limpa_colunas_de_texto_como_a_referencia():
+    df = pd.DataFrame({
+        "texto": ["a\x01b", "ok", None],
+        "misto": ["x\x0by", 3, None],
+        "limpo": ["sem", "nada", "aqui"],
+        "numero": [1, 2, 3],
+    })
+    limpo, colunas = remover_caracteres_ilegais(df)
+    assert colunas == ["texto", "misto"]
+    pd.testing.assert_frame_equal(limpo, df.map(remove_illegal_chars))
+    assert df.loc[0, "texto"] == "a\x01b"
+
+
+def test_limpa_categorias_e_junta_as_que_ficam_iguais():
+    df = pd.DataFrame({
+        "categoria": pd.Categorical(["a\x01", "a", None, "b\x1f", "a\x01"]),
+        "renomeada": pd.Categorical(["c\x02", "d", "c\x02", None, "d"], ordered=True),
+        "limpa": pd.Categorical(["x", "y", "x", "y", "x"]),
+    })
+    limpo, colunas = remover_caracteres_ilegais(df)
+    assert colunas == ["categoria", "renomeada"]
+    assert isinstance(limpo["categoria"].dtype, pd.CategoricalDtype)
+    assert limpo["categoria"].tolist()[:2] == ["a", "a"]
+    assert pd.isna(limpo["categoria"].iloc[2])
+    assert limpo["categoria"].tolist()[3:] == ["b", "a"]
+    assert list(limpo["categoria"].cat.categories) == ["a", "b"]
+    esperado = pd.Series(pd.Categorical(["c", "d", "c", None, "d"], ordered=True), name="renomeada")
+    pd.testing.assert_series_equal(limpo["renomeada"], esperado)
+    pd.testing.assert_series_equal(limpo["limpa"], df["limpa"])
+
+
+def test_sem_caracteres_ilegais_devolve_o_mesmo_df():
+    df = pd.DataFrame({"categoria": pd.Categorical(["a", "b"]), "texto": ["c", "d"]})
+    limpo, colunas = remover_caracteres_ilegais(df)
+    assert limpo is df and colunas == []
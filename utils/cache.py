@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+DIRETORIO_PADRAO = Path(os.environ.get(
+    "CRUZAMENTO_CACHE_DIR", Path.home() / ".cache" / "cruzamento-pis-cofins"
+))
+LIMITE_PADRAO_MB = int(os.environ.get("CRUZAMENTO_CACHE_MB", "2048"))
+
+_CHAVE_COLUNAS = b"cruzamento_colunas"
+_TABELA_UNICA = "_df"
+
+
+class CacheParse:
+    """
+    Cache em disco dos DataFrames gerados pelos loaders.
+
+    A chave é o hash do conteúdo do arquivo + nome e versão do parser (+ parâmetros).
+    Cada entrada é um diretório com uma tabela Arrow IPC por DataFrame, lida de volta
+    com memory map. Quando o tamanho total passa de `limite_bytes`, as entradas
+    acessadas há mais tempo são removidas (LRU pelo mtime do diretório).
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PADRAO, limite_bytes=LIMITE_PADRAO_MB * 1024 * 1024):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.limite_bytes = limite_bytes
+        self.acertos = 0
+        self.faltas = 0
+
+    def chave(self, arquivo, parser, versao, **parametros):
+        h = hashlib.sha256()
+        arquivo.seek(0)
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            h.update(bloco)
+        arquivo.seek(0)
+        h.update(json.dumps([parser, versao, parametros], sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def obter(self, arquivo, parser, versao, calcular, **parametros):
+        """
+        Devolve o resultado em cache para `arquivo`; se não houver, chama `calcular()`
+        e grava o resultado. `calcular` deve devolver um DataFrame, um dict de
+        DataFrames ou None (que não é guardado).
+        """
+        chave, resultado = self.consultar(arquivo, parser, versao, **parametros)
+        if resultado is not None:
+            return resultado
+        resultado = calcular()
+        if resultado is not None:
+            self.gravar(chave, resultado)
+        return resultado
+
+    def consultar(self, arquivo, parser, versao, **parametros):
+        """Devolve (chave, resultado em cache ou None), contando acerto/falta."""
+        chave = self.chave(arquivo, parser, versao, **parametros)
+        resultado = self.ler(chave)
+        if resultado is None:
+            self.faltas += 1
+        else:
+            self.acertos += 1
+        return chave, resultado
+
+    def ler(self, chave):
+        entrada = self.diretorio / chave
+        if not entrada.is_dir():
+            return None
+        try:
+            tabelas = {arq.stem: _ler_arrow(arq) for arq in sorted(entrada.glob("*.arrow"))}
+        except (OSError, ValueError):
+            shutil.rmtree(entrada, ignore_errors=True)
+            return None
+        # marca o acesso para a política LRU
+        os.utime(entrada)
+        if set(tabelas) == {_TABELA_UNICA}:
+            return tabelas[_TABELA_UNICA]
+        return tabelas
+
+    def gravar(self, chave, resultado):
+        tabelas = resultado if isinstance(resultado, dict) else {_TABELA_UNICA: resultado}
+        temporario = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.diretorio))
+        try:
+            for nome, df in tabelas.items():
+                _gravar_arrow(df, temporario / f"{nome}.arrow")
+            os.replace(temporario, self.diretorio / chave)
+        except Exception:
+            # colunas com tipos mistos não cabem no Arrow; nesse caso só não há cache
+            shutil.rmtree(temporario, ignore_errors=True)
+            return False
+        self._liberar_espaco()
+        return True
+
+    def limpar(self):
+        for entrada in self._entradas():
+            shutil.rmtree(entrada, ignore_errors=True)
+
+    def estatisticas(self):
+        entradas = self._entradas()
+        return {
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "entradas": len(entradas),
+            "bytes": sum(_tamanho(e) for e in entradas),
+        }
+
+    def _entradas(self):
+        return [e for e in self.diretorio.iterdir() if e.is_dir() and not e.name.startswith(".")]
+
+    def _liberar_espaco(self):
+        entradas = sorted(self._entradas(), key=lambda e: e.stat().st_mtime)
+        tamanhos = {e: _tamanho(e) for e in entradas}
+        total = sum(tamanhos.values())
+        for entrada in entradas:
+            if total <= self.limite_bytes:
+                break
+            shutil.rmtree(entrada, ignore_errors=True)
+            total -= tamanhos[entrada]
+
+
+def _tamanho(entrada):
+    return sum(arq.stat().st_size for arq in entrada.glob("*.arrow"))
+
+
+def tabela_arrow(df):
+    """DataFrame -> pyarrow.Table, guardando os rótulos originais das colunas."""
+    import pyarrow as pa
+
+    # o Arrow só aceita nomes de coluna texto; os rótulos originais (ex.: inteiros da EFD)
+    # vão nos metadados do schema
+    rotulos = df.columns.tolist()
+    df = df.set_axis([str(c) for c in rotulos], axis=1)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[_CHAVE_COLUNAS] = json.dumps(rotulos).encode()
+    return tabela.replace_schema_metadata(metadados)
+
+
+def dataframe_arrow(tabela):
+    """Inverso de `tabela_arrow`."""
+    df = tabela.to_pandas()
+    rotulos = (tabela.schema.metadata or {}).get(_CHAVE_COLUNAS)
+    if rotulos is not None:
+        df.columns = json.loads(rotulos)
+    return df
+
+
+def _gravar_arrow(df, caminho):
+    import pyarrow as pa
+
+    tabela = tabela_arrow(df)
+    with pa.OSFile(str(caminho), "wb") as destino:
+        with pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+
+
+def _ler_arrow(caminho):
+    import pyarrow as pa
+
+    with pa.memory_map(str(caminho), "r") as origem:
+        return dataframe_arrow(pa.ipc.open_file(origem).read_all())
+
+
+def obter_cache_padrao(diretorio=DIRETORIO_PADRAO, limite_mb=LIMITE_PADRAO_MB):
+    """Cria o cache padrão; devolve None se o pyarrow não estiver instalado."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return CacheParse(diretorio, limite_mb * 1024 * 1024)
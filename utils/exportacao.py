@@ -0,0 +1,125 @@
+"""
+Exportação dos resultados para download.
+
+O Excel é escrito com o openpyxl em modo write-only (linhas em fluxo, sem manter
+as células em memória) direto num buffer; abas maiores que o limite do Excel são
+divididas em 'Nome (2)', 'Nome (3)', ... Para os dados brutos muito grandes há o
+pacote .zip com um CSV ou Parquet por aba.
+"""
+import io
+import zipfile
+
+import pandas as pd
+
+from utils.instrumentacao import etapa
+
+# 1.048.576 linhas por planilha, uma delas é o cabeçalho
+LINHAS_POR_ABA = 1_048_575
+LINHAS_POR_BLOCO = 50_000
+_TAMANHO_NOME_ABA = 31
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MIME_ZIP = "application/zip"
+
+
+def nomes_abas(nome, partes):
+    """'Dados EFD', 3 -> ['Dados EFD', 'Dados EFD (2)', 'Dados EFD (3)'], sempre com até 31 caracteres."""
+    nomes = []
+    for i in range(partes):
+        sufixo = f" ({i + 1})" if i else ""
+        nomes.append(nome[:_TAMANHO_NOME_ABA - len(sufixo)] + sufixo)
+    return nomes
+
+
+def _linhas(df, inicio, fim):
+    # object + None: o openpyxl grava int/float/str/datetime nativos e célula vazia para ausentes
+    for ini in range(inicio, fim, LINHAS_POR_BLOCO):
+        bloco = df.iloc[ini:min(ini + LINHAS_POR_BLOCO, fim)].astype(object)
+        bloco = bloco.where(bloco.notna(), None)
+        yield from bloco.itertuples(index=False, name=None)
+
+
+def gerar_excel(abas, linhas_por_aba=LINHAS_POR_ABA):
+    """
+    Escreve `abas` ({nome da aba: DataFrame}; None é ignorado) num .xlsx em memória
+    e devolve os bytes.
+    """
+    from openpyxl import Workbook
+
+    with etapa("exportacao.excel", linhas=_total_linhas(abas)) as registro:
+        dados = _gravar_excel(Workbook(write_only=True), abas, linhas_por_aba)
+        registro.bytes = len(dados)
+    return dados
+
+
+def _total_linhas(abas):
+    return sum(len(df) for df in abas.values() if df is not None)
+
+
+def _gravar_excel(livro, abas, linhas_por_aba):
+    for nome, df in abas.items():
+        if df is None:
+            continue
+        total = len(df)
+        partes = max(1, -(-total // linhas_por_aba))
+        cabecalho = [str(c) for c in df.columns]
+        for i, nome_aba in enumerate(nomes_abas(nome, partes)):
+            planilha = livro.create_sheet(nome_aba)
+            planilha.append(cabecalho)
+            inicio = i * linhas_por_aba
+            for linha in _linhas(df, inicio, min(inicio + linhas_por_aba, total)):
+                planilha.append(linha)
+
+    destino = io.BytesIO()
+    livro.save(destino)
+    return destino.getvalue()
+
+
+def parquet_disponivel():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _parquet(df, destino):
+    df = df.set_axis([str(c) for c in df.columns], axis=1)
+    try:
+        df.to_parquet(destino, index=False)
+    except (TypeError, ValueError):
+        # colunas com tipos mistos (ex.: texto e número na mesma coluna) vão como texto
+        destino.seek(0)
+        destino.truncate()
+        mistas = df.select_dtypes(include="object").columns
+        df[mistas] = df[mistas].apply(lambda c: c.map(lambda v: None if pd.isna(v) else str(v)))
+        df.to_parquet(destino, index=False)
+
+
+def gerar_pacote(abas, formato="csv"):
+    """
+    Compacta `abas` num .zip com um arquivo por aba ('csv': separador ';' e vírgula
+    decimal, como o Excel brasileiro abre; 'parquet': exige o pyarrow). Devolve os bytes.
+    """
+    with etapa(f"exportacao.pacote.{formato}", linhas=_total_linhas(abas)) as registro:
+        dados = _gravar_pacote(abas, formato)
+        registro.bytes = len(dados)
+    return dados
+
+
+def _gravar_pacote(abas, formato):
+    destino = io.BytesIO()
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as pacote:
+        for nome, df in abas.items():
+            if df is None:
+                continue
+            if formato == "parquet":
+                # o parquet já é comprimido, vai sem recompressão
+                buffer = io.BytesIO()
+                _parquet(df, buffer)
+                pacote.writestr(f"{nome}.parquet", buffer.getvalue(), zipfile.ZIP_STORED)
+            else:
+                with pacote.open(f"{nome}.csv", "w") as arquivo:
+                    with io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="") as texto:
+                        df.to_csv(texto, index=False, sep=";", decimal=",")
+    return destino.getvalue()
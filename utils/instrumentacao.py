@@ -0,0 +1,195 @@
+"""
+Rastreamento de desempenho por etapa (leitura de cada fonte, blocos do resumo,
+exportação): tempo, linhas e bytes, com captura opcional de cProfile ou tracemalloc.
+
+Sem um rastreamento ativo (`iniciar`), `etapa` e `medir` não registram nada e
+custam só uma consulta a um ContextVar.
+
+    rastro = iniciar(perfil="tracemalloc")
+    with etapa("efd.carregar", bytes=tamanho) as registro:
+        df = ...
+        registro.linhas = len(df)
+    rastro.encerrar()
+    rastro.para_json()
+"""
+import cProfile
+import io
+import json
+import platform
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+
+PERFIS = (None, "cprofile", "tracemalloc")
+
+_ATIVO = ContextVar("rastreamento_ativo", default=None)
+_PAI = ContextVar("etapa_pai", default=None)
+
+
+class Registro:
+    """Uma etapa medida. `linhas`, `bytes` e `extras` podem ser preenchidos dentro do bloco."""
+
+    __slots__ = ("nome", "pai", "nivel", "inicio", "segundos", "linhas", "bytes", "pico_mb", "extras")
+
+    def __init__(self, nome, pai, inicio, linhas=None, bytes=None, **extras):
+        self.nome = nome
+        self.pai = pai
+        self.nivel = 0 if pai is None else pai.nivel + 1
+        self.inicio = inicio
+        self.segundos = None
+        self.linhas = linhas
+        self.bytes = bytes
+        self.pico_mb = None
+        self.extras = extras
+
+    def como_dict(self):
+        dados = {
+            "etapa": self.nome,
+            "nivel": self.nivel,
+            "pai": None if self.pai is None else self.pai.nome,
+            "inicio_s": round(self.inicio, 6),
+            "segundos": None if self.segundos is None else round(self.segundos, 6),
+            "linhas": self.linhas,
+            "bytes": self.bytes,
+            "linhas_por_segundo": (
+                round(self.linhas / self.segundos, 1) if self.linhas and self.segundos else None
+            ),
+            "pico_mb": self.pico_mb,
+        }
+        dados.update(self.extras)
+        return dados
+
+
+class Rastreamento:
+    def __init__(self, perfil=None):
+        if perfil not in PERFIS:
+            raise ValueError(f"perfil deve ser um de {PERFIS}")
+        self.perfil = perfil
+        self.registros = []
+        self.criado_em = datetime.now()
+        self.segundos = None
+        self.relatorio_cprofile = None
+        self._relogio = time.perf_counter()
+        self._token = None
+        self._cprofile = None
+        self._tracemalloc = False
+
+    def _agora(self):
+        return time.perf_counter() - self._relogio
+
+    def iniciar(self):
+        self._token = _ATIVO.set(self)
+        if self.perfil == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif self.perfil == "tracemalloc" and not tracemalloc.is_tracing():
+            # o tracemalloc é do processo: só quem o ligou o desliga
+            tracemalloc.start()
+            self._tracemalloc = True
+        return self
+
+    def encerrar(self, linhas_cprofile=40):
+        if self._token is None:
+            return self
+        self.segundos = self._agora()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            saida = io.StringIO()
+            pstats.Stats(self._cprofile, stream=saida).sort_stats("cumulative").print_stats(linhas_cprofile)
+            self.relatorio_cprofile = saida.getvalue()
+            self._cprofile = None
+        elif self._tracemalloc:
+            tracemalloc.stop()
+            self._tracemalloc = False
+        try:
+            _ATIVO.reset(self._token)
+        except ValueError:
+            # encerrado a partir de outro contexto (ver `iniciar`)
+            _ATIVO.set(None)
+        self._token = None
+        return self
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *erro):
+        self.encerrar()
+
+    def tabela(self):
+        import pandas as pd
+
+        tabela = pd.DataFrame([r.como_dict() for r in self.registros])
+        if not tabela.empty:
+            # recuo pelo nível, para ler a árvore de etapas na própria tabela
+            tabela["etapa"] = ["  " * n + e for n, e in zip(tabela["nivel"], tabela["etapa"])]
+        return tabela
+
+    def como_dict(self):
+        return {
+            "criado_em": self.criado_em.isoformat(timespec="seconds"),
+            "segundos": self.segundos,
+            "perfil": self.perfil,
+            "ambiente": {"python": platform.python_version(), "plataforma": platform.platform()},
+            "etapas": [r.como_dict() for r in self.registros],
+            "cprofile": self.relatorio_cprofile,
+        }
+
+    def para_json(self):
+        return json.dumps(self.como_dict(), indent=2, ensure_ascii=False, default=str)
+
+
+def iniciar(perfil=None):
+    """Cria e ativa um rastreamento no contexto atual (até `encerrar()`)."""
+    anterior = _ATIVO.get()
+    if anterior is not None:
+        # execução anterior interrompida por exceção: desliga o cProfile/tracemalloc dela
+        anterior.encerrar()
+    return Rastreamento(perfil).iniciar()
+
+
+def ativo():
+    return _ATIVO.get()
+
+
+@contextmanager
+def etapa(nome, linhas=None, bytes=None, **extras):
+    """Mede o bloco como uma etapa do rastreamento ativo; sem rastreamento, não faz nada."""
+    rastro = _ATIVO.get()
+    if rastro is None:
+        yield Registro(nome, None, 0.0, linhas, bytes, **extras)
+        return
+    registro = Registro(nome, _PAI.get(), rastro._agora(), linhas, bytes, **extras)
+    rastro.registros.append(registro)
+    token = _PAI.set(registro)
+    memoria = rastro.perfil == "tracemalloc" and tracemalloc.is_tracing()
+    if memoria:
+        tracemalloc.reset_peak()
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro.segundos = time.perf_counter() - inicio
+        _PAI.reset(token)
+        if memoria:
+            # reset_peak das etapas filhas zera o pico da mãe: fica o maior dos dois
+            pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            filhas = [r.pico_mb for r in rastro.registros if r.pai is registro and r.pico_mb is not None]
+            registro.pico_mb = round(max([pico, *filhas]), 2)
+
+
+def medir(nome):
+    """Decorador: mede cada chamada como `etapa(nome)`; resultados com len() contam as linhas."""
+    def decorador(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            with etapa(nome) as registro:
+                resultado = funcao(*args, **kwargs)
+                if hasattr(resultado, "shape"):
+                    registro.linhas = len(resultado)
+                return resultado
+        return medida
+    return decorador
@@ -0,0 +1,160 @@
+"""
+Conversão de valores monetários para centavos inteiros (int64).
+
+Os cálculos somam centavos em inteiros; só na exibição os valores voltam para reais.
+A conversão também é exata: o texto é separado em parte inteira e fração, e as duas
+são combinadas em int64, sem passar por float.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype, is_integer_dtype, is_numeric_dtype
+
+# parte inteira de até 16 dígitos: o int64 em centavos vai até ~9,2e16 reais
+_DIGITOS_INTEIROS = 16
+# textos mais longos que isso não são valores (e alargariam a matriz de caracteres)
+_LARGURA_MAXIMA = 40
+_LINHAS_POR_BLOCO = 1 << 16
+# peso de cada casa da fração nos centavos (1ª: dezenas, 2ª: unidades)
+_PESOS_FRACAO = np.array([10, 1, 0], dtype="int8")
+_ESPACOS = np.array([ord(c) for c in " \t\r\n"], dtype="uint8")
+
+
+def _ler_bloco(codigos, decimal, milhar):
+    """
+    Matriz de caracteres (linhas x posições) -> (centavos, válidos). Dígitos e
+    separadores são reconhecidos de uma vez para o bloco todo; a parte inteira é
+    acumulada coluna a coluna (Horner) e a fração entra pela casa de cada dígito,
+    contada em dígitos a partir do separador decimal.
+    """
+    # só ASCII pode ser válido: acima de 255 vira 255 (inválido também) e a matriz cabe em bytes
+    codigos = np.minimum(codigos, 255).astype("uint8")
+    digito = (codigos >= ord("0")) & (codigos <= ord("9"))
+    eh_decimal = codigos == decimal[:, None]
+    espacos = np.isin(codigos, _ESPACOS)
+    ignorados = (codigos == 0) | (codigos == milhar[:, None]) | espacos
+    # o sinal, se houver, é o primeiro caractere depois dos espaços
+    linhas = np.arange(len(codigos))
+    primeiro = np.argmax(~espacos, axis=1)
+    negativo = codigos[linhas, primeiro] == ord("-")
+    aceitos = digito | eh_decimal | ignorados
+    aceitos[linhas, primeiro] |= negativo | (codigos[linhas, primeiro] == ord("+"))
+    validos = aceitos.all(1) & (eh_decimal.sum(1) <= 1) & digito.any(1)
+
+    valor = np.where(digito, codigos - ord("0"), 0).astype("int8")
+    parte_inteira = digito & (np.cumsum(eh_decimal, axis=1, dtype="int8") == 0)
+    validos &= parte_inteira.sum(1) <= _DIGITOS_INTEIROS
+    # casa de cada dígito da fração: 0, 1, 2...
+    casa = np.cumsum(digito & ~parte_inteira, axis=1, dtype="int8") - 1
+
+    centavos = np.zeros(len(codigos), dtype="int64")
+    for j in range(codigos.shape[1]):
+        coluna = parte_inteira[:, j]
+        centavos = np.where(coluna, centavos * 10 + valor[:, j], centavos)
+    fracao = digito & ~parte_inteira
+    centavos = centavos * 100 + (valor * np.where(fracao, _PESOS_FRACAO[np.clip(casa, 0, 2)], 0)).sum(1, dtype="int64")
+
+    # além dos centavos: arredonda para o par (NBR 5891), como o round do float fazia nos empates
+    terceiro = np.where(fracao & (casa == 2), valor, 0).sum(1)
+    depois = (fracao & (casa > 2) & (valor > 0)).any(1)
+    centavos += (terceiro > 5) | ((terceiro == 5) & (depois | (centavos % 2 == 1)))
+    return np.where(negativo, -centavos, centavos), validos
+
+
+def _decimais_para_centavos(textos, separador_decimal):
+    """
+    Textos ('1.234,56', '1234.56', ' -12 ') -> Int64; inválidos ficam <NA>.
+
+    `separador_decimal` ',' ou '.' vale para todos; None decide por texto (com vírgula,
+    '1.234,56'; sem, '1234.56'). O separador de milhar e os espaços são ignorados.
+    """
+    textos = np.asarray(textos, dtype=str)
+    longos = np.char.str_len(textos) > _LARGURA_MAXIMA
+    if longos.any():
+        textos = np.where(longos, "", textos).astype(str)
+    n = len(textos)
+    largura = max(textos.dtype.itemsize // 4, 1)
+    codigos = np.ascontiguousarray(textos).view(np.uint32).reshape(n, -1) if n else np.zeros((0, largura), np.uint32)
+
+    if separador_decimal is None:
+        virgula = (codigos == ord(",")).any(1)
+    else:
+        virgula = np.full(n, separador_decimal == ",")
+    decimal = np.where(virgula, ord(","), ord(".")).astype("uint8")
+    # sem vírgula não há separador de milhar (0 já é ignorado: é o preenchimento)
+    milhar = np.where(virgula, ord("."), 0).astype("uint8")
+
+    centavos = np.zeros(n, dtype="int64")
+    validos = np.zeros(n, dtype=bool)
+    for inicio in range(0, n, _LINHAS_POR_BLOCO):
+        bloco = slice(inicio, inicio + _LINHAS_POR_BLOCO)
+        centavos[bloco], validos[bloco] = _ler_bloco(codigos[bloco], decimal[bloco], milhar[bloco])
+    validos &= ~longos
+    return pd.arrays.IntegerArray(np.where(validos, centavos, 0), ~validos)
+
+
+def _numeros_para_centavos(valores):
+    numeros = pd.to_numeric(valores, errors="coerce")
+    if is_integer_dtype(numeros):
+        return pd.array(numeros, dtype="Int64") * 100
+    numeros = np.asarray(numeros, dtype="float64")
+    centavos = np.round(numeros * 100)
+    # o float * 100 só pode cair do lado errado perto de meio centavo, ou quando o valor
+    # passa da precisão do float: esses vão pelo texto mais curto do valor ('2.675')
+    with np.errstate(invalid="ignore"):
+        duvidosos = (np.abs(np.abs(numeros * 100) % 1 - 0.5) < 1e-3) | (np.abs(numeros) >= 1e11)
+    resultado = pd.arrays.IntegerArray(
+        np.where(np.isfinite(centavos), centavos, 0).astype("int64"), ~np.isfinite(centavos)
+    )
+    if duvidosos.any():
+        resultado[duvidosos] = _decimais_para_centavos(numeros[duvidosos].astype(str), ".")
+    return resultado
+
+
+def valores_para_centavos(serie, separador_decimal=','):
+    """
+    Valores monetários -> centavos (Int64); vazios e inválidos ficam <NA>.
+
+    Texto usa `separador_decimal` (',': '1.234,56'; '.': '1234.56'; None: decide por
+    valor, vírgula presente = formato brasileiro); é lido dígito a dígito, em inteiros.
+    Valores já numéricos (ex.: colunas
+    lidas do Excel) são tratados como reais.
+    """
+    if is_numeric_dtype(serie):
+        return pd.Series(_numeros_para_centavos(serie), index=serie.index)
+    tipo = infer_dtype(serie, skipna=True)
+    if tipo in ("integer", "floating", "mixed-integer-float", "decimal"):
+        return pd.Series(_numeros_para_centavos(serie), index=serie.index)
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # converte só as categorias; os códigos -1 (ausentes) ficam <NA>
+        categorias = _decimais_para_centavos(serie.cat.categories.astype(str), separador_decimal)
+        return pd.Series(categorias.take(serie.cat.codes.to_numpy(), allow_fill=True), index=serie.index)
+    textos = serie.to_numpy(dtype=object, na_value="")
+    centavos = pd.Series(_decimais_para_centavos(textos, separador_decimal), index=serie.index)
+    if tipo != "string" and tipo != "empty":
+        # coluna mista (texto + números): números não passam pela troca de separadores
+        numeros = serie.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+        if numeros.any():
+            centavos[numeros] = _numeros_para_centavos(serie[numeros].astype(float))
+    return centavos
+
+
+def texto_para_centavos(serie):
+    """
+    Valores no formato brasileiro ('1.234,56', '1234,56', '1234') -> centavos.
+
+    Valores já numéricos (ex.: colunas lidas do Excel) são tratados como reais.
+    Vazios e inválidos viram 0.
+    """
+    return valores_para_centavos(serie).fillna(0).astype("int64")
+
+
+def digitos_para_centavos(serie):
+    """
+    Valores de largura fixa da DCTF ('00000000123456', duas casas implícitas) -> centavos.
+    Colunas já inteiras (gerar_dataframes com tipado=True) estão em centavos.
+    """
+    return pd.to_numeric(serie, errors="coerce").fillna(0).astype("int64")
+
+
+def centavos_para_reais(valores):
+    return valores / 100
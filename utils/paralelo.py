@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def numero_workers(workers, tarefas):
+    """Resolve o número de processos: None = todos os núcleos, nunca mais que as tarefas."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, tarefas))
+
+
+def mapear(funcao, tarefas, workers=None, isolar_erros=False, em_processos=False):
+    """
+    Aplica `funcao` a cada tarefa num pool de processos e devolve os resultados
+    na mesma ordem das tarefas. Com um único worker roda no próprio processo,
+    a menos que `em_processos=True` (ex.: tarefa que pode derrubar o processo).
+
+    Com `isolar_erros=True` a exceção de uma tarefa não interrompe as demais:
+    ela é devolvida no lugar do resultado.
+    """
+    tarefas = list(tarefas)
+    n = numero_workers(workers, len(tarefas))
+    if n <= 1 and not em_processos:
+        return [_executar(funcao, t, isolar_erros) for t in tarefas]
+
+    # spawn: o processo da interface (Streamlit) tem threads, fork não é seguro
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n, mp_context=contexto) as executor:
+        futuros = [executor.submit(funcao, t) for t in tarefas]
+        resultados = []
+        for futuro in futuros:
+            try:
+                resultados.append(futuro.result())
+            except Exception as erro:
+                if not isolar_erros:
+                    raise
+                resultados.append(erro)
+    return resultados
+
+
+def _executar(funcao, tarefa, isolar_erros):
+    try:
+        return funcao(tarefa)
+    except Exception as erro:
+        if not isolar_erros:
+            raise
+        return erro
+
+
+class TabelasArrow:
+    """DataFrame(s) serializados em Arrow IPC para voltar de um worker (ver `empacotar`)."""
+
+    __slots__ = ("buffers", "unica")
+
+    def __init__(self, buffers, unica):
+        self.buffers = buffers
+        self.unica = unica
+
+
+def empacotar(resultado):
+    """
+    DataFrame ou dict de DataFrames -> buffers colunares Arrow IPC, bem mais compactos
+    e rápidos de transferir entre processos que o pickle das colunas object.
+    Sem o pyarrow, ou com colunas que o Arrow não aceita, devolve o próprio resultado.
+    """
+    if resultado is None:
+        return None
+    try:
+        import pyarrow as pa
+
+        from utils.cache import tabela_arrow
+    except ImportError:
+        return resultado
+    unica = not isinstance(resultado, dict)
+    buffers = {}
+    try:
+        for nome, df in ({None: resultado} if unica else resultado).items():
+            tabela = tabela_arrow(df)
+            destino = pa.BufferOutputStream()
+            with pa.ipc.new_stream(destino, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+            buffers[nome] = destino.getvalue().to_pybytes()
+    except (pa.ArrowException, TypeError, ValueError):
+        # tipos mistos numa coluna: vai por pickle mesmo
+        return resultado
+    return TabelasArrow(buffers, unica)
+
+
+def desempacotar(pacote):
+    """Inverso de `empacotar` (resultados que não foram empacotados passam direto)."""
+    if not isinstance(pacote, TabelasArrow):
+        return pacote
+    import pyarrow as pa
+
+    from utils.cache import dataframe_arrow
+
+    tabelas = {
+        nome: dataframe_arrow(pa.ipc.open_stream(pa.py_buffer(dados)).read_all())
+        for nome, dados in pacote.buffers.items()
+    }
+    return tabelas[None] if pacote.unica else tabelas
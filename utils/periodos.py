@@ -0,0 +1,82 @@
+"""
+Períodos de apuração de todas as fontes como uma chave inteira AAAAMM (ex.: 202401).
+
+Cada fonte traz o período num formato próprio ('01012024' na EFD, MOFG 202401 na
+DCTF, '31/01/2024' no DARF, 'Janeiro de 2024' na PER/DCOMP). A conversão é
+vetorizada e feita uma vez por valor distinto (são poucos períodos para muitas
+linhas); o resultado é Int64, com <NA> para o que não for um período válido.
+
+    chaves = chaves_periodo(df['MOFG'], 'aaaamm')
+    texto = para_texto(chaves)        # '01MMAAAA', como exibido no resumo
+"""
+import numpy as np
+import pandas as pd
+
+MESES = {
+    'janeiro': 1, 'fevereiro': 2, 'marco': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+}
+_PADRAO_MES_EXTENSO = '(' + '|'.join(MESES) + ')'
+
+# formato -> regex com os grupos 'ano' e 'mes' (os de 'livre' são alternativas)
+_PADROES = {
+    'ddmmaaaa': r'^\d{2}(?P<mes>\d{2})(?P<ano>\d{4})$',                     # EFD: '01012024'
+    'mm/aaaa': r'^(?P<mes>\d{1,2})/(?P<ano>\d{4})$',                        # '01/2024'
+    # DCTFWeb: '2024-01', '202401', '2024-01-31', '01/2024', '31/01/2024'
+    'livre': r'^(?:(?P<ano>\d{4})-?(?P<mes>\d{2})(?:-\d{2})?|(?:\d{2}/)?(?P<mes2>\d{2})/(?P<ano2>\d{4}))$',
+}
+FORMATOS = (*_PADROES, 'aaaamm', 'data', 'extenso')
+
+
+def _chave(ano, mes):
+    ano = pd.to_numeric(ano, errors='coerce')
+    mes = pd.to_numeric(mes, errors='coerce')
+    return (ano * 100 + mes).where(mes.between(1, 12)).astype('Int64')
+
+
+def _converter_unicos(unicos, formato):
+    if formato == 'aaaamm':
+        # MOFG da DCTF: número ou texto AAAAMM
+        numeros = pd.to_numeric(unicos, errors='coerce')
+        return _chave(numeros // 100, numeros % 100)
+    textos = unicos.astype(str).str.strip()
+    if formato == 'data':
+        # DARF: 'DD/MM/AAAA'; datas inexistentes (ex.: 31/04) ficam de fora
+        datas = pd.to_datetime(textos, format='%d/%m/%Y', errors='coerce')
+        return _chave(datas.dt.year, datas.dt.month)
+    if formato == 'extenso':
+        # 'Janeiro de 2024', 'março/2024': sem acento e sem maiúsculas
+        textos = textos.str.lower().str.normalize('NFD').str.encode('ascii', 'ignore').str.decode('ascii')
+        mes = textos.str.extract(_PADRAO_MES_EXTENSO, expand=False).map(MESES)
+        return _chave(textos.str.extract(r'(\d{4})', expand=False), mes)
+    partes = textos.str.extract(_PADROES[formato])
+    if formato == 'livre':
+        return _chave(partes['ano'].fillna(partes['ano2']), partes['mes'].fillna(partes['mes2']))
+    return _chave(partes['ano'], partes['mes'])
+
+
+def chaves_periodo(valores, formato):
+    """Converte a Series `valores` (no `formato` de FORMATOS) em chaves AAAAMM (Int64)."""
+    if formato not in FORMATOS:
+        raise ValueError(f"formato deve ser um de {FORMATOS}")
+    codigos, unicos = pd.factorize(valores)
+    chaves = pd.array(_converter_unicos(pd.Series(np.asarray(unicos, dtype=object)), formato), dtype='Int64')
+    # códigos -1 (valores ausentes) viram <NA>
+    return pd.Series(chaves.take(codigos, allow_fill=True), index=valores.index, name=valores.name)
+
+
+def _formatar(chaves, modelo):
+    codigos, unicos = pd.factorize(chaves)
+    textos = np.array([modelo.format(ano=int(c) // 100, mes=int(c) % 100) for c in unicos] + [None], dtype=object)
+    # o -1 dos ausentes pega o None do fim
+    return pd.Series(textos[codigos], index=getattr(chaves, 'index', None))
+
+
+def para_texto(chaves):
+    """Chaves AAAAMM -> '01MMAAAA' (formato exibido no resumo); <NA> -> None."""
+    return _formatar(chaves, '01{mes:02d}{ano}')
+
+
+def para_mes_ano(chaves):
+    """Chaves AAAAMM -> 'MM/AAAA'; <NA> -> None."""
+    return _formatar(chaves, '{mes:02d}/{ano}')
@@ -1,6 +1,77 @@
+import re
 import unicodedata
 
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+# caracteres de controle que o Excel (openpyxl) não aceita; \t, \n e \r ficam
+_CODIGOS_ILEGAIS = [*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20)]
+CARACTERES_ILEGAIS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_TABELA_ILEGAIS = dict.fromkeys(_CODIGOS_ILEGAIS)
+BYTES_ILEGAIS = bytes(_CODIGOS_ILEGAIS)
+
 def limpar_texto(texto):
     texto = str(texto).strip().lower()
     texto = unicodedata.normalize('NFD', texto).encode('ascii', 'ignore').decode("utf-8")
-    return texto
\ No newline at end of file
+    return texto
+
+def _limpar_categorias(serie):
+    """Limpa as categorias de texto de uma coluna categórica; None se nenhuma tem caractere ilegal."""
+    categorias = serie.cat.categories
+    if not any(isinstance(c, str) and CARACTERES_ILEGAIS.search(c) for c in categorias):
+        return None
+    novas = [CARACTERES_ILEGAIS.sub('', c) if isinstance(c, str) else c for c in categorias]
+    unicas = pd.Index(novas).unique()
+    if len(unicas) == len(novas):
+        return serie.cat.rename_categories(novas)
+    # categorias que ficam iguais depois da limpeza viram uma só
+    codigos = unicas.get_indexer(novas)
+    novos_codigos = np.where(serie.cat.codes >= 0, codigos[serie.cat.codes], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(novos_codigos, unicas, ordered=serie.cat.ordered),
+        index=serie.index, name=serie.name,
+    )
+
+def remover_caracteres_ilegais(df):
+    """
+    Remove os caracteres de controle das colunas de texto de `df`.
+
+    Cada coluna object/string é testada com uma única busca sobre o texto concatenado;
+    só as que têm algum caractere ilegal são limpas (str.translate), e valores que não
+    são texto ficam como estão. Nas colunas categóricas só as categorias são limpas.
+    Devolve (df, colunas limpas); `df` só é copiado se alguma coluna precisar de limpeza.
+    """
+    if df is None:
+        return df, []
+    limpas = []
+    resultado = df
+    for posicao, coluna in enumerate(df.columns):
+        serie = df.iloc[:, posicao]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            limpa = _limpar_categorias(serie)
+            if limpa is not None:
+                if resultado is df:
+                    resultado = df.copy()
+                resultado.isetitem(posicao, limpa)
+                limpas.append(coluna)
+            continue
+        if serie.dtype != object and not isinstance(serie.dtype, pd.StringDtype):
+            continue
+        tipo = infer_dtype(serie, skipna=True)
+        if tipo == 'string':
+            textos = serie.dropna().tolist()
+        elif tipo.startswith('mixed'):
+            textos = [v for v in serie if isinstance(v, str)]
+        else:
+            continue
+        if not CARACTERES_ILEGAIS.search(''.join(textos)):
+            continue
+        limpa = serie.str.translate(_TABELA_ILEGAIS)
+        if tipo != 'string':
+            limpa = serie.where(~serie.map(lambda v: isinstance(v, str)), limpa)
+        if resultado is df:
+            resultado = df.copy()
+        resultado.isetitem(posicao, limpa)
+        limpas.append(coluna)
+    return resultado, limpas